@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Compare rendering the tweet fixtures under tests/tweets one at a time with
+html_for_tweet, with html_for_tweets, with html_for_tweets on a pool
+of processes, and with a RenderCache (the fixtures repeat, as popular
+tweets do across timelines).
+
+    python benchmarks/bench_html_for_tweets.py [--tweets 20000] [--processes 2]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython import RenderCache, Twython  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def load_tweets(count):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path) as f:
+            fixtures.append(json.load(f))
+    return [fixtures[i % len(fixtures)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tweets', type=int, default=20000,
+                        help='number of tweets rendered')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2,
+                        help='size of the process pool')
+    args = parser.parse_args()
+
+    tweets = load_tweets(args.tweets)
+
+    def one_at_a_time():
+        return [Twython.html_for_tweet(tweet, expand_quoted_status=True)
+                for tweet in tweets]
+
+    def batch():
+        return list(Twython.html_for_tweets(tweets, expand_quoted_status=True))
+
+    def batch_processes():
+        return list(Twython.html_for_tweets(tweets, expand_quoted_status=True,
+                                            processes=args.processes))
+
+    def batch_cached():
+        return list(Twython.html_for_tweets(tweets, expand_quoted_status=True,
+                                            cache=RenderCache()))
+
+    expected = one_at_a_time()
+    print('%d tweets, %d processes\n' % (len(tweets), args.processes))
+    print('%-28s %10s %10s' % ('', 'seconds', 'tweets/s'))
+    for name, run in (('html_for_tweet', one_at_a_time),
+                      ('html_for_tweets', batch),
+                      ('html_for_tweets, processes', batch_processes),
+                      ('html_for_tweets, cache', batch_cached)):
+        best = None
+        for _ in range(3):
+            start = time.time()
+            result = run()
+            seconds = time.time() - start
+            if best is None or seconds < best:
+                best = seconds
+        assert result == expected
+        print('%-28s %10.3f %10.0f' % (name, best, len(tweets) / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the JSON backends Twython can decode with, on the tweet fixtures
+under tests/tweets. Each fixture is decoded from bytes, the way REST
+bodies and stream lines are handed to the decoder.
+
+    python benchmarks/bench_json.py [--number 2000]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython.compat import get_json_loads, JSON_BACKENDS  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path, 'rb') as f:
+            fixtures.append(f.read())
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000,
+                        help='times every fixture is decoded per backend')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    total_bytes = sum(len(f) for f in fixtures) * args.number
+
+    print('%d fixtures, %d bytes, decoded %d times each\n' %
+          (len(fixtures), total_bytes // args.number, args.number))
+    print('%-12s %10s %12s' % ('backend', 'seconds', 'MB/s'))
+
+    for name in JSON_BACKENDS:
+        try:
+            loads = get_json_loads(name)
+        except ImportError:
+            print('%-12s %10s' % (name, 'not installed'))
+            continue
+
+        def run():
+            for fixture in fixtures:
+                loads(fixture)
+
+        seconds = min(timeit.repeat(run, number=args.number, repeat=3))
+        print('%-12s %10.3f %12.1f' % (name, seconds,
+                                        total_bytes / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Compare decoding a page of tweets (an array of the fixtures under
+tests/tweets) into dicts with models=False and into lazy models with
+models=True: the time taken, the memory the page holds, and the time and
+memory when every tweet is then read.
+
+    python benchmarks/bench_models.py [--tweets 200] [--number 50]
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython import models  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def make_page(count):
+    # Compact, like the bodies Twitter sends
+    tweets = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path) as f:
+            tweets.append(json.dumps(json.load(f), separators=(',', ':')))
+    page = [tweets[i % len(tweets)] for i in range(count)]
+    return ('[' + ','.join(page) + ']').encode('utf-8')
+
+
+def read_all(content):
+    for tweet in content:
+        tweet.get('id_str')
+
+
+def measure(decode, body, number, read):
+    best = None
+    for _ in range(number):
+        start = time.time()
+        content = decode(body)
+        if read:
+            read_all(content)
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+
+    gc.collect()
+    tracemalloc.start()
+    content = decode(body)
+    if read:
+        read_all(content)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return best, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tweets', type=int, default=200,
+                        help='tweets in the page')
+    parser.add_argument('--number', type=int, default=50,
+                        help='times the page is decoded, best is kept')
+    args = parser.parse_args()
+
+    body = make_page(args.tweets)
+    loads = json.loads
+    print('%d tweets, %d bytes\n' % (args.tweets, len(body)))
+    print('%-22s %10s %12s' % ('', 'ms', 'KiB held'))
+    for name, decode, read in (('dicts', loads, False),
+                               ('models', models.loads, False),
+                               ('dicts, all read', loads, True),
+                               ('models, all read', models.loads, True)):
+        seconds, held = measure(decode, body, args.number, read)
+        print('%-22s %10.2f %12.0f' % (name, seconds * 1000, held / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Compare decoding stream messages in the reading process with decoding them
+on a pool of processes (TwythonStreamer's decode_processes), on the tweet
+fixtures under tests/tweets.
+
+    python benchmarks/bench_stream_decode.py [--messages 50000] [--processes 4]
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython.compat import get_json_loads  # noqa: E402
+from twython.streaming.decode import ProcessDecoder  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def load_messages(count):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path, 'rb') as f:
+            fixtures.append(b' '.join(f.read().split()))
+    return [fixtures[i % len(fixtures)] for i in range(count)]
+
+
+def slim(data):
+    """What a consumer might keep of each tweet"""
+    if 'text' in data or 'full_text' in data:
+        return {'id_str': data.get('id_str'),
+                'text': data.get('full_text') or data.get('text')}
+
+
+def in_process(messages, args):
+    loads = get_json_loads()
+    return sum(1 for m in messages if slim(loads(m)) is not None)
+
+
+def in_processes(messages, args):
+    decoder = ProcessDecoder(args.processes, message_filter=slim,
+                             batch_size=args.batch_size)
+    count = 0
+    for m in messages:
+        count += len(decoder.feed(m))
+    count += len(decoder.flush(wait=True))
+    decoder.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=50000)
+    parser.add_argument('--processes', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    messages = load_messages(args.messages)
+    print('%d messages, %d processes\n' % (len(messages), args.processes))
+    print('%-16s %10s %12s' % ('decoding', 'seconds', 'msgs/s'))
+
+    for name, run in (('in process', in_process),
+                      ('process pool', in_processes)):
+        start = time.time()
+        count = run(messages, args)
+        seconds = time.time() - start
+        assert count == len(messages), (name, count)
+        print('%-16s %10.3f %12.0f' % (name, seconds, count / seconds))
+
+
+if __name__ == '__main__':
+    main()
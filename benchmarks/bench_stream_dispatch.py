@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the cost of handing decoded stream messages to their handlers:
+the getattr/callable loop TwythonStreamer used to run for every message
+against the precomputed dispatch table. Messages are the tweet fixtures
+under tests/tweets mixed with delete and limit notices.
+
+    python benchmarks/bench_stream_dispatch.py [--number 200000]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython import TwythonStreamer  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+class Streamer(TwythonStreamer):
+    def on_success(self, data):
+        return True
+
+    def on_delete(self, data):
+        return True
+
+    def on_limit(self, data):
+        return True
+
+
+def legacy_dispatch(self, data):
+    """The loop _request ran for every message before the table"""
+    if self.on_success(data):
+        for message_type in self.handlers:
+            if message_type in data:
+                handler = getattr(self, 'on_' + message_type, None)
+                if handler \
+                   and callable(handler) \
+                   and not handler(data.get(message_type)):
+                    break
+
+
+def load_messages():
+    messages = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path) as f:
+            messages.append(json.load(f))
+    messages.append({'delete': {'status': {'id': 1, 'id_str': '1'}}})
+    messages.append({'limit': {'track': 10}})
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000,
+                        help='messages dispatched per run')
+    args = parser.parse_args()
+
+    messages = load_messages()
+    count = args.number
+    sample = [messages[i % len(messages)] for i in range(count)]
+
+    print('%d messages\n' % count)
+    print('%-36s %10s %14s' % ('dispatch', 'seconds', 'ns/message'))
+
+    for handlers in (None, ['delete', 'limit', 'disconnect', 'retweet', 'reply']):
+        streamer = Streamer('a', 'b', 'c', 'd', handlers=handlers)
+        label = 'default handlers' if handlers is None else '+ retweet, reply'
+        for name, dispatch in (('getattr loop', legacy_dispatch),
+                               ('dispatch table', Streamer._dispatch)):
+            if name == 'getattr loop' and handlers is not None:
+                # The loop has no notion of tweet subtypes
+                continue
+
+            def run():
+                for data in sample:
+                    dispatch(streamer, data)
+
+            seconds = min(timeit.repeat(run, number=1, repeat=3))
+            print('%-36s %10.3f %14.0f' % ('%s (%s)' % (name, label), seconds,
+                                           seconds / count * 1e9))
+
+
+if __name__ == '__main__':
+    main()
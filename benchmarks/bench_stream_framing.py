@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Compare reading a stream a byte at a time (``iter_lines(1)``, what
+TwythonStreamer used to do) with the large-buffer framing it uses now.
+The tweet fixtures under tests/tweets are served over a local socket as
+a chunked, CRLF delimited stream.
+
+    python benchmarks/bench_stream_framing.py [--messages 5000]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.server import FakeTwitterServer  # noqa: E402
+from twython.streaming.framing import iter_chunks, iter_lines  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def load_messages(count):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path, 'rb') as f:
+            # One message per line, as the Streaming API sends them
+            fixtures.append(b' '.join(f.read().split()) + b'\r\n')
+    return [fixtures[i % len(fixtures)] for i in range(count)]
+
+
+def byte_at_a_time(response, buffer_size):
+    return response.iter_lines(1)
+
+
+def large_buffer(response, buffer_size):
+    return iter_lines(iter_chunks(response, buffer_size))
+
+
+def run(server, frame, buffer_size):
+    response = requests.get(server.url('/stream.json'), stream=True)
+    start = time.time()
+    count = sum(1 for line in frame(response, buffer_size) if line)
+    seconds = time.time() - start
+    response.close()
+    return count, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000,
+                        help='messages sent on the stream')
+    parser.add_argument('--buffer-size', type=int, default=16384,
+                        help='read size used by the large-buffer framing')
+    args = parser.parse_args()
+
+    messages = load_messages(args.messages)
+    total_bytes = sum(len(m) for m in messages)
+
+    with FakeTwitterServer() as server:
+        server.add('GET', '/stream.json', body=messages)
+
+        print('%d messages, %d bytes\n' % (len(messages), total_bytes))
+        print('%-16s %10s %12s %12s' % ('framing', 'seconds', 'msgs/s', 'MB/s'))
+
+        for name, frame in (('iter_lines(1)', byte_at_a_time),
+                            ('large buffer', large_buffer)):
+            count, seconds = run(server, frame, args.buffer_size)
+            assert count == len(messages), (name, count)
+            print('%-16s %10.3f %12.0f %12.1f' % (
+                name, seconds, count / seconds, total_bytes / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    main()
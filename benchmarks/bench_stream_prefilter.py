@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Compare decoding every stream message and then dropping the unwanted ones
+with rejecting them from their raw bytes first (StreamPrefilter). The tweet
+fixtures under tests/tweets are mixed with delete notices, and a share of
+them is relabelled with another language.
+
+    python benchmarks/bench_stream_prefilter.py [--number 50] [--keep 0.2]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython.compat import get_json_loads  # noqa: E402
+from twython.streaming import StreamPrefilter  # noqa: E402
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def load_messages(keep):
+    tweets = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path, 'rb') as f:
+            tweet = b''.join(line.strip() for line in f.read().splitlines())
+        if b'"lang":"en"' in tweet:
+            tweets.append(tweet)
+
+    messages = []
+    for i in range(1000):
+        if i % 4 == 0:
+            messages.append(b'{"delete":{"status":{"id":%d,"id_str":"%d"}}}' % (i, i))
+            continue
+        tweet = tweets[i % len(tweets)]
+        if (i % 100) >= keep * 100:
+            tweet = tweet.replace(b'"lang":"en"', b'"lang":"ja"')
+        messages.append(tweet)
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=50,
+                        help='times the 1000 messages are processed')
+    parser.add_argument('--keep', type=float, default=0.2,
+                        help='share of the tweets in the wanted language')
+    args = parser.parse_args()
+
+    messages = load_messages(args.keep)
+    loads = get_json_loads()
+    prefilter = StreamPrefilter(languages=['en'], drop_types=['delete'])
+
+    def decode_then_drop():
+        return [data for data in map(loads, messages)
+                if 'delete' not in data and data.get('lang') == 'en']
+
+    def prefilter_then_decode():
+        return [data for data in map(loads, filter(prefilter, messages))
+                if data.get('lang') == 'en']
+
+    kept = len(decode_then_drop())
+    assert kept == len(prefilter_then_decode())
+    print('%d messages, %d kept\n' % (len(messages), kept))
+    print('%-24s %10s' % ('', 'seconds'))
+    for name, run in (('decode, then drop', decode_then_drop),
+                      ('prefilter, then decode', prefilter_then_decode)):
+        seconds = min(timeit.repeat(run, number=args.number, repeat=3))
+        print('%-24s %10.3f' % (name, seconds))
+
+
+if __name__ == '__main__':
+    main()
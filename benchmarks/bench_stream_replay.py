@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the throughput of TwythonStreamer end to end (framing, prefilter,
+decoding, handlers) by replaying a stream recording as fast as possible.
+Without --recording, one is made from the tweet fixtures under tests/tweets,
+mixed with delete notices and keep-alives, so runs are reproducible.
+
+    python benchmarks/bench_stream_replay.py [--recording FILE] [--number 3]
+
+Record a live stream to replay with:
+
+    streamer = MyStreamer(..., recorder=StreamRecorder('stream.rec'))
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from twython.streaming import (  # noqa: E402
+    StreamPrefilter, StreamRecorder, StreamReplay, TwythonStreamer
+)
+
+TWEETS = os.path.join(os.path.dirname(__file__), '..', 'tests', 'tweets')
+
+
+def make_recording(messages=20000, chunk_size=16384):
+    tweets = []
+    for path in sorted(glob.glob(os.path.join(TWEETS, '*.json'))):
+        with open(path, 'rb') as f:
+            tweets.append(b''.join(line.strip() for line in f.read().splitlines()))
+
+    body = []
+    for i in range(messages):
+        if i % 4 == 0:
+            body.append(b'{"delete":{"status":{"id":%d,"id_str":"%d"}}}' % (i, i))
+        else:
+            body.append(tweets[i % len(tweets)])
+        if i % 500 == 0:
+            body.append(b'')
+    body = b'\r\n'.join(body) + b'\r\n'
+
+    f = io.BytesIO()
+    recorder = StreamRecorder(f)
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    for _ in recorder.record(chunks):
+        pass
+    return f.getvalue()
+
+
+class CountingStreamer(TwythonStreamer):
+    def __init__(self, **kwargs):
+        super(CountingStreamer, self).__init__(
+            'app_key', 'app_secret', 'oauth_token', 'oauth_token_secret',
+            **kwargs)
+        self.count = 0
+
+    def on_success(self, data):
+        self.count += 1
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recording', help='a file made with StreamRecorder')
+    parser.add_argument('--number', type=int, default=3,
+                        help='times the recording is replayed, best is kept')
+    args = parser.parse_args()
+
+    if args.recording:
+        with open(args.recording, 'rb') as f:
+            recording = f.read()
+    else:
+        recording = make_recording()
+
+    configs = (
+        ('inline', {}),
+        ('workers=2', {'workers': 2}),
+        ('prefilter', {'prefilter': StreamPrefilter(drop_types=['delete'])}),
+    )
+    print('%d bytes recorded\n' % len(recording))
+    print('%-12s %10s %10s %12s' % ('', 'messages', 'seconds', 'messages/s'))
+    for name, kwargs in configs:
+        best = None
+        for _ in range(args.number):
+            streamer = CountingStreamer(**kwargs)
+            start = time.time()
+            streamer.replay(StreamReplay(io.BytesIO(recording)), speed=None)
+            seconds = time.time() - start
+            if best is None or seconds < best:
+                best = seconds
+        print('%-12s %10d %10.3f %12.0f' % (name, streamer.count, best,
+                                            streamer.count / best))
+
+
+if __name__ == '__main__':
+    main()
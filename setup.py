@@ -13,7 +13,8 @@ __version__ = '3.9.1'
 
 packages = [
     'twython',
-    'twython.streaming'
+    'twython.streaming',
+    'twython.aio'
 ]
 
 if sys.argv[-1] == 'publish':
@@ -24,6 +25,9 @@ setup(
     name='twython',
     version=__version__,
     install_requires=['requests>=2.1.0', 'requests_oauthlib>=0.4.0'],
+    extras_require={
+        'async': ['aiohttp>=3.3.0; python_version>="3.7"'],
+    },
     python_requires='>=3.5',
     author='Ryan McGrath',
     author_email='ryan@rymc.io',
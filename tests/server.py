@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from twython.compat import urlsplit
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeTwitterServer(object):
+    """A local HTTP server that replays canned responses, for tests that
+    need a real socket rather than a mocked transport.
+
+    Responses are registered per (method, path). A body can be bytes or a
+    list of bytes; a list is sent with chunked transfer encoding, one
+    chunk per item, the way the Streaming API sends messages.
+    """
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                path = urlsplit(self.path).path
+                server.requests.append({
+                    'method': self.command,
+                    'path': path,
+                    'url': self.path,
+                    'headers': dict(self.headers),
+                    'body': body,
+                })
+
+                queue = server.responses.get((self.command, path))
+                if not queue:
+                    status, headers, body = 404, {}, b'{"errors":[{"message":"Not found"}]}'
+                elif len(queue) > 1:
+                    status, headers, body = queue.pop(0)
+                else:
+                    status, headers, body = queue[0]
+
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                if isinstance(body, list):
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for chunk in body:
+                        if callable(chunk):
+                            chunk()
+                            continue
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                        self.wfile.flush()
+                    self.wfile.write(b'0\r\n\r\n')
+                else:
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+        self.httpd = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       kwargs={'poll_interval': 0.05})
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @property
+    def api_url(self):
+        """Value for ``Twython.api_url`` that points at this server"""
+        return 'http://127.0.0.1:%d/%%s' % self.port
+
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self.port, path)
+
+    def add(self, method, path, body=b'{}', status=200, headers=None):
+        """Queue a response; the last one queued for a path is repeated"""
+        if not isinstance(body, (bytes, list)):
+            body = body.encode('utf-8')
+        self.responses.setdefault((method, path), []).append(
+            (status, headers or {}, body))
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from twython import TwythonError, TwythonRateLimitError
+
+from .config import unittest
+from .server import FakeTwitterServer
+
+try:
+    from twython.aio import AsyncStream, AsyncTwython, AsyncTwythonStreamer
+except (ImportError, SyntaxError, TwythonError):  # pragma: no cover
+    # twython.aio needs Python 3.7
+    AsyncStream = AsyncTwython = AsyncTwythonStreamer = None
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+# Kept to Python 3.5 syntax, so the module is skipped rather than failing
+# to compile there
+async def collect(iterable):
+    items = []
+    async for item in iterable:
+        items.append(item)
+    return items
+
+
+class AsyncRange(object):
+    def __init__(self, stop):
+        self.numbers = iter(range(stop))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.numbers)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@unittest.skipIf(AsyncTwython is None, 'twython.aio needs Python 3.7')
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncTwythonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTwitterServer().__enter__()
+        self.api = AsyncTwython('', '', '', '')
+        self.api.api_url = self.server.api_url
+
+    def tearDown(self):
+        run(self.api.close())
+        self.server.__exit__()
+
+    def test_endpoint_is_awaitable(self):
+        """Test that EndpointsMixin methods return awaitables"""
+        self.server.add('GET', '/1.1/statuses/show/20.json', '{"id_str": "20"}')
+
+        async def go():
+            return await self.api.show_status(id=20)
+
+        self.assertEqual({'id_str': '20'}, run(go()))
+        self.assertEqual('GET', self.server.requests[0]['method'])
+        self.assertIn('OAuth', self.server.requests[0]['headers']['Authorization'])
+
+    def test_post_sends_form_data(self):
+        """Test that POST params are sent in the body"""
+        self.server.add('POST', '/1.1/statuses/update.json', '{"id_str": "1"}')
+
+        run(self.api.update_status(status='hello async'))
+
+        self.assertIn(b'status=hello+async', self.server.requests[0]['body'])
+
+    def test_concurrent_requests(self):
+        """Test that many calls can be awaited together on one loop"""
+        self.server.add('GET', '/1.1/users/show.json', '{"screen_name": "a"}')
+
+        async def go():
+            calls = [self.api.show_user(screen_name='a') for _ in range(10)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual(10, len(run(go())))
+        self.assertEqual(10, len(self.server.requests))
+
+    def test_rate_limit_raises(self):
+        """Test that a 429 raises TwythonRateLimitError"""
+        self.server.add('GET', '/1.1/statuses/home_timeline.json',
+                        '{"errors":[{"message":"Rate Limit"}]}', status=429,
+                        headers={'X-Rate-Limit-Reset': '1'})
+
+        async def go():
+            try:
+                await self.api.get_home_timeline()
+            finally:
+                self.assertEqual(429, self.api._last_call['status_code'])
+
+        self.assertRaises(TwythonRateLimitError, run, go())
+
+    def test_lastfunction_header(self):
+        """Test that response headers are stashed for get_lastfunction_header"""
+        self.server.add('GET', '/1.1/statuses/home_timeline.json', '[]',
+                        headers={'x-rate-limit-remaining': '37'})
+
+        async def go():
+            await self.api.get_home_timeline()
+            return self.api.get_lastfunction_header('x-rate-limit-remaining')
+
+        self.assertEqual('37', run(go()))
+
+    def test_cursor_pages_by_cursor(self):
+        """Test that the async cursor follows next_cursor_str"""
+        path = '/1.1/followers/ids.json'
+        self.server.add('GET', path, '{"ids": [1, 2], "next_cursor_str": "5"}')
+        self.server.add('GET', path, '{"ids": [3], "next_cursor_str": "0"}')
+
+        async def go():
+            return await collect(self.api.cursor(self.api.get_followers_ids,
+                                                 screen_name='a'))
+
+        self.assertEqual([1, 2, 3], run(go()))
+        self.assertIn('cursor=5', self.server.requests[1]['url'])
+
+    def test_cursor_pages_by_id(self):
+        """Test that the async cursor sets max_id from the last tweet"""
+        path = '/1.1/statuses/user_timeline.json'
+        self.server.add('GET', path, '[{"id_str": "10"}, {"id_str": "9"}]')
+        self.server.add('GET', path, '[]')
+
+        async def go():
+            return await collect(self.api.cursor(self.api.get_user_timeline))
+
+        self.assertEqual(2, len(run(go())))
+        self.assertIn('max_id=8', self.server.requests[1]['url'])
+
+    def test_cursor_requires_twython_function(self):
+        """Test that the async cursor rejects non Twython functions"""
+        async def go():
+            async for _ in self.api.cursor(lambda x: x):
+                pass
+
+        self.assertRaises(TwythonError, run, go())
+
+    def test_lookup_user_bulk(self):
+        """Test that bulk lookups are async generators taking async ids"""
+        users = ','.join('{"id_str": "%d"}' % i for i in range(150) if i != 42)
+        self.server.add('GET', '/1.1/users/lookup.json', '[%s]' % users)
+
+        async def go():
+            return await collect(self.api.lookup_user_bulk(
+                AsyncRange(150), concurrency=2))
+
+        results = run(go())
+        self.assertEqual(list(range(150)), [user_id for user_id, _ in results])
+        self.assertIsNone(results[42][1])
+        self.assertEqual({'id_str': '149'}, results[149][1])
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_lookup_user_bulk_hands_back_last_call(self):
+        """Test that the headers of the lookup tasks reach the consumer"""
+        self.server.add('GET', '/1.1/users/lookup.json', '[]',
+                        headers={'x-rate-limit-remaining': '12'})
+
+        async def go():
+            async for _ in self.api.lookup_user_bulk(range(150), concurrency=2):
+                pass
+            return self.api.get_lastfunction_header('x-rate-limit-remaining')
+
+        self.assertEqual('12', run(go()))
+
+    def test_last_call_is_kept_per_client(self):
+        """Test that a client never reads another client's last call"""
+        self.server.add('GET', '/1.1/users/show.json', '{}')
+        other = AsyncTwython('', '', '', '')
+
+        async def go():
+            await self.api.show_user(screen_name='a')
+            try:
+                other.get_lastfunction_header('x-task')
+            finally:
+                await other.close()
+
+        self.assertRaises(TwythonError, run, go())
+
+    def test_lookup_status_bulk_handles_404(self):
+        """Test that a 404 reports every tweet of the batch missing"""
+        self.server.add('POST', '/1.1/statuses/lookup.json',
+                        '{"errors":[{"message":"Not found"}]}', status=404)
+
+        async def go():
+            return await collect(self.api.lookup_status_bulk([1, 2]))
+
+        self.assertEqual([(1, None), (2, None)], run(go()))
+
+    def test_cursor_rejects_sync_options(self):
+        """Test that prefetch and stream_items raise instead of being sent"""
+        for options in ({'prefetch': 2}, {'stream_items': True}):
+            async def go():
+                async for _ in self.api.cursor(self.api.get_followers_ids,
+                                               **options):
+                    pass
+
+            self.assertRaises(TwythonError, run, go())
+        self.assertEqual([], self.server.requests)
+
+    def test_connection_error_raises_twython_error(self):
+        """Test that transport errors are raised as TwythonError"""
+        self.api.api_url = 'http://127.0.0.1:1/%s'
+
+        self.assertRaises(TwythonError, run, self.api.get_home_timeline())
+
+    def test_last_call_is_kept_per_task(self):
+        """Test that concurrent tasks read their own last call headers"""
+        self.server.add('GET', '/1.1/users/show.json', '{}', headers={'x-task': 'a'})
+        self.server.add('GET', '/1.1/users/show.json', '{}', headers={'x-task': 'b'})
+
+        async def call():
+            await self.api.show_user(screen_name='a')
+            await asyncio.sleep(0.05)
+            return self.api.get_lastfunction_header('x-task')
+
+        async def go():
+            return await asyncio.gather(call(), call())
+
+        self.assertEqual(['a', 'b'], sorted(run(go())))
+
+
+@unittest.skipIf(AsyncTwython is None, 'twython.aio needs Python 3.7')
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncTwythonStreamerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTwitterServer().__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_handlers_are_awaited(self):
+        """Test that awaiting a stream runs coroutine handlers"""
+        received = []
+
+        class MyStreamer(AsyncTwythonStreamer):
+            async def on_success(self, data):
+                await asyncio.sleep(0)
+                received.append(data)
+                if data.get('id') == 2:
+                    self.disconnect()
+                return True
+
+            def on_delete(self, data):
+                received.append('deleted')
+
+        self.server.add('POST', '/stream.json', body=[
+            b'{"id": 1}\r\n\r\n{"delete"', b': {}}\r\n{"id": 2}\r\n'])
+
+        async def go():
+            async with MyStreamer('a', 'b', 'c', 'd') as streamer:
+                await streamer._request(self.server.url('/stream.json'), 'POST',
+                                        params={'track': 'twitter'})
+
+        run(go())
+
+        self.assertEqual(received, [{'id': 1}, {'delete': {}}, 'deleted', {'id': 2}])
+        self.assertEqual(b'track=twitter', self.server.requests[0]['body'])
+
+    def test_async_iteration(self):
+        """Test that a stream can be consumed with async for"""
+        self.server.add('GET', '/stream.json', body=[
+            b'11\r\n{"id": 1}\r\n', b'11\r\n{"id": 2}\r\n'])
+
+        async def go():
+            messages = []
+            async with AsyncTwythonStreamer('a', 'b', 'c', 'd') as streamer:
+                stream = streamer._request(self.server.url('/stream.json'),
+                                           params={'delimited': 'length'})
+                async for data in stream:
+                    messages.append(data)
+                    if len(messages) == 2:
+                        streamer.disconnect()
+            return messages
+
+        self.assertEqual(run(go()), [{'id': 1}, {'id': 2}])
+
+    def test_error_status_retries(self):
+        """Test that error statuses call on_error and give up after retry_count"""
+        errors = []
+
+        class MyStreamer(AsyncTwythonStreamer):
+            async def on_error(self, status_code, data, headers=None):
+                errors.append(status_code)
+
+        self.server.add('GET', '/stream.json', body=b'{}', status=503)
+
+        async def go():
+            async with MyStreamer('a', 'b', 'c', 'd', retry_count=2,
+                                  retry_in=0) as streamer:
+                await streamer._request(self.server.url('/stream.json'))
+                return streamer.connected
+
+        self.assertFalse(run(go()))
+        self.assertEqual(errors, [503, 503, 503])
+
+    def test_statuses_return_streams(self):
+        """Test that the statuses methods return awaitable streams"""
+        streamer = AsyncTwythonStreamer('a', 'b', 'c', 'd')
+        stream = streamer.statuses.sample(language='en')
+        self.assertIsInstance(stream, AsyncStream)
+        self.assertEqual(stream.params, {'language': 'en'})
+        self.assertIn('statuses/sample.json', stream.url)
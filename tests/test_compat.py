@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from twython.compat import get_json_loads, JSON_BACKENDS
+
+from .config import unittest
+
+
+class JSONBackendTestCase(unittest.TestCase):
+    def test_default_backend_reads_bytes_and_memoryview(self):
+        """Test that the default loads accepts str, bytes and memoryview"""
+        loads = get_json_loads()
+
+        self.assertEqual({'a': 1}, loads('{"a": 1}'))
+        self.assertEqual({'a': u'é'}, loads(u'{"a": "é"}'.encode('utf-8')))
+        self.assertEqual([1], loads(memoryview(b'x[1]x')[1:-1]))
+
+    def test_auto_picks_an_installed_backend(self):
+        """Test that 'auto' returns a working backend"""
+        self.assertEqual({'a': [1, 2]}, get_json_loads('auto')(b'{"a": [1, 2]}'))
+
+    def test_named_backends(self):
+        """Test every installed named backend decodes bytes the same way"""
+        for name in JSON_BACKENDS:
+            try:
+                loads = get_json_loads(name)
+            except ImportError:
+                continue
+            self.assertEqual({'id': 1}, loads(b'{"id": 1}'), name)
+
+    def test_callable_backend_is_used_as_is(self):
+        """Test that a callable is returned unchanged"""
+        self.assertIs(len, get_json_loads(len))
+
+    def test_unknown_backend_raises(self):
+        """Test that an unknown backend name raises ValueError"""
+        self.assertRaises(ValueError, get_json_loads, 'yaml')
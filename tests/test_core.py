@@ -4,9 +4,13 @@ from twython import Twython, TwythonError, TwythonAuthError, TwythonRateLimitErr
 from .config import unittest
 
 import responses
+import json
 import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
 
-from twython.compat import is_py2
+from twython.compat import is_py2, parse_qsl, urlsplit
 if is_py2:
     from StringIO import StringIO
 else:
@@ -310,3 +314,247 @@ class TwythonAPITestCase(unittest.TestCase):
         self.assertRaises(TypeError, init_and_iterate_cursor, non_function)
         self.assertRaises(TwythonError, init_and_iterate_cursor, non_twython_function)
 
+
+    @responses.activate
+    def test_cursor_prefetch_yields_all_pages_in_order(self):
+        """Test that cursor() with prefetch returns the same results in order"""
+        url = self.get_url('followers/ids')
+        responses.add(responses.GET, url, body='{"ids": [1, 2], "next_cursor_str": "5"}')
+        responses.add(responses.GET, url, body='{"ids": [3, 4], "next_cursor_str": "7"}')
+        responses.add(responses.GET, url, body='{"ids": [5], "next_cursor_str": "0"}')
+
+        results = list(self.api.cursor(self.api.get_followers_ids, prefetch=2))
+
+        self.assertEqual([1, 2, 3, 4, 5], results)
+        self.assertEqual(3, len(responses.calls))
+        self.assertIn('cursor=7', responses.calls[2].request.url)
+
+    @responses.activate
+    def test_cursor_prefetch_requests_next_page_ahead(self):
+        """Test that cursor() with prefetch requests the next page before it is consumed"""
+        url = self.get_url('statuses/user_timeline')
+        responses.add(responses.GET, url, body='[{"id_str": "10"}]')
+        responses.add(responses.GET, url, body='[{"id_str": "8"}]')
+        responses.add(responses.GET, url, body='[]')
+
+        cursor = self.api.cursor(self.api.get_user_timeline, prefetch=1)
+        self.assertEqual({'id_str': '10'}, next(cursor))
+
+        for _ in range(100):
+            if len(responses.calls) >= 2:
+                break
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(responses.calls), 2)
+        self.assertIn('max_id=9', responses.calls[1].request.url)
+
+        self.assertEqual([{'id_str': '8'}], list(cursor))
+
+    @responses.activate
+    def test_cursor_prefetch_raises_errors_in_consumer(self):
+        """Test that errors on the prefetch thread are raised to the caller"""
+        url = self.get_url('followers/ids')
+        responses.add(responses.GET, url, body='{"ids": [1], "next_cursor_str": "5"}')
+        responses.add(responses.GET, url, body='{"errors":[{"message":"Rate Limit"}]}', status=429)
+
+        cursor = self.api.cursor(self.api.get_followers_ids, prefetch=1)
+
+        self.assertEqual(1, next(cursor))
+        self.assertRaises(TwythonRateLimitError, next, cursor)
+
+    @responses.activate
+    def test_cursor_prefetch_hands_back_last_call(self):
+        """Test that the headers of prefetched pages reach the consuming thread"""
+        url = self.get_url('followers/ids')
+        responses.add(responses.GET, url, body='{"ids": [1], "next_cursor_str": "5"}',
+                      headers={'x-page': '1'})
+        responses.add(responses.GET, url, body='{"ids": [2], "next_cursor_str": "0"}',
+                      headers={'x-page': '2'})
+
+        cursor = self.api.cursor(self.api.get_followers_ids, prefetch=1)
+
+        self.assertEqual(1, next(cursor))
+        self.assertEqual('1', self.api.get_lastfunction_header('x-page'))
+        self.assertEqual(2, next(cursor))
+        self.assertEqual('2', self.api.get_lastfunction_header('x-page'))
+
+    @responses.activate
+    def test_lookup_user_bulk_hands_back_last_call(self):
+        """Test that the headers of concurrent lookups reach the consuming thread"""
+        responses.add(responses.GET, self.get_url('users/lookup'), body='[]',
+                      headers={'x-rate-limit-remaining': '12'})
+
+        list(self.api.lookup_user_bulk(range(150), concurrency=2))
+
+        self.assertEqual('12', self.api.get_lastfunction_header('x-rate-limit-remaining'))
+
+    @responses.activate
+    def test_lookup_user_bulk_batches_and_reports_missing(self):
+        """Test that lookup_user_bulk() splits ids into batches of 100 and keeps input order"""
+        url = self.get_url('users/lookup')
+
+        def lookup_callback(request):
+            ids = dict(parse_qsl(urlsplit(request.url).query))['user_id'].split(',')
+            users = [{'id_str': i} for i in ids if i != '42']
+            return (200, {}, json.dumps(users))
+
+        responses.add_callback(responses.GET, url, callback=lookup_callback)
+
+        results = list(self.api.lookup_user_bulk(iter(range(250)), concurrency=3))
+
+        self.assertEqual(3, len(responses.calls))
+        self.assertEqual(list(range(250)), [user_id for user_id, _ in results])
+        self.assertIsNone(results[42][1])
+        self.assertEqual({'id_str': '249'}, results[249][1])
+
+    @responses.activate
+    def test_lookup_user_bulk_matches_screen_names_case_insensitively(self):
+        """Test that lookup_user_bulk() matches screen names regardless of case"""
+        url = self.get_url('users/lookup')
+        responses.add(responses.GET, url, body='[{"id_str": "1", "screen_name": "Twython"}]')
+
+        results = list(self.api.lookup_user_bulk(['twython', 'nobody'], key='screen_name'))
+
+        self.assertEqual([('twython', {'id_str': '1', 'screen_name': 'Twython'}), ('nobody', None)], results)
+        self.assertIn('screen_name=twython%2Cnobody', responses.calls[0].request.url)
+
+    @responses.activate
+    def test_lookup_user_bulk_handles_404_for_all_missing(self):
+        """Test that lookup_user_bulk() reports every user missing on a 404"""
+        url = self.get_url('users/lookup')
+        responses.add(responses.GET, url, body='{"errors":[{"code":17,"message":"No user matches"}]}', status=404)
+
+        self.assertEqual([(1, None), (2, None)], list(self.api.lookup_user_bulk([1, 2])))
+
+    @responses.activate
+    def test_lookup_status_bulk_posts_batches(self):
+        """Test that lookup_status_bulk() posts comma separated ids"""
+        url = self.get_url('statuses/lookup')
+        responses.add(responses.POST, url, body='[{"id_str": "2"}]')
+
+        results = list(self.api.lookup_status_bulk([1, 2], trim_user=True))
+
+        self.assertEqual([(1, None), (2, {'id_str': '2'})], results)
+        self.assertIn(b'id=1%2C2', responses.calls[0].request.body)
+        self.assertIn(b'trim_user=true', responses.calls[0].request.body)
+
+    def test_client_args_size_connection_pool(self):
+        """Test that pool client_args mount a sized HTTPAdapter on the session"""
+        api = Twython('', '', '', '', client_args={'pool_connections': 4,
+                                                   'pool_maxsize': 32,
+                                                   'pool_block': True})
+
+        adapter = api.client.get_adapter('https://api.twitter.com/1.1/')
+        self.assertEqual(32, adapter._pool_maxsize)
+        self.assertEqual(4, adapter._pool_connections)
+        self.assertTrue(adapter._pool_block)
+        self.assertNotIn('pool_maxsize', api.client_args)
+
+    def test_client_args_share_adapters_between_instances(self):
+        """Test that an adapter passed in client_args is shared, per host"""
+        adapter = HTTPAdapter(pool_maxsize=50)
+        upload_adapter = HTTPAdapter(pool_maxsize=2)
+        adapters = {'https://': adapter, 'https://upload.twitter.com': upload_adapter}
+
+        api = Twython('a', 'b', 'c', 'd', client_args={'adapters': adapters})
+        other_api = Twython('e', 'f', 'g', 'h', client_args={'adapters': adapters})
+
+        self.assertIs(adapter, api.client.get_adapter('https://api.twitter.com/1.1/'))
+        self.assertIs(adapter, other_api.client.get_adapter('https://api.twitter.com/1.1/'))
+        self.assertIs(upload_adapter, api.client.get_adapter('https://upload.twitter.com/1.1/'))
+
+    def test_client_args_keep_alive(self):
+        """Test that keep_alive=False asks the server to close connections"""
+        api = Twython('', '', '', '', client_args={'keep_alive': False})
+
+        self.assertEqual('close', api.client.headers['Connection'])
+
+    @responses.activate
+    def test_last_call_is_kept_per_thread(self):
+        """Test that threads sharing a client read their own last call headers"""
+        url = self.get_url('statuses/home_timeline')
+
+        def callback(request):
+            count = dict(parse_qsl(urlsplit(request.url).query))['count']
+            return (200, {'x-rate-limit-remaining': count}, '[]')
+
+        responses.add_callback(responses.GET, url, callback=callback)
+
+        barrier = threading.Barrier(4)
+        seen = {}
+
+        def worker(count):
+            self.api.get_home_timeline(count=count)
+            barrier.wait()
+            seen[count] = self.api.get_lastfunction_header('x-rate-limit-remaining')
+
+        threads = [threading.Thread(target=worker, args=(str(n),)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(dict((str(n), str(n)) for n in range(4)), seen)
+        self.assertRaises(TwythonError, self.api.get_lastfunction_header, 'x-rate-limit-remaining')
+
+    @responses.activate
+    def test_last_call_content_is_opt_in(self):
+        """Test that the response body is only kept when store_last_content is set"""
+        url = self.get_url('statuses/home_timeline')
+        responses.add(responses.GET, url, body='[]')
+
+        self.api.get_home_timeline()
+        self.assertIsNone(self.api._last_call['content'])
+
+        api = Twython('', '', '', '', store_last_content=True)
+        api.get_home_timeline()
+        self.assertEqual('[]', api._last_call['content'])
+
+    @responses.activate
+    def test_cursor_stream_items_by_cursor(self):
+        """Test that cursor() with stream_items pages using the streamed metadata"""
+        url = self.get_url('followers/ids')
+        responses.add(responses.GET, url, body='{"ids": [1, 2], "next_cursor_str": "5"}', stream=True)
+        responses.add(responses.GET, url, body='{"ids": [3], "next_cursor_str": "0"}', stream=True)
+
+        results = list(self.api.cursor(self.api.get_followers_ids, stream_items=True))
+
+        self.assertEqual([1, 2, 3], results)
+        self.assertIn('cursor=5', responses.calls[1].request.url)
+
+    @responses.activate
+    def test_cursor_stream_items_by_id(self):
+        """Test that cursor() with stream_items pages using the last streamed tweet"""
+        url = self.get_url('statuses/user_timeline')
+        responses.add(responses.GET, url, body='[{"id_str": "10"}, {"id_str": "9"}]', stream=True)
+        responses.add(responses.GET, url, body='[]', stream=True)
+
+        pages = list(list(page) for page in self.api.cursor(self.api.get_user_timeline,
+                                                            return_pages=True, stream_items=True))
+
+        self.assertEqual([[{'id_str': '10'}, {'id_str': '9'}], []], pages)
+        self.assertIn('max_id=8', responses.calls[1].request.url)
+
+    @responses.activate
+    def test_cursor_stream_items_raises_api_errors(self):
+        """Test that cursor() with stream_items still raises on API errors"""
+        url = self.get_url('followers/ids')
+        responses.add(responses.GET, url, body='{"errors":[{"message":"Rate Limit"}]}', status=429)
+
+        cursor = self.api.cursor(self.api.get_followers_ids, stream_items=True)
+        self.assertRaises(TwythonRateLimitError, next, cursor)
+
+    @responses.activate
+    def test_request_uses_json_backend(self):
+        """Test that responses are decoded with the client's json_backend"""
+        url = self.get_url('statuses/show')
+        responses.add(responses.GET, url, body='{"id": 1}')
+        seen = []
+
+        def loads(content):
+            seen.append(content)
+            return json.loads(content)
+
+        api = Twython('', '', '', '', json_backend=loads)
+
+        self.assertEqual({'id': 1}, api.request('statuses/show'))
+        self.assertEqual([b'{"id": 1}'], seen)
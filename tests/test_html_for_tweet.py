@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import gc
+import pickle
+import weakref
 
-from twython import Twython, TwythonError
+from twython import RenderCache, Twython, TwythonError, TweetRenderer
 
 from .config import unittest
 
@@ -128,3 +131,145 @@ class TestHtmlForTweetTestCase(unittest.TestCase):
                 u"""My aunt and uncle in a very ill humour one with another, but I made shift with much ado to keep them from scolding.""",
                 tweet_text)
 
+
+    def test_overlapping_entities(self):
+        """Entities that overlap are still spliced in from the last one."""
+        tweet_object = {
+            'text': '#one #two',
+            'entities': {'hashtags': [{'text': 'one', 'indices': [0, 4]},
+                                      {'text': 'two', 'indices': [3, 8]}]},
+        }
+        tweet_text = self.api.html_for_tweet(tweet_object)
+
+        self.assertEqual(
+                u"""<a href="https://twitter.com/search?q=%23one" class="twython-hashtag">#one</a>a href="https://twitter.com/search?q=%23two" class="twython-hashtag">#two</a>o""",
+                tweet_text)
+
+    def test_html_for_tweets(self):
+        """Test the batch API renders each tweet, in order, as html_for_tweet"""
+        tweets = [self.load_tweet(name) for name in
+                  ('basic', 'reply', 'quoted', 'media', 'symbols')] * 3
+        expected = [self.api.html_for_tweet(tweet, use_expanded_url=True,
+                                            expand_quoted_status=True)
+                    for tweet in tweets]
+
+        for processes in (0, 2):
+            tweet_html = self.api.html_for_tweets(iter(tweets),
+                                                  use_expanded_url=True,
+                                                  expand_quoted_status=True,
+                                                  processes=processes,
+                                                  batch_size=4)
+            self.assertEqual(list(tweet_html), expected)
+
+
+class TweetRendererTestCase(unittest.TestCase):
+    def load_tweet(self, name):
+        with open(os.path.join(os.path.dirname(__file__), 'tweets',
+                               '%s.json' % name)) as f:
+            return json.load(f)
+
+    def test_default_templates(self):
+        """Test the default renderer renders as html_for_tweet"""
+        tweet_object = self.load_tweet('quoted')
+        self.assertEqual(
+            TweetRenderer(expand_quoted_status=True).render(tweet_object),
+            Twython.html_for_tweet(tweet_object, expand_quoted_status=True))
+
+    def test_custom_templates(self):
+        """Test custom templates and escaping are used for every entity"""
+        renderer = TweetRenderer(templates={
+            'mention': '<a href="/u/{screen_name}" title="{name}">@{screen_name}</a>',
+            'hashtag': '<b>#{text}</b>',
+            'url': '<a href="{url}">{shown} 100%</a>',
+            'prefix': '<p>{html}</p>',
+        }, escape=lambda value: value.upper())
+        tweet_text = renderer.render(self.load_tweet('entities_with_prefix'))
+
+        self.assertTrue(tweet_text.startswith(
+            u'<p><a href="/u/PHILGYFORD" title="PHIL GYFORD">@PHILGYFORD</a> </p>'))
+        self.assertTrue(u'<b>#HASHTAG</b>' in tweet_text)
+        self.assertTrue(u'<a href="HTTPS://T.CO/SKW4J3A8SZ">EXAMPLE.ORG 100%</a>' in tweet_text)
+
+    def test_invalid_template(self):
+        """Test unknown templates and fields are refused"""
+        self.assertRaises(ValueError, TweetRenderer, templates={'link': ''})
+        self.assertRaises(ValueError, TweetRenderer,
+                          templates={'hashtag': '{screen_name}'})
+
+
+class RenderCacheTestCase(unittest.TestCase):
+    def load_tweet(self, name):
+        with open(os.path.join(os.path.dirname(__file__), 'tweets',
+                               '%s.json' % name)) as f:
+            return json.load(f)
+
+    def test_cached_html(self):
+        """Test a retweet is served from the HTML of the tweet it retweets"""
+        retweet = self.load_tweet('retweet')
+        original = retweet['retweeted_status']
+        cache = RenderCache()
+
+        tweet_text = Twython.html_for_tweet(original, cache=cache)
+        self.assertEqual(Twython.html_for_tweet(retweet, cache=cache), tweet_text)
+        self.assertEqual(tweet_text, Twython.html_for_tweet(original))
+        self.assertEqual(cache.stats(), {'hits': 1, 'backend_hits': 0,
+                                         'misses': 1, 'hit_rate': 0.5,
+                                         'size': 1, 'maxsize': 10000})
+
+        # Other options, or other entities, are other HTML
+        Twython.html_for_tweet(original, use_expanded_url=True, cache=cache)
+        edited = dict(original, entities={'hashtags': [
+            {'text': 'My', 'indices': [0, 2]}]})
+        Twython.html_for_tweet(edited, cache=cache)
+        self.assertEqual(cache.stats()['size'], 3)
+
+    def test_least_recently_used_dropped(self):
+        """Test the cache keeps maxsize tweets, dropping the oldest used"""
+        cache = RenderCache(maxsize=2)
+        renderer = TweetRenderer(cache=cache)
+        tweets = [self.load_tweet(name) for name in ('basic', 'reply', 'media')]
+        renderer.render(tweets[0])
+        renderer.render(tweets[1])
+        renderer.render(tweets[0])
+        renderer.render(tweets[2])
+
+        self.assertIsNotNone(cache.get(cache.key(renderer, tweets[0])))
+        self.assertIsNone(cache.get(cache.key(renderer, tweets[1])))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_shared_backend(self):
+        """Test caches sharing a backend find each other's HTML"""
+        backend = {}
+        tweet = self.load_tweet('basic')
+        Twython.html_for_tweet(tweet, cache=RenderCache(backend=backend))
+        self.assertEqual(len(backend), 1)
+
+        # As sent to a process: the backend goes along, the rest doesn't
+        cache = pickle.loads(pickle.dumps(RenderCache(backend=backend)))
+        self.assertEqual(Twython.html_for_tweet(tweet, cache=cache),
+                         Twython.html_for_tweet(tweet))
+        self.assertEqual(cache.stats()['backend_hits'], 1)
+
+    def test_cache_is_not_kept(self):
+        """Test html_for_tweet(s) don't hold on to the caches given"""
+        tweet = self.load_tweet('basic')
+        cache = RenderCache()
+        Twython.html_for_tweet(tweet, cache=cache)
+        self.assertEqual(list(Twython.html_for_tweets([tweet], cache=cache)),
+                         [Twython.html_for_tweet(tweet)])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+        ref = weakref.ref(cache)
+        del cache
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_tweet_without_id(self):
+        """Test tweets without an id are rendered without the cache"""
+        cache = RenderCache()
+        tweet = {'text': '#hi', 'entities': {'hashtags': [
+            {'text': 'hi', 'indices': [0, 3]}]}}
+        Twython.html_for_tweet(tweet, cache=cache)
+        self.assertEqual(cache.stats()['misses'], 0)
+        self.assertEqual(cache.stats()['size'], 0)
+
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import json
+
+from twython import TwythonError
+from twython.jsonstream import JSONItemStream
+
+from .config import unittest
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class JSONItemStreamTestCase(unittest.TestCase):
+    def test_streams_keyed_array_and_keeps_metadata(self):
+        """Test that items of the keyed array are yielded and other keys kept"""
+        document = json.dumps({'ids': list(range(1000)), 'next_cursor_str': '42',
+                               'previous_cursor_str': '0'}).encode('utf-8')
+
+        for size in (1, 7, 4096):
+            stream = JSONItemStream(chunked(document, size), 'ids')
+            self.assertEqual(list(range(1000)), list(stream))
+            self.assertEqual('42', stream.metadata['next_cursor_str'])
+
+    def test_streams_top_level_array(self):
+        """Test that a document which is an array is streamed item by item"""
+        tweets = [{'id_str': '2', 'text': u'héllo ] }'}, {'id_str': '1', 'text': '"quoted"'}]
+        document = json.dumps(tweets, ensure_ascii=False).encode('utf-8')
+
+        self.assertEqual(tweets, list(JSONItemStream(chunked(document, 3))))
+
+    def test_numbers_split_across_chunks(self):
+        """Test that a number cut by a chunk boundary isn't decoded early"""
+        stream = JSONItemStream([b'{"ids": [12', b'34, 5', b'6]}'], 'ids')
+
+        self.assertEqual([1234, 56], list(stream))
+
+    def test_fractions_and_exponents_split_across_chunks(self):
+        """Test that a number cut after its point or exponent isn't decoded
+        early"""
+        self.assertEqual([1.5, 2e10, -3.25e-2],
+                         list(JSONItemStream([b'[1.', b'5, 2e', b'10, -3.2',
+                                              b'5E', b'-', b'2]'])))
+
+        stream = JSONItemStream([b'{"a": 0.', b'5, "ids": [1]}'], 'ids')
+        self.assertEqual([1], list(stream))
+        self.assertEqual({'a': 0.5}, stream.metadata)
+
+    def test_items_are_yielded_before_the_document_ends(self):
+        """Test that items come out as soon as their bytes have arrived"""
+        def chunks():
+            yield b'{"ids": [1, 2, '
+            raise AssertionError('read too far')
+
+        stream = JSONItemStream(chunks(), 'ids')
+        self.assertEqual(1, next(stream))
+
+    def test_exhaust_reads_metadata_after_array(self):
+        """Test that exhaust() completes the metadata"""
+        stream = JSONItemStream([b'{"users": [{}, {}], "next_cursor_str": "0"}'], 'users')
+
+        self.assertEqual({'next_cursor_str': '0'}, stream.exhaust())
+
+    def test_close_is_called(self):
+        """Test that the close callback runs once the document is read"""
+        closed = []
+        list(JSONItemStream([b'[]'], close=lambda: closed.append(True)))
+
+        self.assertEqual([True], closed)
+
+    def test_truncated_document_raises(self):
+        """Test that a document ending early raises a TwythonError"""
+        self.assertRaises(TwythonError, list, JSONItemStream([b'{"ids": [1, 2'], 'ids'))
+        self.assertRaises(TwythonError, list, JSONItemStream([b'{"ids": [1 2]}'], 'ids'))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from twython import Entity, Twython, TwythonStreamer, Tweet, User
+from twython import models
+
+from .config import unittest
+from .server import FakeTwitterServer
+
+
+def load_tweet(name):
+    with open(os.path.join(os.path.dirname(__file__), 'tweets',
+                           '%s.json' % name), 'rb') as f:
+        return f.read().strip()
+
+
+class ModelsTestCase(unittest.TestCase):
+    def test_decoded_on_first_access(self):
+        """Test a model keeps its JSON until a field is read"""
+        raw = load_tweet('basic')
+        tweet = Tweet.from_json(raw)
+        self.assertEqual(tweet._raw, raw)
+        self.assertIsNone(tweet._data)
+
+        self.assertEqual(tweet.id_str, json.loads(raw.decode('utf-8'))['id_str'])
+        self.assertIsNone(tweet._raw)
+        self.assertEqual(tweet.to_dict(), json.loads(raw.decode('utf-8')))
+
+    def test_nested_models(self):
+        """Test nested users, tweets and entities are models"""
+        tweet = Tweet.from_json(load_tweet('retweet'))
+        self.assertIsInstance(tweet.user, User)
+        self.assertIs(tweet.user, tweet.user)
+        self.assertIsInstance(tweet.retweeted_status, Tweet)
+        self.assertIsNone(tweet.quoted_status)
+        self.assertEqual(tweet.user.screen_name, tweet['user']['screen_name'])
+        for entity in tweet.entities['user_mentions']:
+            self.assertIsInstance(entity, Entity)
+        self.assertRaises(AttributeError, getattr, tweet, 'no_such_field')
+        self.assertRaises(AttributeError, setattr, tweet, 'text', '')
+
+    def test_mapping(self):
+        """Test models can be used where dicts of tweets were"""
+        raw = load_tweet('basic')
+        tweet = Tweet.from_json(raw)
+        data = json.loads(raw.decode('utf-8'))
+        self.assertEqual(tweet, data)
+        self.assertIn('entities', tweet)
+        self.assertEqual(sorted(tweet), sorted(data))
+        self.assertEqual(Twython.html_for_tweet(tweet),
+                         Twython.html_for_tweet(data))
+
+    def test_loads_array(self):
+        """Test the objects of an array are split apart, undecoded"""
+        tweet = load_tweet('basic')
+        user = b'{"id_str": "1", "screen_name": "a [\\"b\\"] {"}'
+        body = b' [' + tweet + b',\n' + user + b', {"id": 2}]'
+        content = models.loads(body)
+        self.assertEqual([type(item) for item in content], [Tweet, User, dict])
+        self.assertEqual(content[0]._raw, tweet)
+        self.assertEqual(content[1]._raw, user)
+        self.assertEqual(content[1].screen_name, 'a ["b"] {')
+        self.assertEqual(content, json.loads(body.decode('utf-8')))
+
+        self.assertEqual(models.loads(b'[]'), [])
+        for body in (b'[1, 2]', b'[[{}]]', b'[{}] {}', b'{"a": [{}]}'):
+            self.assertIsNone(models._split_array(body))
+
+    def test_loads_matches_wrap(self):
+        """Test raw objects are told apart by their own keys, like dicts"""
+        objects = [
+            # A list, holding its owner
+            b'{"id_str": "7", "slug": "team", "user": {"screen_name": "a"}}',
+            # Stream envelopes
+            b'{"event": "favorite", "source": {"screen_name": "a"}, '
+            b'"target_object": {"text": "", "user": {"screen_name": "b"}}}',
+            b'{"direct_message": {"text": "", "sender": {"screen_name": "a"}}}',
+            # Keys quoted in strings, or nested, don't count
+            b'{"id": 1, "note": "\\"text\\": 1, \\"user\\"", "user": {"text": ""}}',
+            b'{"text": "a", "user": {"id": 1}}',
+            b'{"id_str": "1", "screen_name": "a", "status": {"user": {}}}',
+        ]
+        content = models.loads(b'[' + b','.join(objects) + b']')
+        decoded = [json.loads(raw.decode('utf-8')) for raw in objects]
+        self.assertEqual([type(item) for item in content],
+                         [type(item) for item in models.wrap(decoded)])
+        self.assertEqual([type(item) for item in content],
+                         [dict, dict, dict, dict, Tweet, User])
+        self.assertEqual([type(models.loads_object(raw)) for raw in objects],
+                         [dict, dict, dict, dict, Tweet, User])
+        self.assertEqual(content, decoded)
+
+    def test_loads_object(self):
+        """Test tweets under statuses are wrapped, other objects kept"""
+        body = b'{"statuses": [' + load_tweet('basic') + b'], "search_metadata": {}}'
+        content = models.loads(body)
+        self.assertIsInstance(content['statuses'][0], Tweet)
+        self.assertEqual(content['search_metadata'], {})
+
+    def test_cursor(self):
+        """Test Twython(models=True) gives models from endpoints and cursor"""
+        tweets = [b'{"id_str": "%d", "text": "", "user": {"screen_name": "a"}}' % i
+                  for i in (3, 2)]
+        api = Twython('', '', '', '', models=True)
+        with FakeTwitterServer() as server:
+            api.api_url = server.url('/%s')
+            path = '/1.1/statuses/user_timeline.json'
+            server.add('GET', path, b'[' + b','.join(tweets) + b']')
+            server.add('GET', path, b'[]')
+            content = list(api.cursor(api.get_user_timeline))
+
+        self.assertEqual([tweet.id_str for tweet in content], ['3', '2'])
+        self.assertEqual(content[0].user.screen_name, 'a')
+        self.assertIn('max_id=1', server.requests[1]['url'])
+
+    def test_cursor_stream_items(self):
+        """Test items decoded as they arrive are models too"""
+        api = Twython('', '', '', '', models=True)
+        with FakeTwitterServer() as server:
+            api.api_url = server.url('/%s')
+            server.add('GET', '/1.1/search/tweets.json',
+                       b'{"statuses": [' + load_tweet('basic') + b'], '
+                       b'"search_metadata": {}}')
+            content = list(api.cursor(api.search, q='a', stream_items=True))
+
+        self.assertEqual([type(tweet) for tweet in content], [Tweet])
+
+    def test_streamer(self):
+        """Test a streamer with models=True hands tweets on as models"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data.get('id_str') == '3':
+                    self.disconnect()
+                return True
+
+            def on_delete(self, data):
+                received.append('deleted %s' % data['status']['id'])
+
+        body = [
+            b'{"id_str": "1", "text": "one", "user": {"id": 1}}\r\n',
+            b'{"delete": {"status": {"id": 2, "user_id": 1}}}\r\n',
+            b'{"id_str": "3", "text": "", "user": {"id": 1}}\r\n',
+        ]
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret',
+                                  models=True)
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertIsInstance(received[0], Tweet)
+        self.assertEqual(received[0].text, 'one')
+        self.assertEqual(received[1:3], [
+            {'delete': {'status': {'id': 2, 'user_id': 1}}}, 'deleted 2'])
+        self.assertIsInstance(received[3], Tweet)
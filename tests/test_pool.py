@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from twython import TwythonPool, TwythonError
+
+from .config import unittest
+
+import responses
+
+
+class TwythonPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = TwythonPool('app_key', 'app_secret',
+                                client_args={'pool_maxsize': 8})
+        self.pool.add_account('alice', 'alice_token', 'alice_secret')
+        self.pool.add_account('bob', 'bob_token', 'bob_secret')
+        self.url = 'https://api.twitter.com/1.1/statuses/home_timeline.json'
+
+    def test_accounts_share_one_session(self):
+        """Test that every account sends its calls over the pool's session"""
+        self.assertIs(self.pool.session, self.pool['alice'].client)
+        self.assertIs(self.pool.session, self.pool['bob'].client)
+        self.assertIsNone(self.pool.session.auth)
+        self.assertEqual(2, len(self.pool))
+        self.assertIn('alice', self.pool)
+
+    def test_clients_are_built_once(self):
+        """Test that the client of an account is cached"""
+        self.assertIs(self.pool['alice'], self.pool['alice'])
+
+    def test_unknown_account_raises(self):
+        """Test that asking for an unregistered account raises a TwythonError"""
+        self.assertRaises(TwythonError, lambda: self.pool['carol'])
+
+    @responses.activate
+    def test_calls_are_signed_per_account(self):
+        """Test that each account signs its calls with its own token"""
+        responses.add(responses.GET, self.url, body='[]')
+
+        self.pool['alice'].get_home_timeline()
+        self.pool.call('bob', 'get_home_timeline')
+
+        self.assertIn(b'oauth_token="alice_token"', responses.calls[0].request.headers['Authorization'])
+        self.assertIn(b'oauth_token="bob_token"', responses.calls[1].request.headers['Authorization'])
+
+    @responses.activate
+    def test_rate_limits_are_tracked_per_account(self):
+        """Test that choose_account routes to the account with the most calls left"""
+        responses.add(responses.GET, self.url, body='[]', adding_headers={
+            'x-rate-limit-limit': '15', 'x-rate-limit-remaining': '3',
+            'x-rate-limit-reset': '9999999999'})
+
+        self.pool['alice'].get_home_timeline()
+        self.assertEqual('bob', self.pool.choose_account('/statuses/home_timeline'))
+
+        self.pool['bob'].get_home_timeline()
+        self.pool['bob'].get_home_timeline()
+        self.assertEqual(3, self.pool['alice'].rate_limiter.remaining(self.url))
+        self.assertEqual('alice', self.pool.choose_account(self.url))
+
+    def test_remove_account(self):
+        """Test that removed accounts are forgotten"""
+        self.pool['alice']
+        self.pool.remove_account('alice')
+
+        self.assertNotIn('alice', self.pool)
+        self.assertEqual(['bob'], list(self.pool))
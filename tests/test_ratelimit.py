@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from twython import Twython, RateLimiter
+
+from .config import unittest
+
+import responses
+
+
+class FakeClock(object):
+    def __init__(self, now=1000):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def headers(limit, remaining, reset):
+    return {
+        'x-rate-limit-limit': str(limit),
+        'x-rate-limit-remaining': str(remaining),
+        'x-rate-limit-reset': str(reset),
+    }
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    url = 'https://api.twitter.com/1.1/statuses/user_timeline.json'
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(margin=0, clock=self.clock,
+                                   sleep=self.clock.sleep)
+
+    def test_get_resource(self):
+        """Test that urls map onto Twitter's rate limit resources"""
+        self.assertEqual('/statuses/show/:id', RateLimiter.get_resource(
+            'https://api.twitter.com/1.1/statuses/show/20.json'))
+        self.assertEqual('/search/tweets', RateLimiter.get_resource(
+            'https://api.twitter.com/1.1/search/tweets.json'))
+
+    def test_unknown_resource_is_not_delayed(self):
+        """Test that calls go straight through before any headers are seen"""
+        self.assertEqual(0, self.limiter.acquire(self.url))
+        self.assertIsNone(self.limiter.remaining(self.url))
+
+    def test_tokens_are_spent_then_wait_for_reset(self):
+        """Test that an empty bucket waits exactly until the window resets"""
+        self.limiter.update(self.url, headers(900, 2, 1100))
+
+        self.assertEqual(0, self.limiter.acquire(self.url))
+        self.assertEqual(0, self.limiter.acquire(self.url))
+        self.assertEqual(100, self.limiter.acquire(self.url))
+        self.assertEqual([100], self.clock.slept)
+        self.assertEqual(899, self.limiter.remaining(self.url))
+
+    def test_waiting_callers_are_spread_over_windows(self):
+        """Test that callers beyond the next window's limit wait for the one after"""
+        self.limiter.update(self.url, headers(1, 0, 1100))
+
+        self.assertEqual(100, self.limiter.reserve(self.url))
+        self.assertEqual(100 + 900, self.limiter.reserve(self.url))
+
+    def test_header_update_keeps_lower_count_in_same_window(self):
+        """Test that in-flight calls are not given back by a stale header"""
+        self.limiter.update(self.url, headers(900, 10, 1100))
+        for _ in range(5):
+            self.limiter.reserve(self.url)
+
+        self.limiter.update(self.url, headers(900, 9, 1100))
+
+        self.assertEqual(5, self.limiter.remaining(self.url))
+
+    def test_seed_from_rate_limit_status(self):
+        """Test seeding buckets from application/rate_limit_status"""
+        self.limiter.seed({'resources': {'statuses': {
+            '/statuses/user_timeline': {'limit': 900, 'remaining': 0, 'reset': 1050},
+        }}})
+
+        self.assertEqual(0, self.limiter.remaining('/statuses/user_timeline'))
+        self.assertEqual(50, self.limiter.acquire(self.url))
+
+
+class TwythonRateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(margin=0, clock=self.clock,
+                                   sleep=self.clock.sleep)
+        self.api = Twython('', '', '', '', rate_limiter=self.limiter)
+
+    @responses.activate
+    def test_request_waits_for_window_from_response_headers(self):
+        """Test that Twython waits instead of sending a call that would get a 429"""
+        url = 'https://api.twitter.com/1.1/statuses/home_timeline.json'
+        responses.add(responses.GET, url, body='[]', adding_headers=headers(15, 0, 1300))
+
+        self.api.get_home_timeline()
+        self.api.get_home_timeline()
+
+        self.assertEqual([300], self.clock.slept)
+        self.assertEqual(2, len(responses.calls))
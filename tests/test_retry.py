@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import io
+
+from twython import Twython, TwythonError, RetryPolicy
+
+from .config import unittest
+
+import requests
+import responses
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.slept = []
+        self.retried = []
+        self.policy = RetryPolicy(total=3, backoff_factor=1, clock=lambda: 1000,
+                                  sleep=self.slept.append, random=lambda: 1.0,
+                                  on_retry=lambda *args: self.retried.append(args))
+        self.api = Twython('', '', '', '', retry_policy=self.policy)
+        self.url = 'https://api.twitter.com/1.1/statuses/home_timeline.json'
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Test the backoff doubles for each retry up to max_backoff"""
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, random=lambda: 1.0)
+        self.assertEqual([1, 2, 4, 5], [policy.get_backoff(n) for n in range(4)])
+
+    @responses.activate
+    def test_get_is_retried_on_5xx(self):
+        """Test that a GET is retried after a 503 and the retries are reported"""
+        responses.add(responses.GET, self.url, status=503, body='{}')
+        responses.add(responses.GET, self.url, status=200, body='[]')
+
+        self.assertEqual([], self.api.get_home_timeline())
+        self.assertEqual([1], self.slept)
+        self.assertEqual(1, self.api.get_lastfunction_retries())
+        self.assertEqual(1, len(self.retried))
+
+    @responses.activate
+    def test_gives_up_after_total_retries(self):
+        """Test that the error is raised once the retries are used up"""
+        responses.add(responses.GET, self.url, status=500, body='{}')
+
+        self.assertRaises(TwythonError, self.api.get_home_timeline)
+        self.assertEqual([1, 2, 4], self.slept)
+        self.assertEqual(3, self.api.get_lastfunction_retries())
+
+    @responses.activate
+    def test_rate_limit_waits_for_reset(self):
+        """Test that a 429 waits exactly until X-Rate-Limit-Reset"""
+        responses.add(responses.GET, self.url, status=429, body='{}',
+                      adding_headers={'X-Rate-Limit-Reset': '1030'})
+        responses.add(responses.GET, self.url, status=200, body='[]')
+
+        self.api.get_home_timeline()
+
+        self.assertEqual([31], self.slept)
+
+    @responses.activate
+    def test_budget_stops_long_waits(self):
+        """Test that a wait beyond the per-call budget raises instead"""
+        self.policy.budget = 10
+        responses.add(responses.GET, self.url, status=429, body='{}',
+                      adding_headers={'X-Rate-Limit-Reset': '1300'})
+
+        self.assertRaises(TwythonError, self.api.get_home_timeline)
+        self.assertEqual([], self.slept)
+
+    @responses.activate
+    def test_post_is_not_retried_by_default(self):
+        """Test that POSTs are only retried when opted in"""
+        url = 'https://api.twitter.com/1.1/statuses/update.json'
+        responses.add(responses.POST, url, status=503, body='{}')
+
+        self.assertRaises(TwythonError, self.api.update_status, status='hi')
+        self.assertEqual(1, len(responses.calls))
+
+        self.policy.methods = frozenset(['GET', 'POST'])
+        responses.add(responses.POST, url, status=200, body='{}')
+        self.api.update_status(status='hi')
+        self.assertEqual([1], self.slept)
+
+    @responses.activate
+    def test_file_uploads_are_not_retried(self):
+        """Test that a POST uploading a file is not resent, even opted in"""
+        self.policy.methods = frozenset(['GET', 'POST'])
+        url = 'https://upload.twitter.com/1.1/media/upload.json'
+        responses.add(responses.POST, url, status=503, body='{}')
+
+        self.assertRaises(TwythonError, self.api.upload_media,
+                          media=io.BytesIO(b'GIF89a'))
+        self.assertEqual(1, len(responses.calls))
+        self.assertEqual([], self.slept)
+
+    def test_connection_errors_are_retried(self):
+        """Test that a RequestException is retried before being raised"""
+        with mock.patch.object(requests.Session, 'get') as get_mock:
+            get_mock.side_effect = requests.ConnectionError('connection reset')
+            self.assertRaises(TwythonError, self.api.get, self.url)
+
+        self.assertEqual(4, get_mock.call_count)
+        self.assertEqual([1, 2, 4], self.slept)
@@ -1,8 +1,26 @@
-from twython import TwythonStreamer, TwythonStreamError
+import gzip
+import io
+import json
+import threading
+import time
+
+from twython import (
+    StreamPrefilter, StreamRecorder, StreamReplay, TwythonError,
+    TwythonStreamer, TwythonStreamError
+)
+from twython.streaming.backoff import (
+    HTTP_ERROR, NETWORK_ERROR, RATE_LIMITED, StreamBackoff
+)
+from twython.streaming.decode import ProcessDecoder
+from twython.streaming.dispatch import StreamDispatcher
+from twython.streaming.framing import iter_length_delimited, iter_lines
+from twython.streaming.handlers import DispatchTable
+from twython.streaming.overlap import OverlappingStream
 
 from .config import (
     app_key, app_secret, oauth_token, oauth_token_secret, unittest
 )
+from .server import FakeTwitterServer
 
 
 class TwythonStreamTestCase(unittest.TestCase):
@@ -48,3 +66,722 @@ class TwythonStreamTestCase(unittest.TestCase):
     @unittest.skip('skipping non-updated test')
     def test_stream_user(self):
         self.api.user(track='twitter')
+
+
+class TwythonStreamFramingTestCase(unittest.TestCase):
+    def test_iter_lines_splits_across_chunks(self):
+        """Test messages split over chunks are joined and delimiters stripped"""
+        chunks = [b'{"a":', b' 1}\r\n{"b": 2}\r', b'\n\r\n{"c"', b': 3}']
+        self.assertEqual(list(iter_lines(chunks)),
+                         [b'{"a": 1}', b'{"b": 2}', b'', b'{"c": 3}'])
+
+    def test_iter_lines_many_per_chunk(self):
+        """Test several messages in one chunk are all yielded"""
+        chunks = [b'1\n2\n3\n', b'4\n']
+        self.assertEqual(list(iter_lines(chunks)), [b'1', b'2', b'3', b'4'])
+
+    def test_iter_length_delimited(self):
+        """Test length-prefixed messages are sliced out across chunks"""
+        chunks = [b'10\r\n{"a": 1}\r', b'\n\r\n1', b'0\r\n{"b"', b': 2}\r\n',
+                  b'8\r\n{"c":3}\n']
+        messages = list(iter_length_delimited(chunks))
+        self.assertTrue(all(isinstance(m, memoryview) for m in messages))
+        self.assertEqual([m.tobytes() for m in messages],
+                         [b'{"a": 1}\r\n', b'{"b": 2}\r\n', b'{"c":3}\n'])
+
+    def test_iter_length_delimited_invalid(self):
+        """Test a malformed length line raises TwythonStreamError"""
+        self.assertRaises(TwythonStreamError, list,
+                          iter_length_delimited([b'abc\r\n{}']))
+
+    def test_stream_gzip(self):
+        """Test a gzip body that isn't chunked is decompressed"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data.get('id') == 2:
+                    self.disconnect()
+                return True
+
+            def on_error(self, status_code, data, headers=None):
+                received.append(data)
+                self.disconnect()
+
+        body = gzip.compress(b'{"id": 1}\r\n{"id": 2}\r\n')
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body,
+                       headers={'Content-Encoding': 'gzip'})
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret')
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertEqual(received, [{'id': 1}, {'id': 2}])
+
+    def test_stream_length_delimited(self):
+        """Test delimited=length streams are framed by their byte counts"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if len(received) == 2:
+                    self.disconnect()
+
+        body = [b'19\r\n{"text": "a\\nb"}\r\n', b'\r\n', b'11\r\n{"id": 2}', b'\r\n']
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret')
+            streamer._request(server.url('/stream.json'),
+                              params={'delimited': 'length'})
+
+        self.assertEqual(received, [{'text': 'a\nb'}, {'id': 2}])
+        self.assertIn('delimited=length', server.requests[0]['url'])
+
+    def test_stream_messages_are_dispatched(self):
+        """Test a chunked stream is framed, decoded and dispatched"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data.get('id') == 3:
+                    self.disconnect()
+                return True
+
+            def on_delete(self, data):
+                received.append('deleted %s' % data['status']['id'])
+
+        body = [
+            b'{"id": 1, "te', b'xt": "one"}\r\n\r\n',
+            b'{"delete": {"status": {"id": 2}}}\r\n{"id": 3}\r\n',
+        ]
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret')
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertEqual(received, [
+            {'id': 1, 'text': 'one'},
+            {'delete': {'status': {'id': 2}}},
+            'deleted 2',
+            {'id': 3},
+        ])
+
+
+class StreamDispatcherTestCase(unittest.TestCase):
+    def _blocked_dispatcher(self, overflow):
+        """A dispatcher whose single worker is stuck on the first item"""
+        release = threading.Event()
+        started = threading.Event()
+        processed = []
+
+        def process(item):
+            if item == 'first':
+                started.set()
+                release.wait(5)
+            processed.append(item)
+
+        dispatcher = StreamDispatcher(process, workers=1, queue_size=2,
+                                      overflow=overflow)
+        dispatcher.start()
+        dispatcher.put(('first',))
+        started.wait(5)
+        return dispatcher, release, processed
+
+    def test_drop_newest(self):
+        """Test drop_newest discards messages read while the queue is full"""
+        dispatcher, release, processed = self._blocked_dispatcher('drop_newest')
+        for item in ('a', 'b', 'c', 'd'):
+            dispatcher.put((item,))
+        release.set()
+        dispatcher.stop()
+
+        self.assertEqual(processed, ['first', 'a', 'b'])
+        stats = dispatcher.stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['enqueued'], 3)
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(stats['max_queue_depth'], 2)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_drop_oldest(self):
+        """Test drop_oldest makes room by discarding waiting messages"""
+        dispatcher, release, processed = self._blocked_dispatcher('drop_oldest')
+        for item in ('a', 'b', 'c', 'd'):
+            dispatcher.put((item,))
+        release.set()
+        dispatcher.stop()
+
+        self.assertEqual(processed, ['first', 'c', 'd'])
+        self.assertEqual(dispatcher.stats()['dropped'], 2)
+
+    def test_stop_without_drain(self):
+        """Test stop(drain=False) discards messages still queued"""
+        dispatcher, release, processed = self._blocked_dispatcher('block')
+        dispatcher.put(('a',))
+        release.set()
+        dispatcher.stop(drain=False)
+        self.assertEqual(processed[0], 'first')
+        self.assertEqual(dispatcher.stats()['queue_depth'], 0)
+
+    def test_invalid_overflow(self):
+        """Test an unknown overflow policy raises ValueError"""
+        self.assertRaises(ValueError, StreamDispatcher, None, overflow='spill')
+
+    def test_streamer_workers(self):
+        """Test messages are handled on worker threads and counted"""
+        received = []
+        threads = set()
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                threads.add(threading.current_thread().name)
+                received.append(data['id'])
+
+        body = [b'{"id": 1}\r\n{"id": 2}\r\n', b'{"id": 3}\r\n']
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret',
+                                  workers=2)
+            # The reader only frames, so stop it once the body is read
+            streamer._iter_lines = lambda *args: self._then_disconnect(
+                streamer, TwythonStreamer._iter_lines(streamer, *args))
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertEqual(sorted(received), [1, 2, 3])
+        self.assertNotIn(threading.current_thread().name, threads)
+        stats = streamer.get_queue_stats()
+        self.assertEqual(stats['enqueued'], 3)
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(stats['dropped'], 0)
+
+    def test_streamer_worker_error(self):
+        """Test an exception raised by a handler reaches the caller"""
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                raise TwythonStreamError('handler failed')
+
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=[b'{"id": 1}\r\n'])
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret',
+                                  workers=1)
+            streamer._iter_lines = lambda *args: self._then_disconnect(
+                streamer, TwythonStreamer._iter_lines(streamer, *args))
+            self.assertRaises(TwythonStreamError, streamer._request,
+                              server.url('/stream.json'), params={})
+
+    @staticmethod
+    def _then_disconnect(streamer, lines):
+        for line in lines:
+            yield line
+        streamer.disconnect()
+
+
+def _keep_text(data):
+    """Filter for the decoding processes; must be module level to pickle"""
+    if 'text' in data:
+        return {'text': data['text']}
+
+
+class ProcessDecoderTestCase(unittest.TestCase):
+    def test_ordered(self):
+        """Test results come back in the order messages were fed"""
+        decoder = ProcessDecoder(2, batch_size=3)
+        results = []
+        for i in range(20):
+            results.extend(decoder.feed(b'{"id": %d}' % i))
+        results.extend(decoder.flush(wait=True))
+        decoder.close()
+
+        self.assertEqual([data['id'] for _, _, data in results], list(range(20)))
+
+    def test_unordered_filter_and_invalid(self):
+        """Test filtering, invalid messages and unordered collection"""
+        decoder = ProcessDecoder(2, message_filter=_keep_text, batch_size=2,
+                                 ordered=False)
+        results = []
+        lines = [b'{"text": "a", "id": 1}', b'{"delete": {}}',
+                 b'not json', memoryview(b'{"text": "b"}')]
+        for line in lines:
+            results.extend(decoder.feed(line, 200))
+        results.extend(decoder.flush(wait=True))
+        decoder.close()
+
+        self.assertEqual(len(results), 3)
+        self.assertIn((200, False, None), results)
+        self.assertIn((200, True, {'text': 'a'}), results)
+        self.assertIn((200, True, {'text': 'b'}), results)
+
+    def test_callable_backend(self):
+        """Test a callable json_backend is refused"""
+        self.assertRaises(ValueError, ProcessDecoder, 1, json_backend=lambda s: s)
+
+    def test_streamer_decode_processes(self):
+        """Test a stream decoded by processes reaches on_success in order"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data['text'] == 'last':
+                    self.disconnect()
+
+        body = [b'{"text": "%d", "user": {}}\r\n' % i for i in range(10)]
+        body += [b'{"delete": {}}\r\n', b'\r\n', b'{"text": "last"}\r\n']
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret',
+                                  decode_processes=2, decode_filter=_keep_text,
+                                  decode_batch_size=4)
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertEqual([data['text'] for data in received],
+                         [str(i) for i in range(10)] + ['last'])
+        self.assertEqual(received[0], {'text': '0'})
+
+
+class StreamBackoffTestCase(unittest.TestCase):
+    def test_schedules(self):
+        """Test the network, HTTP and 420 schedules"""
+        backoff = StreamBackoff()
+        self.assertEqual([backoff.get_delay(NETWORK_ERROR) for i in range(3)],
+                         [0.25, 0.5, 0.75])
+        self.assertEqual([backoff.get_delay(HTTP_ERROR) for i in range(8)],
+                         [5, 10, 20, 40, 80, 160, 320, 320])
+        self.assertEqual([backoff.get_delay(RATE_LIMITED) for i in range(3)],
+                         [60, 120, 240])
+
+        backoff.reset()
+        for i in range(100):
+            delay = backoff.get_delay(NETWORK_ERROR)
+        self.assertEqual(delay, 16)
+
+    def test_retry_count_and_retry_in(self):
+        """Test retry_count gives up and retry_in replaces the schedules"""
+        backoff = StreamBackoff(retry_count=2, retry_in=3)
+        self.assertEqual(backoff.get_delay(HTTP_ERROR), 3)
+        self.assertEqual(backoff.get_delay(RATE_LIMITED), 3)
+        self.assertIsNone(backoff.get_delay(NETWORK_ERROR))
+
+        backoff.reset()
+        self.assertEqual(backoff.get_delay(NETWORK_ERROR), 3)
+
+    def test_get_kind(self):
+        """Test 420 and 429 follow the rate limit schedule"""
+        self.assertEqual(StreamBackoff.get_kind(420), RATE_LIMITED)
+        self.assertEqual(StreamBackoff.get_kind(429), RATE_LIMITED)
+        self.assertEqual(StreamBackoff.get_kind(503), HTTP_ERROR)
+
+
+class TwythonStreamReconnectTestCase(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        events = self.events
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                events.append(data)
+                if data.get('last'):
+                    self.disconnect()
+
+            def on_error(self, status_code, data, headers=None):
+                events.append(status_code)
+
+            def on_timeout(self):
+                events.append('timeout')
+
+        self.streamer_class = MyStreamer
+
+    def _stream(self, server, **kwargs):
+        streamer = self.streamer_class('app_key', 'app_secret',
+                                       'oauth_token', 'oauth_token_secret',
+                                       retry_in=0, **kwargs)
+        streamer._request(server.url('/stream.json'), params={})
+        return streamer
+
+    def test_reconnect_after_stall(self):
+        """Test a stream sending nothing for stall_timeout is reconnected"""
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=[
+                b'{"id": 1}\r\n', lambda: time.sleep(0.5), b'{"id": 2}\r\n'])
+            server.add('GET', '/stream.json', body=[b'{"last": true}\r\n'])
+            self._stream(server, stall_timeout=0.1)
+
+        self.assertEqual(self.events, [{'id': 1}, 'timeout', {'last': True}])
+        self.assertEqual(len(server.requests), 2)
+
+    def test_reconnect_after_error_and_close(self):
+        """Test error statuses and closed streams are reconnected in a loop"""
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', status=503)
+            server.add('GET', '/stream.json', status=420)
+            server.add('GET', '/stream.json', body=[b'{"id": 1}\r\n'])
+            server.add('GET', '/stream.json', body=[b'{"last": true}\r\n'])
+            self._stream(server)
+
+        self.assertEqual(self.events, [503, 420, {'id': 1}, {'last': True}])
+
+    def test_retry_count(self):
+        """Test the streamer disconnects after retry_count failures in a row"""
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', status=503)
+            streamer = self._stream(server, retry_count=2)
+
+        self.assertFalse(streamer.connected)
+        self.assertEqual(self.events, [503, 503, 503])
+
+    def test_network_error(self):
+        """Test a refused connection is retried with the network schedule"""
+        with FakeTwitterServer() as server:
+            url = server.url('/stream.json')
+        streamer = self.streamer_class('app_key', 'app_secret',
+                                       'oauth_token', 'oauth_token_secret',
+                                       retry_count=1, retry_in=0)
+        streamer._request(url, params={})
+        self.assertFalse(streamer.connected)
+        self.assertEqual(self.events, [])
+
+
+class DispatchTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        calls = self.calls
+
+        class MyStreamer(TwythonStreamer):
+            def on_delete(self, data):
+                calls.append(('delete', data))
+                return True
+
+            def on_retweet(self, data):
+                calls.append(('retweet', data['id']))
+                return True
+
+            def on_reply(self, data):
+                calls.append(('reply', data['id']))
+                return False
+
+            def on_quote(self, data):
+                calls.append(('quote', data['id']))
+                return True
+
+            def on_extended_tweet(self, data):
+                calls.append(('extended_tweet', data['id']))
+                return True
+
+            def on_event(self, data):
+                calls.append(('event', data))
+                return True
+
+        self.streamer = MyStreamer(
+            'app_key', 'app_secret', 'oauth_token', 'oauth_token_secret',
+            handlers=['delete', 'retweet', 'quote', 'reply', 'extended_tweet',
+                      'event', 'missing'])
+
+    def test_control_message(self):
+        """Test control messages are handed their single value"""
+        self.streamer._dispatch({'delete': {'status': {'id': 1}}})
+        self.assertEqual(self.calls, [('delete', {'status': {'id': 1}})])
+
+    def test_tweet_subtypes(self):
+        """Test subtype handlers get the tweet, in order, until one returns False"""
+        self.streamer._dispatch({'id': 1, 'retweeted_status': {},
+                                 'in_reply_to_status_id_str': None,
+                                 'extended_tweet': {}})
+        self.streamer._dispatch({'id': 2, 'quoted_status': {},
+                                 'in_reply_to_status_id_str': '1',
+                                 'extended_tweet': {}})
+        self.assertEqual(self.calls, [('retweet', 1), ('extended_tweet', 1),
+                                      ('quote', 2), ('reply', 2)])
+
+    def test_other_keys(self):
+        """Test handlers for keys of multi-key messages still get their value"""
+        self.streamer._dispatch({'event': 'follow', 'source': {}})
+        self.assertEqual(self.calls, [('event', 'follow')])
+
+    def test_table_skips_missing_handlers(self):
+        """Test message types without a handler are left out of the table"""
+        table = DispatchTable(self.streamer)
+        self.assertEqual(sorted(table.control), ['delete'])
+        self.assertEqual(len(table.other), 5)
+        self.assertEqual(table.match({'id': 3, 'text': 'plain'}), [])
+
+
+class StreamPrefilterTestCase(unittest.TestCase):
+    tweet_en = b'{"created_at":"x","id":1,"text":"hi","lang":"en","user":{"lang":null}}'
+    tweet_ja = b'{"created_at":"x","id":2,"text":"hi","lang":"ja","user":{"lang":null}}'
+    delete = b'{"delete":{"status":{"id":3,"id_str":"3"}}}'
+    limit = b'{"limit":{"track":10}}'
+
+    def test_languages_and_drop_types(self):
+        """Test language and control message checks"""
+        prefilter = StreamPrefilter(languages=['ja'], drop_types=['delete'])
+        self.assertFalse(prefilter(self.tweet_en))
+        self.assertTrue(prefilter(self.tweet_ja))
+        self.assertFalse(prefilter(self.delete))
+        self.assertTrue(prefilter(self.limit))
+        self.assertEqual(prefilter.rejected, 2)
+
+    def test_keep_control(self):
+        """Test keep_control=False makes control messages pass the checks too"""
+        prefilter = StreamPrefilter(contains=['"text":'], keep_control=False)
+        self.assertTrue(prefilter(self.tweet_en))
+        self.assertFalse(prefilter(self.limit))
+
+    def test_substrings_and_pattern(self):
+        """Test contains, excludes and pattern, on bytes and memoryviews"""
+        prefilter = StreamPrefilter(contains=[b'"text":'], excludes=['"id":2'],
+                                    pattern=r'"lang":"(en|ja)"')
+        self.assertTrue(prefilter(memoryview(self.tweet_en)))
+        self.assertFalse(prefilter(self.tweet_ja))
+        self.assertFalse(prefilter(b'{"id":4,"text":"x","lang":"fr"}'))
+        self.assertFalse(prefilter(b'{"id":5,"lang":"en"}'))
+
+    def test_streamer_prefilter(self):
+        """Test rejected messages are never decoded"""
+        received = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data.get('id') == 9:
+                    self.disconnect()
+
+        decoded = []
+
+        def loads(s):
+            decoded.append(bytes(s))
+            return json.loads(bytes(s).decode('utf-8'))
+
+        body = [self.tweet_en + b'\r\n', b'not json, but rejected\r\n',
+                self.delete + b'\r\n', self.tweet_ja + b'\r\n',
+                b'{"id":9,"lang":"ja"}\r\n']
+        prefilter = StreamPrefilter(languages=['ja'], drop_types=['delete'])
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=body)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret',
+                                  json_backend=loads, prefilter=prefilter)
+            streamer._request(server.url('/stream.json'), params={})
+
+        self.assertEqual([data['id'] for data in received], [2, 9])
+        self.assertEqual(len(decoded), 2)
+        self.assertEqual(prefilter.rejected, 3)
+
+
+class OverlappingStreamTestCase(unittest.TestCase):
+    def test_switch_filter_without_gap(self):
+        """Test set_dynamic_filter opens the new connection before closing
+        the old one, handing tweets seen on both on once"""
+        received = []
+        second_connected = threading.Event()
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                if 'limit' in data:
+                    return
+                received.append(data['id_str'])
+                if data['id_str'] == '1':
+                    self.statuses.set_dynamic_filter(track='new')
+                if data.get('last'):
+                    self.disconnect()
+
+        with FakeTwitterServer() as server:
+            server.add('POST', '/filter.json', body=[
+                b'{"id_str":"1"}\r\n',
+                lambda: second_connected.wait(5),
+                b'{"id_str":"2","user":{"id_str":"9"}}\r\n',
+                b'{"limit":{"track":1}}\r\n',
+                lambda: time.sleep(0.3),
+            ])
+            server.add('POST', '/filter.json', body=[
+                second_connected.set,
+                b'{"id_str":"2","user":{"id_str":"9"}}\r\n',
+                lambda: time.sleep(0.5),
+                b'{"id_str":"3","last":true}\r\n',
+                lambda: time.sleep(1),
+            ])
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret')
+            streamer._request(server.url('/filter.json'), 'POST',
+                              params={'track': 'old'}, overlap=0.4)
+
+        self.assertEqual(received, ['1', '2', '3'])
+        self.assertEqual([r['body'] for r in server.requests],
+                         [b'track=old', b'track=new'])
+        self.assertEqual(streamer._overlapping.switches, 1)
+        self.assertEqual(streamer._overlapping.duplicates, 1)
+
+    def test_failed_switch_keeps_stream(self):
+        """Test an error opening the new connection leaves the old one"""
+        received = []
+        errors = []
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data['id_str'])
+                if data['id_str'] == '1':
+                    self._switch_params({'track': 'bad'})
+                if data.get('last'):
+                    self.disconnect()
+
+            def on_error(self, status_code, data, headers=None):
+                errors.append(status_code)
+
+        with FakeTwitterServer() as server:
+            server.add('POST', '/filter.json', body=[
+                b'{"id_str":"1"}\r\n',
+                lambda: time.sleep(0.3),
+                b'{"id_str":"2","last":true}\r\n',
+            ])
+            server.add('POST', '/filter.json', status=406)
+            streamer = MyStreamer('app_key', 'app_secret',
+                                  'oauth_token', 'oauth_token_secret')
+            streamer._request(server.url('/filter.json'), 'POST',
+                              params={'track': 'good'}, overlap=1)
+
+        self.assertEqual(received, ['1', '2'])
+        self.assertEqual(errors, [406])
+        self.assertEqual(streamer._overlapping.params, {'track': 'bad'})
+
+    def test_readers_wait_for_the_consumer(self):
+        """Test lines are only read queue_size ahead of the consumer"""
+        class Response(object):
+            def close(self):
+                pass
+
+        read = []
+
+        def iter_lines(response):
+            for i in range(100):
+                read.append(i)
+                yield b'%d' % i
+
+        stream = OverlappingStream(None, iter_lines, {}, queue_size=5)
+        lines = stream.lines(Response())
+        self.assertEqual(next(lines), b'0')
+        time.sleep(0.2)
+        # The line waiting for a slot has been read too
+        self.assertEqual(len(read), 7)
+        self.assertEqual(list(lines), [b'%d' % i for i in range(1, 100)])
+
+    def test_dynamic_filter_overlap(self):
+        """Test dynamic_filter passes overlap on to the stream"""
+        streamer = TwythonStreamer('app_key', 'app_secret',
+                                   'oauth_token', 'oauth_token_secret')
+        calls = []
+        streamer._request = lambda *args, **kwargs: calls.append((args, kwargs))
+        streamer.statuses.set_dynamic_filter(track='a')
+        streamer.statuses.dynamic_filter(overlap=5)
+        streamer.statuses.dynamic_filter()
+
+        url = 'https://stream.twitter.com/1.1/statuses/filter.json'
+        self.assertEqual(calls, [
+            ((url, 'POST'), {'params': {'track': 'a'}, 'overlap': 5}),
+            ((url, 'POST'), {'params': {'track': 'a'}}),
+        ])
+
+    def test_switch_needs_running_stream(self):
+        """Test switching params is refused without an overlap stream"""
+        streamer = TwythonStreamer('app_key', 'app_secret',
+                                   'oauth_token', 'oauth_token_secret')
+        self.assertFalse(streamer._switch_params({'track': 'x'}))
+
+
+class StreamReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+        received = self.received
+
+        class MyStreamer(TwythonStreamer):
+            def on_success(self, data):
+                received.append(data)
+                if data.get('last'):
+                    self.disconnect()
+
+        self.streamer_class = MyStreamer
+
+    def _streamer(self, **kwargs):
+        return self.streamer_class('app_key', 'app_secret',
+                                   'oauth_token', 'oauth_token_secret',
+                                   retry_in=0, **kwargs)
+
+    def test_record_and_replay(self):
+        """Test a recorded stream, reconnect included, replays the same
+        messages through the streamer"""
+        f = io.BytesIO()
+        recorder = StreamRecorder(f)
+        with FakeTwitterServer() as server:
+            server.add('GET', '/stream.json', body=[
+                b'{"id": 1}\r\n{"i', b'd": 2}\r\n\r\n{"id": 3}'])
+            server.add('GET', '/stream.json', body=[b'{"last": true}\r\n'])
+            self._streamer(recorder=recorder)._request(
+                server.url('/stream.json'), params={})
+        recorder.close()
+        self.assertEqual(recorder.connections, 2)
+
+        live = list(self.received)
+        del self.received[:]
+        f.seek(0)
+        streamer = self._streamer(workers=2)
+        streamer.replay(StreamReplay(f), speed=None)
+
+        self.assertEqual(self.received, live)
+        self.assertEqual(live, [{'id': 1}, {'id': 2}, {'id': 3},
+                                {'last': True}])
+        self.assertFalse(streamer.connected)
+
+    def test_replay_length_delimited(self):
+        """Test the framing of a recorded connection is kept"""
+        f = io.BytesIO()
+        recorder = StreamRecorder(f)
+        chunks = [b'9\r\n{"id": 1}', b'\r\n14\r\n{"last"', b': true}']
+        for _ in recorder.record(iter(chunks), length_delimited=True):
+            pass
+        f.seek(0)
+        self._streamer().replay(StreamReplay(f), speed=None)
+        self.assertEqual(self.received, [{'id': 1}, {'last': True}])
+
+    def test_replay_speed(self):
+        """Test records are due at their recorded time divided by speed"""
+        now = [100.0]
+        f = io.BytesIO()
+        recorder = StreamRecorder(f, clock=lambda: now[0])
+        chunks = [b'{"id": 1}\n', b'{"id": 2}\n']
+
+        def chunks_over_time():
+            for chunk in chunks:
+                yield chunk
+                now[0] += 2
+        for _ in recorder.record(chunks_over_time()):
+            pass
+
+        def sleep(secs):
+            sleeps.append(secs)
+            now[0] += secs
+
+        replay = StreamReplay(f)
+        for speed, expected in ((1, [2.0]), (4, [0.5]), (None, [])):
+            sleeps = []
+            f.seek(0)
+            records = list(replay.play(speed, sleep, clock=lambda: now[0]))
+            self.assertEqual(len(records), 3)
+            self.assertEqual(sleeps, expected)
+
+    def test_not_a_recording(self):
+        """Test playing something else raises TwythonStreamError"""
+        replay = StreamReplay(io.BytesIO(b'{"id": 1}\r\n'))
+        self.assertRaises(TwythonStreamError, list, replay.records())
+
+    def test_overlap_not_recorded(self):
+        """Test a stream that may switch connections is not recorded"""
+        streamer = self._streamer(recorder=StreamRecorder(io.BytesIO()))
+        self.assertRaises(TwythonError, streamer._request,
+                          'http://localhost/stream.json', params={}, overlap=1)
+
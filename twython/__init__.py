@@ -22,7 +22,14 @@ __author__ = 'Ryan McGrath <ryan@venodesigns.net>'
 __version__ = '3.9.1'
 
 from .api import Twython
-from .streaming import TwythonStreamer
+from .models import Entity, Tweet, User
+from .pool import TwythonPool
+from .ratelimit import RateLimiter
+from .render import RenderCache, TweetRenderer
+from .retry import RetryPolicy
+from .streaming import (
+    StreamPrefilter, StreamRecorder, StreamReplay, TwythonStreamer
+)
 from .exceptions import (
     TwythonError, TwythonRateLimitError, TwythonAuthError,
     TwythonStreamError
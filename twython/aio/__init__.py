@@ -0,0 +1,10 @@
+import sys
+
+from ..exceptions import TwythonError
+
+# Async generators (3.6) and contextvars (3.7)
+if sys.version_info < (3, 7):  # pragma: no cover
+    raise TwythonError('twython.aio requires Python 3.7 or later.')
+
+from .api import AsyncTwython  # noqa: E402
+from .streaming import AsyncStream, AsyncTwythonStreamer  # noqa: E402
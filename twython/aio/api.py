@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.aio.api
+~~~~~~~~~~~~~~~
+
+This module contains an asyncio flavour of :class:`Twython <Twython>`.
+Every endpoint declared on :class:`EndpointsMixin` is available and
+returns an awaitable instead of blocking on a socket.
+"""
+
+import asyncio
+import os
+import ssl
+from collections import deque
+from contextvars import ContextVar
+from io import BytesIO
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from ..api import Twython
+from ..exceptions import TwythonError
+from ..helpers import _chunks
+
+async def _achunks(iterable, size):
+    """Lazily split an iterable or async iterable into lists of at most
+    ``size`` items"""
+    if not hasattr(iterable, '__aiter__'):
+        for chunk in _chunks(iterable, size):
+            yield chunk
+        return
+
+    chunk = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _AioSession(object):
+    """Sending with an ``aiohttp.ClientSession``, shared by the asyncio
+    clients. Expects ``self.client`` (a ``requests.Session``) and
+    ``self.aio_session``/``self._owns_aio_session``."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Close the ``aiohttp`` session if it was created by this instance"""
+        if self._owns_aio_session and self.aio_session is not None:
+            await self.aio_session.close()
+            self.aio_session = None
+
+    def _get_aio_session(self):
+        if self.aio_session is None:
+            self.aio_session = aiohttp.ClientSession()
+        return self.aio_session
+
+    @staticmethod
+    def _get_aio_headers(headers):
+        """requests_oauthlib may leave bytes in the prepared headers, which
+        aiohttp refuses to serialize"""
+        aio_headers = {}
+        for k, v in headers.items():
+            if isinstance(k, bytes):
+                k = k.decode('utf-8')
+            if isinstance(v, bytes):
+                v = v.decode('utf-8')
+            aio_headers[k] = v
+        return aio_headers
+
+    def _get_aio_args(self, url, requests_args):
+        """Translate the requests specific arguments into aiohttp ones"""
+        aio_args = {
+            'allow_redirects': requests_args.get('allow_redirects', True),
+        }
+
+        timeout = requests_args.get('timeout')
+        if isinstance(timeout, tuple):
+            aio_args['timeout'] = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1])
+        elif timeout is not None:
+            aio_args['timeout'] = aiohttp.ClientTimeout(total=timeout)
+
+        proxy = select_proxy(url, self.client.proxies)
+        if proxy:
+            aio_args['proxy'] = proxy
+
+        verify = requests_args.get('verify', True)
+        if verify is False:
+            aio_args['ssl'] = False
+        elif isinstance(verify, str) or self.client.cert:
+            context = ssl.create_default_context(
+                cafile=verify if isinstance(verify, str) else None)
+            if isinstance(self.client.cert, tuple):
+                context.load_cert_chain(*self.client.cert)
+            elif self.client.cert:
+                context.load_cert_chain(self.client.cert)
+            aio_args['ssl'] = context
+
+        return aio_args
+
+
+class AsyncTwython(_AioSession, Twython):
+    def __init__(self, app_key=None, app_secret=None, oauth_token=None,
+                 oauth_token_secret=None, access_token=None,
+                 token_type='bearer', oauth_version=1, api_version='1.1',
+                 client_args=None, auth_endpoint='authenticate',
+                 rate_limiter=None, retry_policy=None, store_last_content=False,
+                 json_backend=None, models=False, aio_session=None):
+        """Instantiates an instance of AsyncTwython. Takes the same
+        parameters as :class:`Twython <Twython>` (see below).
+
+        Requests are still built and signed by ``requests`` and
+        ``requests_oauthlib``, but they are sent with ``aiohttp`` so that
+        many calls can be in flight on a single event loop. The OAuth
+        dance methods (``get_authentication_tokens`` and friends) remain
+        blocking.
+
+        The details of the last call (see ``get_lastfunction_header``)
+        are kept per asyncio task.
+
+        :param aio_session: (optional) An ``aiohttp.ClientSession`` to send
+        requests with. If one isn't provided a session is created on the
+        first call and closed by :meth:`close`.
+        """
+        if aiohttp is None:  # pragma: no cover
+            raise TwythonError('AsyncTwython requires aiohttp. \
+                               Install it with "pip install twython[async]".')
+
+        # Details of the last call, per asyncio task
+        self._last_call_var = ContextVar('twython_last_call', default=None)
+
+        super(AsyncTwython, self).__init__(
+            app_key, app_secret, oauth_token, oauth_token_secret,
+            access_token=access_token, token_type=token_type,
+            oauth_version=oauth_version, api_version=api_version,
+            client_args=client_args, auth_endpoint=auth_endpoint,
+            rate_limiter=rate_limiter, retry_policy=retry_policy,
+            store_last_content=store_last_content, json_backend=json_backend,
+            models=models)
+
+        self.aio_session = aio_session
+        self._owns_aio_session = aio_session is None
+
+    def __repr__(self):
+        return '<AsyncTwython: %s>' % (self.app_key)
+
+    @property
+    def _last_call(self):
+        return self._last_call_var.get()
+
+    @_last_call.setter
+    def _last_call(self, value):
+        self._last_call_var.set(value)
+
+    async def _request(self, url, method='GET', params=None, api_call=None, json_encoded=False):
+        """Internal request method"""
+        method = method.lower()
+        # Keep the same failure mode as Twython for unknown HTTP methods
+        getattr(self.client, method)
+        requests_args = self._get_requests_args(method, params, json_encoded)
+        files = requests_args.get('files')
+
+        request = requests.Request(
+            method.upper(), url,
+            params=requests_args.pop('params', None),
+            data=requests_args.pop('data', None),
+            json=requests_args.pop('json', None),
+            files=requests_args.pop('files', None))
+
+        retries = 0
+        waited = 0
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(url)
+                if delay:
+                    await asyncio.sleep(delay)
+
+            try:
+                # Prepared for every attempt so each one gets a fresh
+                # OAuth nonce and timestamp
+                response = await self._send(
+                    self.client.prepare_request(request), requests_args)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = self._get_retry_delay(method, retries, waited, e, files)
+                if delay is None:
+                    raise TwythonError(str(e) or e.__class__.__name__)
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(url, response.headers)
+
+                delay = self._get_retry_delay(method, retries, waited, response, files)
+                if delay is None:
+                    break
+
+            await asyncio.sleep(delay)
+            retries += 1
+            waited += delay
+
+        return self._handle_response(response, api_call, retries)
+
+    async def _send(self, prepared, requests_args):
+        """Send a prepared request with aiohttp and return it as a
+        :class:`requests.Response`"""
+        async with self._get_aio_session().request(
+                prepared.method, prepared.url, data=prepared.body,
+                headers=self._get_aio_headers(prepared.headers),
+                **self._get_aio_args(prepared.url, requests_args)) as aio_response:
+            body = await aio_response.read()
+
+        response = requests.Response()
+        response.status_code = aio_response.status
+        response.reason = aio_response.reason
+        response.headers = CaseInsensitiveDict(aio_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = str(aio_response.url)
+        response.request = prepared
+        response._content = body
+
+        return response
+
+    async def request(self, endpoint, method='GET', params=None, version='1.1', json_encoded=False):
+        """Return dict of response received from Twitter's API
+
+        See :meth:`Twython.request`; this is the awaitable version.
+
+        :rtype: dict
+        """
+        url = self._get_endpoint_url(endpoint, version)
+        content = await self._request(url, method=method, params=params,
+                                      api_call=url, json_encoded=json_encoded)
+
+        return content
+
+    async def cursor(self, function, return_pages=False, prefetch=0,
+                     stream_items=False, **params):
+        r"""Returns an async generator for results that match a specified
+        query.
+
+        :param function: Instance of an AsyncTwython function
+        (AsyncTwython.get_home_timeline, AsyncTwython.search)
+        :param prefetch: (optional) Not supported by AsyncTwython; raises
+        TwythonError if set
+        :param stream_items: (optional) Not supported by AsyncTwython;
+        raises TwythonError if set
+        :param \*\*params: Extra parameters to send with your request
+        (usually parameters accepted by the Twitter API endpoint)
+        :rtype: async generator
+
+        Usage::
+
+          >>> from twython.aio import AsyncTwython
+          >>> twitter = AsyncTwython(APP_KEY, APP_SECRET, OAUTH_TOKEN,
+          OAUTH_TOKEN_SECRET)
+
+          >>> async for result in twitter.cursor(twitter.search, q='python'):
+          >>>   print(result)
+
+        """
+        self._check_cursor_function(function)
+        if prefetch or stream_items:
+            raise TwythonError('AsyncTwython.cursor() can not prefetch pages \
+                               or stream items.')
+
+        while True:
+            content = await function(**params)
+
+            if not content:
+                return
+
+            results = self._get_cursor_results(function, content)
+            if return_pages:
+                yield results
+            else:
+                for result in results:
+                    yield result
+
+            params = self._get_cursor_params(function, content, params)
+            if params is None:
+                return
+
+    async def _lookup_bulk(self, function, values, key, match, result_key,
+                           concurrency, params):
+        """Awaitable version of :meth:`Twython._lookup_bulk`, behind
+        ``lookup_user_bulk`` and ``lookup_status_bulk``: an async generator
+        of ``(value, result)`` pairs in input order. ``values`` may also be
+        an async iterable, such as the ids of :meth:`cursor`, and up to
+        ``concurrency`` batches are requested at once.
+
+        Usage::
+
+          >>> followers = twitter.cursor(twitter.get_followers_ids, screen_name='twitterapi')
+          >>> async for user_id, user in twitter.lookup_user_bulk(followers, concurrency=4):
+          >>>   print(user_id, user is not None)
+
+        """
+        async def lookup(batch):
+            try:
+                results = await function(**self._get_lookup_params(params, key, batch))
+            except TwythonError as e:
+                if not self._is_lookup_miss(e):
+                    raise
+                results = []
+            # Tasks run in a copy of the context: hand the call back
+            pairs = self._match_lookup_results(batch, results, match, result_key)
+            return pairs, self._last_call
+
+        async def oldest_pairs():
+            pairs, self._last_call = await pending.popleft()
+            return pairs
+
+        # At most ``concurrency`` batches are in flight: the next one is
+        # only read from ``values`` once the oldest is done, so it stays lazy
+        pending = deque()
+        try:
+            async for batch in _achunks(values, 100):
+                pending.append(asyncio.ensure_future(lookup(batch)))
+                if len(pending) >= concurrency:
+                    for pair in await oldest_pairs():
+                        yield pair
+
+            while pending:
+                for pair in await oldest_pairs():
+                    yield pair
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def upload_video(self, media, media_type, media_category=None, size=None, check_progress=False):
+        """Uploads video file to Twitter servers in chunks.
+
+        See :meth:`EndpointsMixin.upload_video`; this is the awaitable
+        version.
+
+        """
+        upload_url = 'https://upload.twitter.com/1.1/media/upload.json'
+        if not size:
+            media.seek(0, os.SEEK_END)
+            size = media.tell()
+            media.seek(0)
+
+        # Stage 1: INIT call
+        params = {
+            'command': 'INIT',
+            'media_type': media_type,
+            'total_bytes': size,
+            'media_category': media_category
+        }
+        response_init = await self.post(upload_url, params=params)
+        media_id = response_init['media_id']
+
+        # Stage 2: APPEND calls with 1mb chunks
+        segment_index = 0
+        while True:
+            data = media.read(1*1024*1024)
+            if not data:
+                break
+
+            params = {
+                'command': 'APPEND',
+                'media_id': media_id,
+                'segment_index': segment_index,
+                'media': BytesIO(data),
+            }
+            await self.post(upload_url, params=params)
+            segment_index += 1
+
+        # Stage 3: FINALIZE call to complete upload
+        params = {
+            'command': 'FINALIZE',
+            'media_id': media_id
+        }
+
+        response = await self.post(upload_url, params=params)
+
+        if check_progress:
+            # Stage 4: STATUS call if still processing
+            params = {
+                'command': 'STATUS',
+                'media_id': media_id
+            }
+
+            processing_info = response.get('processing_info')
+            if not processing_info:
+                return response
+
+            while processing_info.get('state') in ('pending', 'in_progress'):
+                check_after_secs = processing_info.get('check_after_secs')
+                if not check_after_secs:
+                    break
+
+                await asyncio.sleep(check_after_secs)
+                response = await self.get(upload_url, params=params)
+                processing_info = response.get('processing_info') or {}
+
+        return response
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.aio.streaming
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains an asyncio flavour of :class:`TwythonStreamer`, so
+that many streams and REST calls can share one event loop.
+"""
+
+import asyncio
+import inspect
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from ..exceptions import TwythonError
+from ..helpers import _transparent_params
+from ..streaming.api import TwythonStreamer
+from ..streaming.backoff import NETWORK_ERROR, StreamBackoff
+from ..streaming.framing import LengthFramer, LineFramer
+from ..streaming.handlers import DispatchTable
+from .api import _AioSession
+
+
+async def _maybe_await(value):
+    """Handlers may be plain methods or coroutines"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class AsyncStream(object):
+    """A stream opened by :class:`AsyncTwythonStreamer`.
+
+    Await it to hand every message to the streamer's handlers until
+    ``disconnect()`` is called, or iterate over it with ``async for`` to
+    get the decoded messages yourself (the handlers are then not called).
+    """
+    def __init__(self, streamer, url, method='GET', params=None):
+        self.streamer = streamer
+        self.url = url
+        self.method = method
+        self.params = params
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def _run(self):
+        async for data in self:
+            await self.streamer._dispatch_async(data)
+
+    def __aiter__(self):
+        return self.streamer._messages(self.url, self.method, self.params)
+
+
+class AsyncTwythonStreamer(_AioSession, TwythonStreamer):
+    def __init__(self, app_key, app_secret, oauth_token, oauth_token_secret,
+                 timeout=300, retry_count=None, retry_in=None, client_args=None,
+                 handlers=None, chunk_size=16384, json_backend=None,
+                 stall_timeout=90, prefilter=None, aio_session=None):
+        """Streaming class for asyncio. Takes the same parameters as
+        :class:`TwythonStreamer <TwythonStreamer>`, except for the worker
+        and process pool ones: messages are handled on the event loop.
+
+        ``statuses.filter()`` and the other stream methods return an
+        :class:`AsyncStream`. ``on_success``, ``on_error``, ``on_timeout``
+        and the ``on_<type>`` handlers may be coroutines.
+
+        :param aio_session: (optional) An ``aiohttp.ClientSession`` to stream
+        with. If one isn't provided a session is created on the first stream
+        and closed by :meth:`close`.
+        """
+        if aiohttp is None:  # pragma: no cover
+            raise TwythonError('AsyncTwythonStreamer requires aiohttp. \
+                               Install it with "pip install twython[async]".')
+
+        super(AsyncTwythonStreamer, self).__init__(
+            app_key, app_secret, oauth_token, oauth_token_secret,
+            timeout=timeout, retry_count=retry_count, retry_in=retry_in,
+            client_args=client_args, handlers=handlers, chunk_size=chunk_size,
+            json_backend=json_backend, stall_timeout=stall_timeout,
+            prefilter=prefilter)
+
+        self.aio_session = aio_session
+        self._owns_aio_session = aio_session is None
+
+    def _request(self, url, method='GET', params=None, overlap=None):
+        """Internal stream request handling"""
+        if overlap is not None:
+            raise TwythonError('AsyncTwythonStreamer does not support '
+                               'switching filters with overlap.')
+        return AsyncStream(self, url, method, params)
+
+    async def _messages(self, url, method='GET', params=None):
+        """Decoded messages of a stream, reconnecting until disconnect()"""
+        self.connected = True
+        # Handlers are looked up once per stream
+        self._dispatch_table = DispatchTable(self)
+
+        method = method.upper()
+        params, _ = _transparent_params(params or {})
+        length_delimited = params.get('delimited') == 'length'
+
+        requests_args = {}
+        for k, v in self.client_args.items():
+            if k in ('allow_redirects', 'verify'):
+                requests_args[k] = v
+        # The stream never ends, so only the connection and each read are
+        # timed; a read timing out means the stream stalled
+        requests_args['timeout'] = (self.client_args.get('timeout'),
+                                    self.stall_timeout)
+
+        request = requests.Request(
+            method, url,
+            params=params if method == 'GET' else None,
+            data=params if method != 'GET' else None)
+
+        backoff = StreamBackoff(self.retry_count, self.retry_in)
+        while self.connected:
+            prepared = self.client.prepare_request(request)
+            # However a stream we are connected to ends, we reconnect as
+            # after a network error
+            kind = NETWORK_ERROR
+            try:
+                async with self._get_aio_session().request(
+                        prepared.method, prepared.url, data=prepared.body,
+                        headers=self._get_aio_headers(prepared.headers),
+                        **self._get_aio_args(prepared.url, requests_args)) as response:
+                    if response.status != 200:
+                        await _maybe_await(self.on_error(
+                            response.status, await response.read(),
+                            response.headers))
+                        kind = backoff.get_kind(response.status)
+                    else:
+                        backoff.reset()
+                        framer = LengthFramer() if length_delimited else LineFramer()
+                        async for chunk in response.content.iter_chunked(self.chunk_size):
+                            for line in framer.feed(chunk):
+                                if not self.connected:
+                                    return
+                                if not line:
+                                    continue
+                                if self.prefilter is not None and not self.prefilter(line):
+                                    continue
+                                try:
+                                    data = self._json_loads(line)
+                                except ValueError:  # pragma: no cover
+                                    await _maybe_await(self.on_error(
+                                        response.status, 'Unable to decode response, \
+                                        not valid JSON.'))
+                                else:
+                                    yield data
+            except asyncio.TimeoutError:
+                # Connecting timed out, or nothing arrived for stall_timeout
+                await _maybe_await(self.on_timeout())
+            except aiohttp.ClientError:
+                pass
+
+            if not self.connected:
+                return
+
+            delay = backoff.get_delay(kind)
+            if delay is None:
+                # retry_count failures in a row, give up
+                self.disconnect()
+                return
+            await asyncio.sleep(delay)
+
+    async def _dispatch_async(self, data):
+        """Await on_success, then the handlers, for a decoded message"""
+        if await _maybe_await(self.on_success(data)):
+            table = self._dispatch_table
+            if table is None:
+                table = self._dispatch_table = DispatchTable(self)
+            if len(data) == 1 or table.other:
+                for handler, value in table.match(data):
+                    if not await _maybe_await(handler(value)):
+                        break
@@ -11,28 +11,58 @@ dealing with the Twitter API
 
 from __future__ import generator_stop
 import warnings
-import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from requests_oauthlib import OAuth1, OAuth2
 
 from . import __version__
+from . import models as _models
 from .advisory import TwythonDeprecationWarning
 from .compat import json, urlencode, parse_qsl, quote_plus, str, is_py2
-from .compat import urlsplit
+from .compat import urlsplit, get_json_loads
 from .endpoints import EndpointsMixin
 from .exceptions import TwythonError, TwythonAuthError, TwythonRateLimitError
-from .helpers import _transparent_params
+from .jsonstream import JSONItemStream
+from .render import _default_renderer, _with_cache
+from .helpers import _transparent_params, _prefetch, _chunks
 
 warnings.simplefilter('always', TwythonDeprecationWarning)  # For Python 2.7 >
 
+#: Size of the reads made when a response is decoded as it arrives
+STREAM_CHUNK_SIZE = 16384
+
+_NOT_STREAMING = object()
+
+
+class _LastItem(object):
+    """Iterator wrapper remembering the last item it gave out"""
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.item = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.item = next(self.iterator)
+        return self.item
+
+    next = __next__  # Python 2
+
 
 class Twython(EndpointsMixin, object):
     def __init__(self, app_key=None, app_secret=None, oauth_token=None,
                  oauth_token_secret=None, access_token=None,
                  token_type='bearer', oauth_version=1, api_version='1.1',
-                 client_args=None, auth_endpoint='authenticate'):
+                 client_args=None, auth_endpoint='authenticate',
+                 rate_limiter=None, retry_policy=None, store_last_content=False,
+                 json_backend=None, models=False):
         """Instantiates an instance of Twython. Takes optional parameters for
         authentication and such (see below).
 
@@ -56,11 +86,34 @@ class Twython(EndpointsMixin, object):
               See http://docs.python-requests.org/en/latest/api/#sessionapi
               and requests section below it for details.
               [ex. headers, proxies, verify(SSL verification)]
+              Connection pooling is controlled with ``pool_connections``,
+              ``pool_maxsize`` and ``pool_block`` (see
+              ``requests.adapters.HTTPAdapter``), ``adapters`` (a dict of
+              url prefix to adapter, mounted on the session; share an
+              adapter between instances to share its pool) and
+              ``keep_alive`` (set to False to close connections after each
+              call).
         :param auth_endpoint: (optional) Lets you select which authentication
         endpoint will use your application.
               This will allow the application to have DM access
               if the endpoint is 'authorize'.
                 Default: authenticate.
+        :param rate_limiter: (optional) A :class:`RateLimiter` used to pace
+        calls so they wait for the next rate limit window instead of
+        failing with a 429. Share it between clients using the same
+        credentials.
+        :param retry_policy: (optional) A :class:`RetryPolicy` deciding
+        which failed calls are retried, and after how long, before a
+        TwythonError is raised. Default: no retries
+        :param store_last_content: (optional) Keep a decoded copy of the
+        last response body in the last call details. Default: False
+        :param json_backend: (optional) JSON library used to decode
+        responses: 'orjson', 'ujson', 'simplejson', 'json', 'auto' (the
+        fastest one installed) or a ``loads`` callable accepting bytes.
+        Default: simplejson if installed, else json
+        :param models: (optional) Return tweets and users as :class:`Tweet`
+        and :class:`User` models, which are only decoded when first read,
+        rather than as dicts. Default: False
         """
 
         # API urls, OAuth urls and API version; needed for hitting that there
@@ -130,18 +183,108 @@ class Twython(EndpointsMixin, object):
         # Headers are always present, so we unconditionally pop them and merge
         # them into the session headers.
         self.client.headers.update(self.client_args.pop('headers'))
-
+        if self.client_args.pop('keep_alive', True) is False:
+            self.client.headers['Connection'] = 'close'
+
+        # Connection pool sizing. Adapters hold the connection pools, so
+        # passing the same adapter to several instances shares one pool
+        # between them, whatever their credentials.
+        pool_args = {}
+        for k in ('pool_connections', 'pool_maxsize', 'pool_block'):
+            if k in self.client_args:
+                pool_args[k] = self.client_args.pop(k)
+        if pool_args:
+            adapter = HTTPAdapter(**pool_args)
+            self.client.mount('https://', adapter)
+            self.client.mount('http://', adapter)
+
+        for prefix, adapter in self.client_args.pop('adapters', {}).items():
+            self.client.mount(prefix, adapter)
+
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.store_last_content = store_last_content
+        self.json_backend = json_backend
+        self._json_loads = get_json_loads(json_backend)
+        self.models = models
+
+        # Details of the last call are kept per thread, so a client can be
+        # shared by a thread pool without threads reading each other's
+        # headers. Work this client hands to its own threads (prefetched
+        # pages, concurrent lookups) passes them back to the caller.
+        self._local = threading.local()
         self._last_call = None
 
     def __repr__(self):
         return '<Twython: %s>' % (self.app_key)
 
+    @property
+    def _last_call(self):
+        return getattr(self._local, 'last_call', None)
+
+    @_last_call.setter
+    def _last_call(self, value):
+        self._local.last_call = value
+
     def _request(self, url, method='GET', params=None, api_call=None, json_encoded=False):
         """Internal request method"""
         method = method.lower()
+        func = getattr(self.client, method)
+        requests_args = self._get_requests_args(method, params, json_encoded)
+
+        stream_key = getattr(self._local, 'stream_key', _NOT_STREAMING)
+        if stream_key is not _NOT_STREAMING:
+            requests_args['stream'] = True
+
+        retries = 0
+        waited = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+
+            try:
+                response = func(url, **requests_args)
+            except requests.RequestException as e:
+                delay = self._get_retry_delay(method, retries, waited, e,
+                                              requests_args.get('files'))
+                if delay is None:
+                    raise TwythonError(str(e))
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(url, response.headers)
+
+                delay = self._get_retry_delay(method, retries, waited, response,
+                                              requests_args.get('files'))
+                if delay is None:
+                    break
+
+                # Give the connection of a streamed response back
+                response.close()
+
+            self.retry_policy.sleep(delay)
+            retries += 1
+            waited += delay
+
+        return self._handle_response(response, api_call, retries, stream_key)
+
+    def _get_retry_delay(self, method, retries, waited, cause, files=None):
+        """Return the seconds to wait before retrying a call that failed
+        with ``cause`` (a response or an exception), or None to give up"""
+        # Uploaded files have been read to the end: resending them would
+        # upload nothing
+        if self.retry_policy is None or files:
+            return None
+
+        response = cause if isinstance(cause, requests.Response) else None
+        delay = self.retry_policy.get_delay(method, retries, waited, response)
+        if delay is not None and self.retry_policy.on_retry is not None:
+            self.retry_policy.on_retry(retries + 1, delay, cause)
+        return delay
+
+    def _get_requests_args(self, method, params=None, json_encoded=False):
+        """Build the keyword arguments for a requests call"""
         params = params or {}
 
-        func = getattr(self.client, method)
         if isinstance(params, dict) and json_encoded is False:
             params, files = _transparent_params(params)
         else:
@@ -166,20 +309,24 @@ class Twython(EndpointsMixin, object):
                 data_key: params,
                 'files': files,
             })
-        try:
-            response = func(url, **requests_args)
-        except requests.RequestException as e:
-            raise TwythonError(str(e))
 
+        return requests_args
+
+    def _handle_response(self, response, api_call=None, retries=0,
+                         stream_key=_NOT_STREAMING):
+        """Stash the call details, raise on errors and decode the content
+        of a received response"""
         # create stash for last function intel
         self._last_call = {
             'api_call': api_call,
+            'retries': retries,
             'api_error': None,
             'cookies': response.cookies,
             'headers': response.headers,
             'status_code': response.status_code,
             'url': response.url,
-            'content': response.text,
+            'content': response.text if self.store_last_content and
+            stream_key is _NOT_STREAMING else None,
         }
 
         # greater than 304 (not modified) is an error
@@ -203,12 +350,19 @@ class Twython(EndpointsMixin, object):
                 error_message,
                 error_code=response.status_code,
                 retry_after=response.headers.get('X-Rate-Limit-Reset'))
+        if stream_key is not _NOT_STREAMING and response.status_code != 204:
+            return JSONItemStream(
+                response.iter_content(STREAM_CHUNK_SIZE), stream_key,
+                close=response.close)
+
         content = ''
         try:
             if response.status_code == 204:
                 content = response.content
+            elif self.models:
+                content = _models.loads(response.content, self._json_loads)
             else:
-                content = response.json()
+                content = self._json_loads(response.content)
         except ValueError:
             if response.content != '':
                 raise TwythonError('Response was not valid JSON. \
@@ -259,20 +413,23 @@ class Twython(EndpointsMixin, object):
         :rtype: dict
         """
 
+        url = self._get_endpoint_url(endpoint, version)
+        content = self._request(url, method=method, params=params,
+                                api_call=url, json_encoded=json_encoded)
+
+        return content
+
+    def _get_endpoint_url(self, endpoint, version='1.1'):
+        """Return the full url for a Twitter API endpoint"""
         if endpoint.startswith('http://'):
             raise TwythonError('api.twitter.com is restricted to SSL/TLS traffic.')
 
         # In case they want to pass a full Twitter URL
         # i.e. https://api.twitter.com/1.1/search/tweets.json
         if endpoint.startswith('https://'):
-            url = endpoint
-        else:
-            url = '%s/%s.json' % (self.api_url % version, endpoint)
-
-        content = self._request(url, method=method, params=params,
-                                api_call=url, json_encoded=json_encoded)
+            return endpoint
 
-        return content
+        return '%s/%s.json' % (self.api_url % version, endpoint)
 
     def get(self, endpoint, params=None, version='1.1'):
         """Shortcut for GET requests via :class:`request`"""
@@ -287,7 +444,8 @@ class Twython(EndpointsMixin, object):
         return self.request(endpoint, 'DELETE', params=params, version=version, json_encoded=json_encoded)
 
     def get_lastfunction_header(self, header, default_return_value=None):
-        """Returns a specific header from the last API call
+        """Returns a specific header from the last API call made by the
+        current thread (or asyncio task, for AsyncTwython).
         This will return None if the header is not present
 
         :param header: (required) The name of the header you want to get
@@ -306,6 +464,16 @@ class Twython(EndpointsMixin, object):
 
         return self._last_call['headers'].get(header, default_return_value)
 
+    def get_lastfunction_retries(self):
+        """Returns how many times the last API call was retried by the
+        :class:`RetryPolicy` before it succeeded (or failed for good)
+        """
+        if self._last_call is None:
+            raise TwythonError('This function must be called after an API call. \
+                               It delivers retry information.')
+
+        return self._last_call['retries']
+
     def get_authentication_tokens(self, callback_url=None, force_login=False,
                                   screen_name=''):
         """Returns a dict including an authorization URL, ``auth_url``, to
@@ -469,11 +637,24 @@ class Twython(EndpointsMixin, object):
         )
         return self.cursor(self.search, q=search_query, **params)
 
-    def cursor(self, function, return_pages=False, **params):
+    def cursor(self, function, return_pages=False, prefetch=0,
+               stream_items=False, **params):
         r"""Returns a generator for results that match a specified query.
 
         :param function: Instance of a Twython function
         (Twython.get_home_timeline, Twython.search)
+        :param return_pages: (optional) Yield whole pages of results rather
+        than individual results. Default: False
+        :param prefetch: (optional) Number of pages to request ahead of the
+        consumer on a background thread, so the next page is already on
+        its way while the current one is being processed. At most this
+        many pages are held in memory. Default: 0 (no prefetching)
+        :param stream_items: (optional) Decode each page while it is being
+        read from the socket and yield its results one by one, instead of
+        loading the whole page first. Keeps peak memory down for large
+        pages such as 5000 ids. With ``return_pages``, each page is an
+        iterator that must be consumed before asking for the next one.
+        Can't be combined with ``prefetch``. Default: False
         :param \*\*params: Extra parameters to send with your request
         (usually parameters accepted by the Twitter API endpoint)
         :rtype: generator
@@ -489,6 +670,97 @@ class Twython(EndpointsMixin, object):
           >>>   print result
 
         """
+        self._check_cursor_function(function)
+
+        if stream_items:
+            if prefetch:
+                raise TwythonError('.cursor() can not prefetch pages while \
+                                   streaming items.')
+            pages = self._cursor_streamed_pages(function, params)
+        else:
+            pages = self._cursor_pages(function, params)
+            if prefetch:
+                pages = self._with_last_call(pages)
+                pages = self._restore_last_call(_prefetch(pages, prefetch))
+
+        for results in pages:
+            if return_pages:
+                yield results
+            else:
+                for result in results:
+                    yield result
+
+    def _cursor_pages(self, function, params):
+        """Generator of the successive pages of results of ``function``"""
+        while True:
+            content = function(**params)
+
+            if not content:
+                return
+
+            yield self._get_cursor_results(function, content)
+
+            params = self._get_cursor_params(function, content, params)
+            if params is None:
+                return
+
+    def _with_last_call(self, iterable):
+        """Pair each item with the details of the last call, on the
+        thread producing the items"""
+        for item in iterable:
+            yield item, self._last_call
+
+    def _restore_last_call(self, pairs):
+        """Yield the items of :meth:`_with_last_call` on the consuming
+        thread, making their call its last call"""
+        for item, last_call in pairs:
+            self._last_call = last_call
+            yield item
+
+    def _cursor_streamed_pages(self, function, params):
+        """Generator of the successive pages of results of ``function``,
+        each one a :class:`JSONItemStream` decoding results as they arrive"""
+        key = getattr(function, 'iter_key', None)
+        while True:
+            with self._streaming_items(key):
+                stream = function(**params)
+
+            if not isinstance(stream, JSONItemStream):
+                return
+
+            items = stream
+            if self.models:
+                items = (_models.wrap(item) for item in stream)
+            last = _LastItem(items)
+            yield last
+            # Results the caller didn't read still hold the metadata
+            for _ in last:
+                pass
+
+            if key is not None:
+                content = stream.metadata
+            elif last.item is not None:
+                content = [last.item]
+            else:
+                return
+
+            params = self._get_cursor_params(function, content, params)
+            if params is None:
+                return
+
+    @contextmanager
+    def _streaming_items(self, key):
+        """Make calls from this thread return a :class:`JSONItemStream`
+        over the ``key`` array of the response"""
+        self._local.stream_key = key
+        try:
+            yield
+        finally:
+            del self._local.stream_key
+
+    @staticmethod
+    def _check_cursor_function(function):
+        """Raise if ``function`` can not be used with :meth:`cursor`"""
         if not callable(function):
             raise TypeError('.cursor() takes a Twython function as its first \
                             argument. Did you provide the result of a \
@@ -498,50 +770,175 @@ class Twython(EndpointsMixin, object):
             raise TwythonError('Unable to create generator for Twython \
                                method "%s"' % function.__name__)
 
-        while True:
-            content = function(**params)
+    @staticmethod
+    def _get_cursor_results(function, content):
+        """Return the list of results held by a page of ``content``"""
+        if hasattr(function, 'iter_key'):
+            return content.get(function.iter_key)
+        return content
 
-            if not content:
-                return
+    @staticmethod
+    def _get_cursor_params(function, content, params):
+        """Return the params needed to request the page following
+        ``content``, or None when there are no more pages"""
+        if function.iter_mode == 'cursor' and \
+           content['next_cursor_str'] == '0':
+            return None
 
-            if hasattr(function, 'iter_key'):
-                results = content.get(function.iter_key)
-            else:
-                results = content
+        try:
+            if function.iter_mode == 'id':
+                # Set max_id in params to one less than lowest tweet id
+                if hasattr(function, 'iter_metadata'):
+                    # Get supplied next max_id
+                    metadata = content.get(function.iter_metadata)
+                    if 'next_results' in metadata:
+                        next_results = urlsplit(metadata['next_results'])
+                        params = dict(parse_qsl(next_results.query))
+                    else:
+                        # No more results
+                        return None
+                else:
+                    # Twitter gives tweets in reverse chronological order:
+                    params['max_id'] = str(int(content[-1]['id_str']) - 1)
+            elif function.iter_mode == 'cursor':
+                params['cursor'] = content['next_cursor_str']
+        except (TypeError, ValueError):  # pragma: no cover
+            raise TwythonError('Unable to generate next page of search \
+                               results, `page` is not a number.')
+        except (KeyError, AttributeError):  #pragma no cover
+            raise TwythonError('Unable to generate next page of search \
+                               results, content has unexpected structure.')
+
+        return params
+
+    def lookup_user_bulk(self, users, key='user_id', concurrency=1, **params):
+        r"""Returns a generator of ``(user, result)`` pairs hydrating any
+        number of users through :meth:`lookup_user`, 100 at a time.
+
+        :param users: Iterable of user ids or screen names. It is consumed
+        lazily, so it can be another generator such as
+        ``twitter.cursor(twitter.get_followers_ids)``
+        :param key: (optional) ``user_id`` or ``screen_name``, whichever
+        ``users`` holds. Default: user_id
+        :param concurrency: (optional) Number of batches to request at once
+        on the shared session. Default: 1
+        :param \*\*params: Extra parameters to send with each request
+        (e.g. include_entities)
+        :rtype: generator
 
-            if return_pages:
-                yield results
-            else:
-                for result in results:
-                    yield result
+        Pairs come back in input order. ``result`` is None for users Twitter
+        did not return (suspended, deleted or unknown).
 
-            if function.iter_mode == 'cursor' and \
-               content['next_cursor_str'] == '0':
-                return
+        Usage::
+
+          >>> followers = twitter.cursor(twitter.get_followers_ids, screen_name='twitterapi')
+          >>> for user_id, user in twitter.lookup_user_bulk(followers, concurrency=4):
+          >>>   if user is None:
+          >>>     print('missing', user_id)
+
+        """
+        if key not in ('user_id', 'screen_name'):
+            raise TwythonError('lookup_user_bulk key must be either \
+                               "user_id" or "screen_name".')
+
+        if key == 'user_id':
+            def match(value):
+                return str(value)
+
+            def result_key(user):
+                return user['id_str']
+        else:
+            def match(value):
+                return str(value).lower()
+
+            def result_key(user):
+                return user['screen_name'].lower()
+
+        return self._lookup_bulk(self.lookup_user, users, key, match,
+                                 result_key, concurrency, params)
+
+    def lookup_status_bulk(self, ids, concurrency=1, **params):
+        r"""Returns a generator of ``(id, result)`` pairs hydrating any
+        number of tweets through :meth:`lookup_status`, 100 at a time.
 
+        :param ids: Iterable of tweet ids, consumed lazily
+        :param concurrency: (optional) Number of batches to request at once
+        on the shared session. Default: 1
+        :param \*\*params: Extra parameters to send with each request
+        (e.g. tweet_mode, trim_user)
+        :rtype: generator
+
+        Pairs come back in input order. ``result`` is None for tweets
+        Twitter did not return (deleted, protected or unknown).
+
+        """
+        def match(value):
+            return str(value)
+
+        def result_key(tweet):
+            return tweet['id_str']
+
+        return self._lookup_bulk(self.lookup_status, ids, 'id', match,
+                                 result_key, concurrency, params)
+
+    def _lookup_bulk(self, function, values, key, match, result_key,
+                     concurrency, params):
+        """Request ``values`` through ``function`` in batches of 100 and
+        yield ``(value, result)`` pairs in input order"""
+
+        def lookup(batch):
             try:
-                if function.iter_mode == 'id':
-                    # Set max_id in params to one less than lowest tweet id
-                    if hasattr(function, 'iter_metadata'):
-                        # Get supplied next max_id
-                        metadata = content.get(function.iter_metadata)
-                        if 'next_results' in metadata:
-                            next_results = urlsplit(metadata['next_results'])
-                            params = dict(parse_qsl(next_results.query))
-                        else:
-                            # No more results
-                            return
-                    else:
-                        # Twitter gives tweets in reverse chronological order:
-                        params['max_id'] = str(int(content[-1]['id_str']) - 1)
-                elif function.iter_mode == 'cursor':
-                    params['cursor'] = content['next_cursor_str']
-            except (TypeError, ValueError):  # pragma: no cover
-                raise TwythonError('Unable to generate next page of search \
-                                   results, `page` is not a number.')
-            except (KeyError, AttributeError):  #pragma no cover
-                raise TwythonError('Unable to generate next page of search \
-                                   results, content has unexpected structure.')
+                results = function(**self._get_lookup_params(params, key, batch))
+            except TwythonError as e:
+                if not self._is_lookup_miss(e):
+                    raise
+                results = []
+            return self._match_lookup_results(batch, results, match, result_key)
+
+        batches = _chunks(values, 100)
+        if concurrency <= 1:
+            for batch in batches:
+                for pair in lookup(batch):
+                    yield pair
+            return
+
+        def lookup_on_thread(batch):
+            return lookup(batch), self._last_call
+
+        def oldest_pairs():
+            pairs, self._last_call = pending.popleft().result()
+            return pairs
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(lookup_on_thread, batch))
+                if len(pending) >= concurrency:
+                    for pair in oldest_pairs():
+                        yield pair
+
+            while pending:
+                for pair in oldest_pairs():
+                    yield pair
+
+    @staticmethod
+    def _get_lookup_params(params, key, batch):
+        """Return the params looking up the values of ``batch``"""
+        batch_params = dict(params)
+        batch_params[key] = [str(value) for value in batch]
+        return batch_params
+
+    @staticmethod
+    def _is_lookup_miss(error):
+        """users/lookup answers with a 404 when none of the requested
+        users exist"""
+        return error.error_code == 404
+
+    @staticmethod
+    def _match_lookup_results(batch, results, match, result_key):
+        """Pair every value of ``batch`` with its result, or None"""
+        found = dict((result_key(result), result) for result in results)
+        return [(value, found.get(match(value))) for value in batch]
 
     @staticmethod
     def unicode2utf8(text):
@@ -559,7 +956,8 @@ class Twython(EndpointsMixin, object):
         return str(text)
 
     @staticmethod
-    def html_for_tweet(tweet, use_display_url=True, use_expanded_url=False, expand_quoted_status=False):
+    def html_for_tweet(tweet, use_display_url=True, use_expanded_url=False, expand_quoted_status=False,
+                       cache=None):
         """Return HTML for a tweet (urls, mentions, hashtags, symbols replaced with links)
 
         :param tweet: Tweet object from received from Twitter API
@@ -572,138 +970,46 @@ class Twython(EndpointsMixin, object):
         If use_display_url and use_expanded_url is False, short url will
         be used (t.co/xxxxx)
 
+        :param cache: (optional) A :class:`RenderCache` to look the tweet up
+        in before rendering it, and to keep its HTML in
+
         """
-        if 'retweeted_status' in tweet:
-            tweet = tweet['retweeted_status']
-
-        if 'extended_tweet' in tweet:
-            tweet = tweet['extended_tweet']
-
-        orig_tweet_text = tweet.get('full_text') or tweet['text']
-
-        display_text_range = tweet.get('display_text_range') or [0, len(orig_tweet_text)]
-        display_text_start, display_text_end = display_text_range[0], display_text_range[1]
-        display_text = orig_tweet_text[display_text_start:display_text_end]
-        prefix_text = orig_tweet_text[0:display_text_start]
-        suffix_text = orig_tweet_text[display_text_end:len(orig_tweet_text)]
-
-        if 'entities' in tweet:
-            # We'll put all the bits of replacement HTML and their starts/ends
-            # in this list:
-            entities = []
-
-            # Mentions
-            if 'user_mentions' in tweet['entities']:
-                for entity in tweet['entities']['user_mentions']:
-                    temp = {}
-                    temp['start'] = entity['indices'][0]
-                    temp['end'] = entity['indices'][1]
-
-                    mention_html = '<a href="https://twitter.com/%(screen_name)s" class="twython-mention">@%(screen_name)s</a>' % {'screen_name': entity['screen_name']}
-
-                    if display_text_start <= temp['start'] <= display_text_end:
-                        temp['replacement'] = mention_html
-                        temp['start'] -= display_text_start
-                        temp['end'] -= display_text_start
-                        entities.append(temp)
-                    else:
-                        # Make the '@username' at the start, before
-                        # display_text, into a link:
-                        sub_expr = r'(?<!>)' + orig_tweet_text[temp['start']:temp['end']] + '(?!</a>)'
-                        prefix_text = re.sub(sub_expr, mention_html, prefix_text)
-
-            # Hashtags
-            if 'hashtags' in tweet['entities']:
-                for entity in tweet['entities']['hashtags']:
-                    temp = {}
-                    temp['start'] = entity['indices'][0] - display_text_start
-                    temp['end'] = entity['indices'][1] - display_text_start
-
-                    url_html = '<a href="https://twitter.com/search?q=%%23%(hashtag)s" class="twython-hashtag">#%(hashtag)s</a>' % {'hashtag': entity['text']}
-
-                    temp['replacement'] = url_html
-                    entities.append(temp)
-
-            # Symbols
-            if 'symbols' in tweet['entities']:
-                for entity in tweet['entities']['symbols']:
-                    temp = {}
-                    temp['start'] = entity['indices'][0] - display_text_start
-                    temp['end'] = entity['indices'][1] - display_text_start
-
-                    url_html = '<a href="https://twitter.com/search?q=%%24%(symbol)s" class="twython-symbol">$%(symbol)s</a>' % {'symbol': entity['text']}
-
-                    temp['replacement'] = url_html
-                    entities.append(temp)
-
-            # URLs
-            if 'urls' in tweet['entities']:
-                for entity in tweet['entities']['urls']:
-                    temp = {}
-                    temp['start'] = entity['indices'][0] - display_text_start
-                    temp['end'] = entity['indices'][1] - display_text_start
-
-                    if use_display_url and entity.get('display_url') and not use_expanded_url:
-                        shown_url = entity['display_url']
-                    elif use_expanded_url and entity.get('expanded_url'):
-                        shown_url = entity['expanded_url']
-                    else:
-                        shown_url = entity['url']
+        renderer = _default_renderer(use_display_url, use_expanded_url,
+                                     expand_quoted_status)
+        if cache is not None:
+            return cache.render(renderer, tweet)
+        return renderer.render(tweet)
 
-                    url_html = '<a href="%s" class="twython-url">%s</a>' % (entity['url'], shown_url)
+    @staticmethod
+    def html_for_tweets(tweets, use_display_url=True, use_expanded_url=False,
+                        expand_quoted_status=False, processes=0, batch_size=100,
+                        cache=None):
+        """Returns a generator of the HTML of each tweet of ``tweets``, in
+        order, as :meth:`html_for_tweet` renders it
+
+        :param tweets: Iterable of tweet objects, consumed lazily
+        :param use_display_url: (optional) See :meth:`html_for_tweet`
+        :param use_expanded_url: (optional) See :meth:`html_for_tweet`
+        :param expand_quoted_status: (optional) See :meth:`html_for_tweet`
+        :param processes: (optional) Number of processes rendering batches
+        of tweets at once, for large archives. Default: 0, render in this
+        process
+        :param batch_size: (optional) Tweets sent to a process at a time.
+        Default: 100
+        :param cache: (optional) A :class:`RenderCache`, see
+        :meth:`html_for_tweet`. Processes only share what its backend holds.
+        :rtype: generator
 
-                    if display_text_start <= temp['start'] <= display_text_end:
-                        temp['replacement'] = url_html
-                        entities.append(temp)
-                    else:
-                        suffix_text = suffix_text.replace(orig_tweet_text[temp['start']:temp['end']], url_html)
-
-            if 'media' in tweet['entities'] and len(tweet['entities']['media']) > 0:
-                # We just link to the overall URL for the tweet's media,
-                # rather than to each individual item.
-                # So, we get the URL from the first media item:
-                entity = tweet['entities']['media'][0]
-
-                temp = {}
-                temp['start'] = entity['indices'][0]
-                temp['end'] = entity['indices'][1]
-
-                if use_display_url and entity.get('display_url') and not use_expanded_url:
-                    shown_url = entity['display_url']
-                elif use_expanded_url and entity.get('expanded_url'):
-                    shown_url = entity['expanded_url']
-                else:
-                    shown_url = entity['url']
+        Usage::
 
-                url_html = '<a href="%s" class="twython-media">%s</a>' % (entity['url'], shown_url)
+          >>> with open('tweets.jsonl') as f:
+          >>>   tweets = (json.loads(line) for line in f)
+          >>>   for html in Twython.html_for_tweets(tweets, processes=4):
+          >>>     print(html)
 
-                if display_text_start <= temp['start'] <= display_text_end:
-                    temp['replacement'] = url_html
-                    entities.append(temp)
-                else:
-                    suffix_text = suffix_text.replace(orig_tweet_text[temp['start']:temp['end']], url_html)
-
-            # Now do all the replacements, starting from the end, so that the
-            # start/end indices still work:
-            for entity in sorted(entities, key=lambda e: e['start'], reverse=True):
-                display_text = display_text[0:entity['start']] + entity['replacement'] + display_text[entity['end']:]
-
-        quote_text = ''
-        if expand_quoted_status and tweet.get('is_quote_status') and tweet.get('quoted_status'):
-            quoted_status = tweet['quoted_status']
-            quote_text += '<blockquote class="twython-quote">%(quote)s<cite><a href="%(quote_tweet_link)s">' \
-                    '<span class="twython-quote-user-name">%(quote_user_name)s</span>' \
-                    '<span class="twython-quote-user-screenname">@%(quote_user_screen_name)s</span></a>' \
-                    '</cite></blockquote>' % \
-                    {'quote': Twython.html_for_tweet(quoted_status, use_display_url, use_expanded_url, False),
-                     'quote_tweet_link': 'https://twitter.com/%s/status/%s' %
-                                         (quoted_status['user']['screen_name'], quoted_status['id_str']),
-                     'quote_user_name': quoted_status['user']['name'],
-                     'quote_user_screen_name': quoted_status['user']['screen_name']}
-
-        return '%(prefix)s%(display)s%(suffix)s%(quote)s' % {
-            'prefix': '<span class="twython-tweet-prefix">%s</span>' % prefix_text if prefix_text else '',
-            'display': display_text,
-            'suffix': '<span class="twython-tweet-suffix">%s</span>' % suffix_text if suffix_text else '',
-            'quote': quote_text
-        }
+        """
+        renderer = _default_renderer(use_display_url, use_expanded_url,
+                                     expand_quoted_status)
+        if cache is not None:
+            renderer = _with_cache(renderer, cache)
+        return renderer.render_many(tweets, processes, batch_size)
@@ -26,6 +26,7 @@ except ImportError:
 if is_py2:
     from urllib import urlencode, quote_plus
     from urlparse import parse_qsl, urlsplit
+    import Queue as queue
 
     str = unicode
     basestring = basestring
@@ -34,7 +35,63 @@ if is_py2:
 
 elif is_py3:
     from urllib.parse import urlencode, quote_plus, parse_qsl, urlsplit
+    import queue
 
     str = str
     basestring = (str, bytes)
     numeric_types = (int, float)
+
+
+#: JSON backends Twython knows how to use, fastest first
+JSON_BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+
+def _memoryview_to_bytes(loads):
+    def _loads(s):
+        if isinstance(s, memoryview):
+            s = s.tobytes()
+        return loads(s)
+    return _loads
+
+
+def get_json_loads(backend=None):
+    """Return a ``loads`` function for a JSON backend. The function accepts
+    ``str`` and ``bytes`` (and ``memoryview``), so raw response bodies and
+    stream lines can be decoded without first being decoded to ``str``.
+
+    :param backend: (optional) One of :data:`JSON_BACKENDS`, ``'auto'`` for
+    the fastest one installed, or a callable to use as is. Default: None,
+    the ``json`` module imported above (simplejson if installed)
+    """
+    if callable(backend):
+        return backend
+
+    if backend is None:
+        module, name = json, json.__name__
+    elif backend == 'auto':
+        for name in JSON_BACKENDS:
+            try:
+                return get_json_loads(name)
+            except ImportError:
+                continue
+    elif backend in JSON_BACKENDS:
+        module, name = __import__(backend), backend
+    else:
+        raise ValueError('Unknown JSON backend %r, expected one of %s' %
+                         (backend, ', '.join(JSON_BACKENDS)))
+
+    if name == 'orjson':
+        # orjson reads memoryviews directly
+        return module.loads
+
+    loads = module.loads
+    if name == 'json' and _ver < (3, 6):  # pragma: no cover
+        # The standard library only accepts bytes from Python 3.6
+        json_loads = loads
+
+        def loads(s):
+            if isinstance(s, bytes):
+                s = s.decode('utf-8')
+            return json_loads(s)
+
+    return _memoryview_to_bytes(loads)
@@ -8,7 +8,10 @@ This module contains functions that are repeatedly used throughout
 the Twython library.
 """
 
-from .compat import basestring, numeric_types
+import threading
+from itertools import islice
+
+from .compat import basestring, numeric_types, queue
 
 
 def _transparent_params(_params):
@@ -32,3 +35,62 @@ def _transparent_params(_params):
         else:
             continue  # pragma: no cover
     return params, files
+
+
+def _chunks(iterable, size):
+    """Lazily split ``iterable`` into lists of at most ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_PREFETCH_DONE = object()
+
+
+def _prefetch(iterable, depth):
+    """Iterate ``iterable`` on a background thread, keeping up to ``depth``
+    items ready ahead of the consumer.
+
+    Exceptions raised while producing items are re-raised in the consumer.
+    Closing the returned generator stops the background thread after the
+    item it is currently producing.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_PREFETCH_DONE, e))
+        else:
+            put((_PREFETCH_DONE, None))
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _PREFETCH_DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
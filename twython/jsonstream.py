@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.jsonstream
+~~~~~~~~~~~~~~~~~~
+
+This module contains an incremental JSON reader that yields the items of
+one array of a response as the body arrives, so large pages never have to
+be held in memory as a whole string and a whole object tree at once.
+"""
+
+import codecs
+import numbers
+
+from .compat import json
+from .exceptions import TwythonError
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class JSONItemStream(object):
+    """Iterates the items of a JSON array while it is being read.
+
+    :param chunks: Iterable of ``bytes`` making up the JSON document (e.g.
+    ``response.iter_content(16384)``)
+    :param key: (optional) Name of the top level key holding the array to
+    stream (e.g. ``ids``, ``users``, ``statuses``). When None, the document
+    itself must be an array.
+    :param close: (optional) Called once the document has been read, or
+    when the stream is closed early
+
+    Every other top level value of the document is decoded normally and is
+    available from :attr:`metadata` once the items have been consumed.
+    """
+    def __init__(self, chunks, key=None, close=None):
+        self.key = key
+        self.metadata = {}
+
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._items = self._iter_items()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+    next = __next__  # Python 2
+
+    def close(self):
+        """Stop reading and release the underlying response"""
+        self._items.close()
+
+    def exhaust(self):
+        """Read (and discard) the remaining items, so that :attr:`metadata`
+        is complete"""
+        for _ in self._items:
+            pass
+        return self.metadata
+
+    def _read(self):
+        """Append the next chunk to the buffer; False at end of document"""
+        if self._eof:
+            return False
+
+        # Drop what has been consumed once it is the bigger part of the
+        # buffer, so the copy is amortized
+        if self._pos > len(self._buffer) // 2:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+
+        self._buffer += self._utf8.decode(b'', final=True)
+        self._eof = True
+        return True
+
+    def _peek(self):
+        """Return the next non whitespace character, without consuming it"""
+        while True:
+            buffer, pos = self._buffer, self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._read():
+                raise TwythonError('Response ended before the JSON document did.')
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise TwythonError('Response was not valid JSON. Unable to decode.')
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        """Decode the complete JSON value at the current position"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                end = None
+
+            # A value running to the very end of the buffer (e.g. a number)
+            # might carry on in the next chunk
+            if end is not None and (self._eof or not (
+                    end == len(self._buffer) or
+                    self._is_cut_number(value, end))):
+                self._pos = end
+                return value
+
+            if not self._read():
+                raise TwythonError('Response was not valid JSON. Unable to decode.')
+
+    def _is_cut_number(self, value, end):
+        """True if ``value`` is a number whose fraction or exponent may
+        have been cut off at the end of the buffer (``1.`` decodes as 1)"""
+        if not isinstance(value, numbers.Number) or isinstance(value, bool):
+            return False
+        return _NUMBER_CHARS.issuperset(self._buffer[end:])
+
+    def _iter_array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+            if self._expect(',]') == ']':
+                return
+
+    def _iter_items(self):
+        try:
+            if self.key is None:
+                for item in self._iter_array():
+                    yield item
+                return
+
+            self._expect('{')
+            if self._peek() == '}':
+                return
+
+            while True:
+                if self._peek() != '"':
+                    raise TwythonError('Response was not valid JSON. Unable to decode.')
+                name = self._decode_value()
+                self._expect(':')
+
+                if name == self.key and self._peek() == '[':
+                    for item in self._iter_array():
+                        yield item
+                else:
+                    self.metadata[name] = self._decode_value()
+
+                if self._expect(',}') == '}':
+                    return
+        finally:
+            self._buffer = ''
+            if self._close is not None:
+                self._close()
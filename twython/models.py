@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.models
+~~~~~~~~~~~~~~
+
+This module contains :class:`Tweet`, :class:`User` and :class:`Entity`,
+compact objects that keep the raw JSON of what Twitter sent and only
+decode it when one of their fields is first read. Pass ``models=True`` to
+:class:`Twython` or :class:`TwythonStreamer` to get them instead of dicts.
+"""
+
+import re
+
+from .compat import get_json_loads
+
+# Ends at the next bracket outside of a string
+_TO_BRACKET = re.compile(br'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*[\[\]{}]')
+# A string, and the colon following it if it is a key. Outside of strings
+# every quote opens one, so searching from a token boundary stays aligned.
+_STRING = re.compile(br'"((?:[^"\\]|\\.)*)"\s*(:?)')
+
+
+class Model(object):
+    """Fields of the JSON object are read as attributes (``tweet.text``)
+    or, like a dict, as items (``tweet['text']``, ``tweet.get('text')``).
+    Items are the decoded values; attributes turn the nested objects listed
+    by a model into models too, or None when Twitter left them out.
+
+    :param data: (optional) The decoded object
+    :param raw: (optional) The JSON of the object, as bytes, decoded on
+    first access instead
+    :param loads: (optional) Function decoding ``raw``. Default: the one
+    of :func:`get_json_loads`
+    """
+    __slots__ = ('_raw', '_data', '_loads')
+
+    def __init__(self, data=None, raw=None, loads=None):
+        self._data = data
+        self._raw = raw
+        self._loads = loads
+
+    @classmethod
+    def from_json(cls, raw, loads=None):
+        """A model of the JSON object ``raw`` (bytes), left undecoded"""
+        return cls(raw=raw, loads=loads)
+
+    def to_dict(self):
+        """Returns the decoded object
+
+        :rtype: dict
+        """
+        if self._data is None:
+            loads = self._loads or _default_loads()
+            self._data = loads(self._raw)
+            # The decoded object replaces the JSON
+            self._raw = self._loads = None
+        return self._data
+
+    def __getattr__(self, name):
+        # Unset slots land here too: they are not fields
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self.to_dict()[name]
+        except KeyError:
+            raise AttributeError('%s has no field %r' % (type(self).__name__, name))
+
+    def __getitem__(self, key):
+        return self.to_dict()[key]
+
+    def get(self, key, default=None):
+        return self.to_dict().get(key, default)
+
+    def __contains__(self, key):
+        return key in self.to_dict()
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __eq__(self, other):
+        if isinstance(other, Model):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.get('id_str'))
+
+
+class _Nested(object):
+    """A nested object returned as a model, made on first access"""
+    def __init__(self, key, model):
+        self.key = key
+        self.model = model
+        self.slot = '_' + key
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            pass
+        value = instance.get(self.key)
+        if value is not None:
+            value = self.wrap(value)
+        setattr(instance, self.slot, value)
+        return value
+
+    def wrap(self, value):
+        return _MODELS[self.model](value)
+
+
+class _NestedEntities(_Nested):
+    """``entities``, a dict of lists of :class:`Entity` by kind"""
+    def wrap(self, value):
+        return dict((kind, [Entity(entity) for entity in entities])
+                    if isinstance(entities, list) else (kind, entities)
+                    for kind, entities in value.items())
+
+
+class Entity(Model):
+    """A hashtag, mention, url, symbol or media item of a tweet"""
+    __slots__ = ()
+
+
+class User(Model):
+    """A Twitter user. ``status`` is a :class:`Tweet`."""
+    __slots__ = ('_status', '_entities')
+
+    status = _Nested('status', 'Tweet')
+    entities = _NestedEntities('entities', 'Entity')
+
+
+class Tweet(Model):
+    """A tweet. ``user`` is a :class:`User`, ``retweeted_status`` and
+    ``quoted_status`` are :class:`Tweet` and ``entities`` maps each kind
+    of entity to a list of :class:`Entity`."""
+    __slots__ = ('_user', '_retweeted_status', '_quoted_status', '_entities')
+
+    user = _Nested('user', 'User')
+    retweeted_status = _Nested('retweeted_status', 'Tweet')
+    quoted_status = _Nested('quoted_status', 'Tweet')
+    entities = _NestedEntities('entities', 'Entity')
+
+
+_MODELS = {'Entity': Entity, 'Tweet': Tweet, 'User': User}
+
+_json_loads = get_json_loads()
+
+
+def _default_loads():
+    return _json_loads
+
+
+def _model_for_dict(data):
+    """The model of an object, from its keys (a dict or a set)"""
+    if 'user' in data and ('text' in data or 'full_text' in data):
+        return Tweet
+    if 'screen_name' in data:
+        return User
+    return None
+
+
+def _keys(run):
+    """The keys in ``run``, JSON starting at a token boundary"""
+    return [match.group(1).decode('utf-8')
+            for match in _STRING.finditer(run) if match.group(2)]
+
+
+def _top_level_keys(raw):
+    """The keys of the JSON object ``raw``, without those of the objects
+    it holds"""
+    keys = set()
+    depth = 0
+    for match in _TO_BRACKET.finditer(raw):
+        if depth == 1:
+            keys.update(_keys(match.group()))
+        if match.group()[-1:] in (b'{', b'['):
+            depth += 1
+        else:
+            depth -= 1
+    return keys
+
+
+def _model_for_json(raw):
+    # Nothing to scan for in most stream messages (deletes, limits...)
+    if b'"user"' not in raw and b'"screen_name"' not in raw:
+        return None
+    return _model_for_dict(_top_level_keys(raw))
+
+
+def wrap(data):
+    """Turn the tweets and users of a decoded response (on its own, in a
+    list, or under ``statuses`` or ``users``) into models"""
+    if isinstance(data, list):
+        return [wrap(item) if isinstance(item, dict) else item for item in data]
+    if isinstance(data, dict):
+        model = _model_for_dict(data)
+        if model is not None:
+            return model(data)
+        for key in ('statuses', 'users'):
+            if isinstance(data.get(key), list):
+                data[key] = wrap(data[key])
+    return data
+
+
+def _split_array(body):
+    """The raw JSON and the top level keys of each object of the array
+    ``body``, or None if it isn't an array of objects"""
+    body = body.strip()
+    if body[:1] != b'[':
+        return None
+
+    items = []
+    depth = 0
+    start = 0
+    keys = None
+    # Where the last object ended, or the opening bracket
+    end = 1
+    for match in _TO_BRACKET.finditer(body):
+        pos = match.end()
+        bracket = body[pos - 1:pos]
+        if depth == 2:
+            keys.update(_keys(match.group()))
+        if bracket in (b'{', b'['):
+            depth += 1
+            if depth == 2:
+                # Objects only, separated by commas
+                if bracket == b'[' or body[end:pos - 1].strip() != (b',' if items else b''):
+                    return None
+                start = pos - 1
+                keys = set()
+        else:
+            if depth == 2:
+                items.append((body[start:pos], keys))
+                end = pos
+            depth -= 1
+    if depth != 0 or body[end:].strip() != b']':
+        return None
+    return items
+
+
+def loads_object(raw, json_loads=None):
+    """A model of the JSON object ``raw`` (bytes), left undecoded, if it is
+    a tweet or a user. Anything else is decoded.
+
+    :param json_loads: (optional) Function decoding JSON
+    """
+    return _from_json(raw, _model_for_json(raw), json_loads)
+
+
+def _from_json(raw, model, json_loads):
+    if model is None:
+        return wrap((json_loads or _default_loads())(raw))
+    return model(raw=raw, loads=json_loads)
+
+
+def loads(body, json_loads=None):
+    """Decode a response body with its tweets and users as models. The
+    objects of a top level array are only split apart: each one is decoded
+    when it is first read.
+
+    :param body: The response body, as bytes
+    :param json_loads: (optional) Function decoding JSON
+    """
+    items = _split_array(body)
+    if items is None:
+        return wrap((json_loads or _default_loads())(body))
+    return [_from_json(raw, _model_for_dict(keys), json_loads)
+            for raw, keys in items]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.pool
+~~~~~~~~~~~~
+
+This module contains :class:`TwythonPool`, which serves many user
+accounts of one application over a single shared connection pool.
+"""
+
+import threading
+
+from requests_oauthlib import OAuth1
+
+from .api import Twython
+from .exceptions import TwythonError
+from .ratelimit import RateLimiter
+
+
+class TwythonPool(object):
+    """Holds the OAuth 1 tokens of many users of one application and hands
+    out a client per user. Every client sends its calls over the same
+    ``requests`` session (headers, adapters and connection pools), signed
+    with its own token, and has its own :class:`RateLimiter`.
+
+    Clients are built the first time an account is used, so registering
+    thousands of tokens only costs the tokens themselves. Usage::
+
+      >>> from twython import TwythonPool
+      >>> pool = TwythonPool(APP_KEY, APP_SECRET,
+      client_args={'pool_maxsize': 32})
+      >>> pool.add_account('alice', ALICE_TOKEN, ALICE_SECRET)
+      >>> pool.add_account('bob', BOB_TOKEN, BOB_SECRET)
+
+      >>> pool['alice'].get_home_timeline()
+      >>> account = pool.choose_account('/search/tweets')
+      >>> pool[account].search(q='python')
+
+    """
+    def __init__(self, app_key, app_secret, client_args=None,
+                 api_version='1.1', rate_limit=True, retry_policy=None):
+        """
+        :param app_key: (required) Your applications key
+        :param app_secret: (required) Your applications secret key
+        :param client_args: (optional) Same as for :class:`Twython`; applied
+        once to the shared session
+        :param api_version: (optional) Choose which Twitter API version to
+        use. Default: 1.1
+        :param rate_limit: (optional) Give every account its own
+        :class:`RateLimiter` so calls wait for the next window rather
+        than failing with a 429. Default: True
+        :param retry_policy: (optional) A :class:`RetryPolicy` used by
+        every account
+        """
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.rate_limit = rate_limit
+
+        # Build the session (and its adapters) once; account clients are
+        # copies of this unauthenticated client with their own auth.
+        self._template = Twython(app_key, app_secret, api_version=api_version,
+                                 client_args=client_args,
+                                 retry_policy=retry_policy)
+        self._template.client.auth = None
+        self.session = self._template.client
+
+        self._tokens = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<TwythonPool: %s (%d accounts)>' % (self.app_key, len(self))
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, account):
+        return account in self._tokens
+
+    def __iter__(self):
+        return iter(list(self._tokens))
+
+    def __getitem__(self, account):
+        """Return the client for ``account``, building it on first use"""
+        client = self._clients.get(account)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(account)
+            if client is None:
+                try:
+                    oauth_token, oauth_token_secret = self._tokens[account]
+                except KeyError:
+                    raise TwythonError('Unknown TwythonPool account "%s".' % account)
+                client = PooledTwython(self, account, oauth_token,
+                                       oauth_token_secret)
+                self._clients[account] = client
+        return client
+
+    def add_account(self, account, oauth_token, oauth_token_secret):
+        """Register the tokens of a user under ``account`` (any hashable
+        name, e.g. a user id). Replaces the tokens of an existing account."""
+        with self._lock:
+            self._tokens[account] = (oauth_token, oauth_token_secret)
+            self._clients.pop(account, None)
+
+    def remove_account(self, account):
+        """Forget the tokens and client of ``account``"""
+        with self._lock:
+            self._tokens.pop(account, None)
+            self._clients.pop(account, None)
+
+    def call(self, account, function_name, **params):
+        r"""Call a Twython method as ``account``
+
+        :param account: Name the account was registered under
+        :param function_name: Name of a Twython method (e.g. ``search``)
+        :param \*\*params: Parameters for the method
+        """
+        return getattr(self[account], function_name)(**params)
+
+    def choose_account(self, resource):
+        """Return the account with the most calls left for a rate limit
+        resource (e.g. ``/statuses/user_timeline`` or a full url).
+        Accounts which haven't called the resource yet are preferred."""
+        best, best_remaining = None, -1
+        for account in self:
+            client = self._clients.get(account)
+            remaining = None
+            if client is not None and client.rate_limiter is not None:
+                remaining = client.rate_limiter.remaining(resource)
+            if remaining is None:
+                return account
+            if remaining > best_remaining:
+                best, best_remaining = account, remaining
+
+        if best is None:
+            raise TwythonError('TwythonPool has no accounts.')
+        return best
+
+
+class PooledTwython(Twython):
+    """A :class:`Twython` client for one account of a
+    :class:`TwythonPool`. Don't create these yourself; use
+    ``pool[account]``."""
+    def __init__(self, pool, account, oauth_token, oauth_token_secret):
+        # Deliberately skips Twython.__init__: the session, its headers
+        # and adapters belong to the pool and are shared.
+        self.__dict__.update(pool._template.__dict__)
+
+        self.pool = pool
+        self.account = account
+        self.oauth_token = oauth_token
+        self.oauth_token_secret = oauth_token_secret
+        self.auth = OAuth1(pool.app_key, pool.app_secret,
+                           oauth_token, oauth_token_secret)
+        self.rate_limiter = RateLimiter() if pool.rate_limit else None
+        self._local = threading.local()
+        self._last_call = None
+
+    def __repr__(self):
+        return '<PooledTwython: %s>' % (self.account,)
+
+    def _get_requests_args(self, method, params=None, json_encoded=False):
+        requests_args = super(PooledTwython, self)._get_requests_args(
+            method, params, json_encoded)
+        # The session is shared, so authenticate per request
+        requests_args['auth'] = self.auth
+        return requests_args
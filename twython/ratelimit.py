@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.ratelimit
+~~~~~~~~~~~~~~~~~
+
+This module contains a scheduler that paces calls to the Twitter API
+from the ``X-Rate-Limit-*`` headers Twitter sends back, so calls wait
+for the next rate limit window instead of failing with a 429.
+"""
+
+import re
+import threading
+import time
+
+from .compat import urlsplit
+
+#: Length in seconds of a Twitter API rate limit window
+RATE_LIMIT_WINDOW = 15 * 60
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def _get_header(headers, name):
+    value = headers.get(name)
+    if value is None:
+        name = name.lower()
+        for k, v in headers.items():
+            if k.lower() == name:
+                return v
+    return value
+
+
+class _Bucket(object):
+    __slots__ = ('limit', 'remaining', 'reset', 'queued')
+
+    def __init__(self, limit, remaining, reset):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        # Calls that were handed a token from a future window
+        self.queued = 0
+
+
+class RateLimiter(object):
+    """Token bucket per API resource (e.g. ``/statuses/user_timeline``).
+
+    Buckets are filled from the ``x-rate-limit-limit``,
+    ``x-rate-limit-remaining`` and ``x-rate-limit-reset`` headers of every
+    response, or seeded up front with :meth:`seed`. When a bucket is empty
+    the caller is handed a token from the next window and told how long to
+    wait for it, so concurrent callers line up across windows in the order
+    they asked instead of all retrying at once. Resources that haven't
+    been seen yet are never delayed.
+
+    Share one instance between every client using the same credentials
+    (threads included). Usage::
+
+      >>> from twython import Twython, RateLimiter
+      >>> limiter = RateLimiter()
+      >>> twitter = Twython(APP_KEY, APP_SECRET, OAUTH_TOKEN,
+      OAUTH_TOKEN_SECRET, rate_limiter=limiter)
+      >>> limiter.seed(twitter.get_application_rate_limit_status())
+
+    """
+    def __init__(self, margin=1.0, window=RATE_LIMIT_WINDOW,
+                 clock=time.time, sleep=time.sleep):
+        """
+        :param margin: (optional) Seconds added to every wait to absorb
+        clock skew with Twitter's servers. Default: 1
+        :param window: (optional) Length of a rate limit window in
+        seconds. Default: 900
+        :param clock: (optional) Function returning the current epoch time
+        :param sleep: (optional) Function used to wait in :meth:`acquire`
+        """
+        self.margin = margin
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_resource(url):
+        """Return the rate limit resource a url is counted against,
+        e.g. ``https://api.twitter.com/1.1/statuses/show/20.json`` is
+        counted against ``/statuses/show/:id``"""
+        path = urlsplit(url).path
+        if path.endswith('.json'):
+            path = path[:-5]
+        # Strip the API version
+        parts = path.split('/', 2)
+        if len(parts) == 3 and parts[1].replace('.', '').isdigit():
+            path = '/' + parts[2]
+        return _ID_SEGMENT.sub('/:id', path)
+
+    def _refill(self, bucket, now):
+        while bucket.reset <= now:
+            bucket.reset += self.window
+            bucket.remaining = max(0, bucket.limit - bucket.queued)
+            bucket.queued = max(0, bucket.queued - bucket.limit)
+
+    def reserve(self, url):
+        """Take a token for ``url`` and return how many seconds the caller
+        must wait before sending the request (0 when it can go now)"""
+        resource = self.get_resource(url)
+        with self._lock:
+            bucket = self._buckets.get(resource)
+            if bucket is None or not bucket.limit:
+                return 0
+
+            now = self.clock()
+            self._refill(bucket, now)
+
+            if bucket.remaining > 0:
+                bucket.remaining -= 1
+                return 0
+
+            windows = bucket.queued // bucket.limit
+            bucket.queued += 1
+            return max(0, bucket.reset - now) + windows * self.window + \
+                self.margin
+
+    def acquire(self, url):
+        """Block until a request to ``url`` may be sent. Returns the
+        number of seconds waited."""
+        delay = self.reserve(url)
+        if delay:
+            self.sleep(delay)
+        return delay
+
+    def update(self, url, headers):
+        """Update the bucket for ``url`` from the headers of a response"""
+        try:
+            limit = int(_get_header(headers, 'x-rate-limit-limit'))
+            remaining = int(_get_header(headers, 'x-rate-limit-remaining'))
+            reset = int(_get_header(headers, 'x-rate-limit-reset'))
+        except (TypeError, ValueError):
+            return
+
+        self._set(self.get_resource(url), limit, remaining, reset)
+
+    def _set(self, resource, limit, remaining, reset):
+        with self._lock:
+            bucket = self._buckets.get(resource)
+            if bucket is None:
+                self._buckets[resource] = _Bucket(limit, remaining, reset)
+                return
+
+            self._refill(bucket, self.clock())
+            bucket.limit = limit
+            if reset > bucket.reset:
+                # Twitter's count is authoritative for a new window
+                bucket.remaining = max(0, remaining - bucket.queued)
+                bucket.reset = reset
+            else:
+                # Other calls from this process may still be in flight,
+                # so keep whichever count is lower
+                bucket.remaining = min(bucket.remaining, remaining)
+
+    def seed(self, rate_limit_status):
+        """Fill the buckets from the response of
+        :meth:`Twython.get_application_rate_limit_status`"""
+        for family in rate_limit_status.get('resources', {}).values():
+            for resource, status in family.items():
+                self._set(resource, int(status['limit']),
+                          int(status['remaining']), int(status['reset']))
+
+    def remaining(self, url_or_resource):
+        """Return the number of calls left in the current window for a url
+        or resource, or None if it hasn't been seen yet"""
+        resource = url_or_resource
+        if '://' in resource or resource.endswith('.json'):
+            resource = self.get_resource(resource)
+
+        with self._lock:
+            bucket = self._buckets.get(resource)
+            if bucket is None:
+                return None
+            self._refill(bucket, self.clock())
+            return bucket.remaining
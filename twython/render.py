@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.render
+~~~~~~~~~~~~~~
+
+This module contains :class:`TweetRenderer`, which turns the entities of
+tweets (mentions, hashtags, symbols, urls, media) into links, and is behind
+:meth:`Twython.html_for_tweet` and :meth:`Twython.html_for_tweets`, and
+:class:`RenderCache`, which keeps the HTML of tweets rendered before.
+"""
+
+import copy
+import hashlib
+import html
+import re
+import string
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+
+from .helpers import _chunks
+
+#: The fields each template can use. ``shown`` is the text of a url link,
+#: chosen from ``use_display_url`` and ``use_expanded_url``. ``html`` is
+#: the rendered text before or after the display range of the tweet, or
+#: the rendered quoted tweet.
+TEMPLATE_FIELDS = {
+    'mention': ('screen_name', 'name', 'id_str'),
+    'hashtag': ('text',),
+    'symbol': ('text',),
+    'url': ('url', 'shown', 'display_url', 'expanded_url'),
+    'media': ('url', 'shown', 'display_url', 'expanded_url', 'media_url_https', 'id_str'),
+    'prefix': ('html',),
+    'suffix': ('html',),
+    'quote': ('html', 'screen_name', 'name', 'id_str'),
+}
+
+# Fields holding HTML, never escaped
+_HTML_FIELDS = ('html',)
+
+_ENTITY_KINDS = ('user_mentions', 'hashtags', 'symbols', 'urls', 'media')
+
+
+@lru_cache(maxsize=1024)
+def _prefix_mention_pattern(mention):
+    """Matches ``mention`` where it isn't linked yet"""
+    return re.compile(r'(?<!>)' + mention + '(?!</a>)')
+
+
+def _compile(kind, template):
+    """Turn a ``str.format`` template into a ``%`` format string and the
+    names of its fields, so rendering doesn't parse it again"""
+    parts = []
+    fields = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if field is None:
+            continue
+        if field not in TEMPLATE_FIELDS[kind] or spec or conversion:
+            raise ValueError('Invalid field {%s} in the %s template, it can use %s' %
+                             (field, kind, ', '.join(TEMPLATE_FIELDS[kind])))
+        parts.append('%s')
+        fields.append(field)
+    return ''.join(parts), tuple(fields)
+
+
+def _replace_entities(text, entities):
+    """Replace the ``(start, end, replacement)`` spans of ``text``.
+
+    Entities that follow each other without overlapping (all of them, for
+    tweets from Twitter) are written in one pass. Anything else is spliced
+    in from the last one backwards, one at a time, as it always was.
+    """
+    entities.sort(key=itemgetter(0))
+    parts = []
+    pos = 0
+    last_start = -1
+    length = len(text)
+    for start, end, replacement in entities:
+        if not (pos <= start <= end <= length) or start == last_start:
+            break
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+        last_start = start
+    else:
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+    for start, end, replacement in sorted(entities, key=itemgetter(0), reverse=True):
+        text = text[0:start] + replacement + text[end:]
+    return text
+
+
+def _render_batch(renderer, tweets):
+    """Render a batch of tweets in a worker process"""
+    return [renderer.render(tweet) for tweet in tweets]
+
+
+class TweetRenderer(object):
+    #: The markup of :meth:`Twython.html_for_tweet`
+    TEMPLATES = {
+        'mention': '<a href="https://twitter.com/{screen_name}" class="twython-mention">@{screen_name}</a>',
+        'hashtag': '<a href="https://twitter.com/search?q=%23{text}" class="twython-hashtag">#{text}</a>',
+        'symbol': '<a href="https://twitter.com/search?q=%24{text}" class="twython-symbol">${text}</a>',
+        'url': '<a href="{url}" class="twython-url">{shown}</a>',
+        'media': '<a href="{url}" class="twython-media">{shown}</a>',
+        'prefix': '<span class="twython-tweet-prefix">{html}</span>',
+        'suffix': '<span class="twython-tweet-suffix">{html}</span>',
+        'quote': '<blockquote class="twython-quote">{html}<cite><a href="https://twitter.com/{screen_name}/status/{id_str}">'
+                 '<span class="twython-quote-user-name">{name}</span>'
+                 '<span class="twython-quote-user-screenname">@{screen_name}</span></a>'
+                 '</cite></blockquote>',
+    }
+
+    def __init__(self, templates=None, escape=None, use_display_url=True,
+                 use_expanded_url=False, expand_quoted_status=False, cache=None):
+        """Renders tweets as HTML with your own markup. The templates are
+        compiled once, so build one renderer and reuse it.
+
+        :param templates: (optional) ``str.format`` templates replacing some
+                          of ``TEMPLATES``, by kind ('mention', 'hashtag',
+                          'symbol', 'url', 'media', 'prefix', 'suffix',
+                          'quote'). See ``TEMPLATE_FIELDS`` for the fields
+                          each can use
+        :param escape: (optional) Applied to every field put in a template,
+                       except the ones already holding HTML: 'html' to
+                       escape them with ``html.escape``, or a function.
+                       With ``processes``, it must be picklable.
+                       Default: None, fields are put in as they are
+        :param use_display_url: (optional) See :meth:`Twython.html_for_tweet`
+        :param use_expanded_url: (optional) See :meth:`Twython.html_for_tweet`
+        :param expand_quoted_status: (optional) See
+                                     :meth:`Twython.html_for_tweet`
+        :param cache: (optional) A :class:`RenderCache` keeping the HTML of
+                      the tweets rendered, by id
+        """
+        merged = dict(self.TEMPLATES)
+        for kind, template in (templates or {}).items():
+            if kind not in merged:
+                raise ValueError('Unknown template %r, expected one of %s' %
+                                 (kind, ', '.join(sorted(merged))))
+            merged[kind] = template
+        self.templates = merged
+        self._compiled = dict((kind, _compile(kind, template))
+                              for kind, template in merged.items())
+
+        if escape == 'html':
+            escape = html.escape
+        self.escape = escape
+        self._formatters = dict((kind, self._formatter(*compiled))
+                                for kind, compiled in self._compiled.items())
+
+        # The entity key holding the text of url links, None to show the
+        # short url
+        if use_display_url and not use_expanded_url:
+            self._url_key = 'display_url'
+        elif use_expanded_url:
+            self._url_key = 'expanded_url'
+        else:
+            self._url_key = None
+        self.expand_quoted_status = expand_quoted_status
+        self.cache = cache
+
+        # Tells the HTML of different renderers apart in a cache
+        escape_name = '%s.%s' % (getattr(escape, '__module__', ''),
+                                 getattr(escape, '__qualname__', repr(escape)))
+        options = repr((sorted(merged.items()), escape_name, self._url_key,
+                        expand_quoted_status))
+        self.options_key = hashlib.sha1(options.encode('utf-8')).hexdigest()[:16]
+
+    def __getstate__(self):
+        # The formatters are rebuilt rather than pickled for processes
+        state = dict(self.__dict__)
+        del state['_formatters']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._formatters = dict((kind, self._formatter(*compiled))
+                                for kind, compiled in self._compiled.items())
+
+    def _formatter(self, template, fields):
+        """A function filling a compiled template from a dict of values
+        (and the ``shown`` url). Fields missing from the values are left
+        empty."""
+        escape = self.escape
+
+        def fill(values, shown=None):
+            filled = []
+            for field in fields:
+                value = shown if field == 'shown' else values.get(field, '')
+                if escape is not None and field not in _HTML_FIELDS:
+                    value = escape(str(value))
+                filled.append(value)
+            return template % tuple(filled)
+
+        if not fields:
+            return lambda values, shown=None: template
+        if escape is not None:
+            return fill
+
+        if fields == ('url', 'shown'):
+            # The url and media templates, as html_for_tweet has them
+            return lambda values, shown=None: template % (values['url'], shown)
+        if 'shown' in fields:
+            return fill
+
+        # All the values are looked up at once
+        if len(fields) == 1:
+            field = fields[0]
+
+            def fill_one(values, shown=None):
+                try:
+                    return template % (values[field],)
+                except KeyError:
+                    return fill(values)
+            return fill_one
+
+        get = itemgetter(*fields)
+
+        def fill_many(values, shown=None):
+            try:
+                return template % get(values)
+            except KeyError:
+                return fill(values)
+        return fill_many
+
+    def render(self, tweet):
+        """Return HTML for a tweet
+
+        :rtype: str
+        """
+        if self.cache is not None:
+            return self.cache.render(self, tweet)
+        return self._render(tweet, self.expand_quoted_status)
+
+    def _render(self, tweet, expand_quoted_status):
+        if 'retweeted_status' in tweet:
+            tweet = tweet['retweeted_status']
+
+        if 'extended_tweet' in tweet:
+            tweet = tweet['extended_tweet']
+
+        orig_tweet_text = tweet.get('full_text') or tweet['text']
+
+        display_text_range = tweet.get('display_text_range') or [0, len(orig_tweet_text)]
+        display_text_start, display_text_end = display_text_range[0], display_text_range[1]
+        display_text = orig_tweet_text[display_text_start:display_text_end]
+        prefix_text = orig_tweet_text[0:display_text_start]
+        suffix_text = orig_tweet_text[display_text_end:len(orig_tweet_text)]
+
+        if 'entities' in tweet:
+            tweet_entities = tweet['entities']
+            url_key = self._url_key
+            formatters = self._formatters
+            # (start, end, replacement HTML) of each entity of display_text
+            entities = []
+
+            # Mentions
+            for entity in tweet_entities.get('user_mentions', ()):
+                start, end = entity['indices'][0], entity['indices'][1]
+                mention_html = formatters['mention'](entity)
+
+                if display_text_start <= start <= display_text_end:
+                    entities.append((start - display_text_start, end - display_text_start, mention_html))
+                else:
+                    # Make the '@username' at the start, before
+                    # display_text, into a link:
+                    prefix_text = _prefix_mention_pattern(orig_tweet_text[start:end]).sub(
+                        mention_html.replace('\\', '\\\\'), prefix_text)
+
+            # Hashtags
+            for entity in tweet_entities.get('hashtags', ()):
+                entities.append((entity['indices'][0] - display_text_start,
+                                 entity['indices'][1] - display_text_start,
+                                 formatters['hashtag'](entity)))
+
+            # Symbols
+            for entity in tweet_entities.get('symbols', ()):
+                entities.append((entity['indices'][0] - display_text_start,
+                                 entity['indices'][1] - display_text_start,
+                                 formatters['symbol'](entity)))
+
+            # URLs
+            for entity in tweet_entities.get('urls', ()):
+                start = entity['indices'][0] - display_text_start
+                end = entity['indices'][1] - display_text_start
+                url_html = formatters['url'](entity, url_key and entity.get(url_key) or entity['url'])
+
+                if display_text_start <= start <= display_text_end:
+                    entities.append((start, end, url_html))
+                else:
+                    suffix_text = suffix_text.replace(orig_tweet_text[start:end], url_html)
+
+            if tweet_entities.get('media'):
+                # We just link to the overall URL for the tweet's media,
+                # rather than to each individual item.
+                # So, we get the URL from the first media item:
+                entity = tweet_entities['media'][0]
+                start, end = entity['indices'][0], entity['indices'][1]
+                url_html = formatters['media'](entity, url_key and entity.get(url_key) or entity['url'])
+
+                if display_text_start <= start <= display_text_end:
+                    entities.append((start, end, url_html))
+                else:
+                    suffix_text = suffix_text.replace(orig_tweet_text[start:end], url_html)
+
+            display_text = _replace_entities(display_text, entities)
+
+        quote_text = ''
+        if expand_quoted_status and tweet.get('is_quote_status') and tweet.get('quoted_status'):
+            quoted_status = tweet['quoted_status']
+            quoted_user = quoted_status['user']
+            quote_text = self._formatters['quote']({
+                'html': self._render(quoted_status, False),
+                'screen_name': quoted_user['screen_name'],
+                'name': quoted_user['name'],
+                'id_str': quoted_status['id_str'],
+            })
+
+        return ''.join((self._formatters['prefix']({'html': prefix_text}) if prefix_text else '',
+                        display_text,
+                        self._formatters['suffix']({'html': suffix_text}) if suffix_text else '',
+                        quote_text))
+
+    def render_many(self, tweets, processes=0, batch_size=100):
+        """Returns a generator of the HTML of each tweet of ``tweets``, in
+        order, see :meth:`Twython.html_for_tweets`
+
+        :rtype: generator
+        """
+        if not processes:
+            return (self.render(tweet) for tweet in tweets)
+        return self._render_on_processes(tweets, processes, batch_size)
+
+    def _render_on_processes(self, tweets, processes, batch_size):
+        with ProcessPoolExecutor(processes) as executor:
+            pending = deque()
+            try:
+                for batch in _chunks(tweets, batch_size):
+                    pending.append(executor.submit(_render_batch, self, batch))
+                    # Keep every process busy without reading the whole of
+                    # tweets ahead
+                    if len(pending) > processes * 2:
+                        for html_text in pending.popleft().result():
+                            yield html_text
+
+                while pending:
+                    for html_text in pending.popleft().result():
+                        yield html_text
+            finally:
+                # The caller stopped early: don't render what is left
+                for future in pending:
+                    future.cancel()
+
+
+class RenderCache(object):
+    def __init__(self, maxsize=10000, backend=None):
+        """Keeps the HTML of rendered tweets, by tweet id, renderer options
+        and a fingerprint of the tweet's text and entities, so tweets seen
+        again (retweets of a popular tweet, the same tweet on many
+        timelines) aren't rendered again. A retweet is kept under the id of
+        the tweet it retweets.
+
+        :param maxsize: (optional) Most tweets kept in this process; the
+                        least recently used are dropped first. Default: 10000
+        :param backend: (optional) A cache shared with other processes,
+                        looked up when a tweet isn't kept here: any object
+                        with ``get(key)`` and ``backend[key] = html``, such
+                        as a ``multiprocessing.Manager().dict()`` or a thin
+                        wrapper around memcached or Redis. Keys are strings.
+
+        Tweets without an ``id_str`` are rendered every time. Renderers
+        sharing a backend should use named ``escape`` functions, which tell
+        their options apart.
+        """
+        self.maxsize = maxsize
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Sent to the html_for_tweets processes with its renderer: only a
+        # shared backend goes along
+        return {'maxsize': self.maxsize, 'backend': self.backend}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def key(self, renderer, tweet):
+        """The key ``renderer`` keeps the HTML of ``tweet`` under, or None
+        if it has no id
+
+        :rtype: str
+        """
+        if 'retweeted_status' in tweet:
+            tweet = tweet['retweeted_status']
+        id_str = tweet.get('id_str')
+        if id_str is None:
+            return None
+        if 'extended_tweet' in tweet:
+            tweet = tweet['extended_tweet']
+
+        # Whatever changes the HTML of a tweet with the same id: its text
+        # (compat or extended), its entities and the tweet it quotes
+        text = tweet.get('full_text') or tweet.get('text') or ''
+        fingerprint = [len(text)]
+        fingerprint.extend(tweet.get('display_text_range') or ())
+        entities = tweet.get('entities') or {}
+        for i, kind in enumerate(_ENTITY_KINDS):
+            for entity in entities.get(kind) or ():
+                fingerprint.append(i)
+                fingerprint.extend(entity.get('indices') or ())
+        if renderer.expand_quoted_status and tweet.get('quoted_status'):
+            fingerprint.append(tweet['quoted_status'].get('id') or 0)
+        # Hashes of ints are the same in every process
+        return '%s:%s:%x' % (id_str, renderer.options_key,
+                             hash(tuple(fingerprint)) & 0xffffffffffffffff)
+
+    def get(self, key):
+        """Returns the HTML kept under ``key``, or None"""
+        with self._lock:
+            html_text = self._entries.get(key)
+            if html_text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html_text
+
+        if self.backend is not None:
+            html_text = self.backend.get(key)
+            if html_text is not None:
+                self._keep(key, html_text)
+                with self._lock:
+                    self.hits += 1
+                    self.backend_hits += 1
+                return html_text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, html_text):
+        """Keep ``html_text`` under ``key``, here and in the backend"""
+        self._keep(key, html_text)
+        if self.backend is not None:
+            self.backend[key] = html_text
+
+    def _keep(self, key, html_text):
+        with self._lock:
+            self._entries[key] = html_text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def render(self, renderer, tweet):
+        """The HTML of ``tweet`` from the cache, rendered with ``renderer``
+        and kept if it isn't there
+
+        :rtype: str
+        """
+        key = self.key(renderer, tweet)
+        if key is None:
+            return renderer._render(tweet, renderer.expand_quoted_status)
+
+        html_text = self.get(key)
+        if html_text is None:
+            html_text = renderer._render(tweet, renderer.expand_quoted_status)
+            self.set(key, html_text)
+        return html_text
+
+    def stats(self):
+        """Returns the counters of the cache: 'hits' (including
+        'backend_hits'), 'misses', 'hit_rate', 'size' and 'maxsize'. Only
+        lookups made in this process are counted.
+
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'backend_hits': self.backend_hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        """Drop the HTML kept in this process and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.backend_hits = self.misses = 0
+
+
+@lru_cache(maxsize=8)
+def _default_renderer(use_display_url, use_expanded_url, expand_quoted_status):
+    """The renderer of html_for_tweet, one per combination of options"""
+    return TweetRenderer(use_display_url=use_display_url,
+                         use_expanded_url=use_expanded_url,
+                         expand_quoted_status=expand_quoted_status)
+
+
+def _with_cache(renderer, cache):
+    """A copy of ``renderer`` rendering through ``cache``, leaving the
+    memoized default renderers free of caches"""
+    renderer = copy.copy(renderer)
+    renderer.cache = cache
+    return renderer
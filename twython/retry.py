@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.retry
+~~~~~~~~~~~~~
+
+This module contains the policy :class:`Twython <Twython>` follows to
+retry failed calls before raising a :class:`TwythonError <TwythonError>`.
+"""
+
+import random
+import time
+
+
+class RetryPolicy(object):
+    """Decides whether, and after how long, a failed call is retried.
+
+    Connection errors and responses with a status in ``status_codes`` are
+    retried with exponential backoff and full jitter. A 429 waits exactly
+    until ``X-Rate-Limit-Reset`` (or ``Retry-After``) instead of guessing.
+
+    Only idempotent GETs are retried by default; add ``'POST'`` to
+    ``methods`` to opt in for POSTs. Calls uploading files are never
+    retried, as the files have already been read. Usage::
+
+      >>> from twython import Twython, RetryPolicy
+      >>> def log_retry(retries, delay, cause):
+      >>>   print('retry #%d in %.1fs after %r' % (retries, delay, cause))
+      >>> twitter = Twython(APP_KEY, APP_SECRET, OAUTH_TOKEN,
+      OAUTH_TOKEN_SECRET, retry_policy=RetryPolicy(total=5, budget=60,
+      on_retry=log_retry))
+
+    The number of retries made by the last call is also available from
+    ``Twython.get_lastfunction_retries()``.
+
+    """
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=60,
+                 budget=None, status_codes=(429, 500, 502, 503, 504),
+                 methods=('GET',), respect_reset=True, margin=1.0,
+                 on_retry=None, clock=time.time, sleep=time.sleep,
+                 random=random.random):
+        """
+        :param total: (optional) Maximum number of retries per call.
+        Default: 3
+        :param backoff_factor: (optional) The n-th retry waits up to
+        ``backoff_factor * 2 ** n`` seconds. Default: 0.5
+        :param max_backoff: (optional) Cap in seconds for a single backoff.
+        Default: 60
+        :param budget: (optional) Maximum number of seconds a single call
+        may spend waiting between retries. Default: None (no limit)
+        :param status_codes: (optional) HTTP status codes that are retried.
+        Default: 429, 500, 502, 503, 504
+        :param methods: (optional) HTTP methods that are retried.
+        Default: GET only
+        :param respect_reset: (optional) Wait until ``X-Rate-Limit-Reset``
+        on a 429 rather than backing off. Default: True
+        :param margin: (optional) Seconds added to a reset based wait to
+        absorb clock skew. Default: 1
+        :param on_retry: (optional) Called as ``on_retry(retries, delay,
+        error_or_response)`` before each retry
+        """
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.status_codes = frozenset(status_codes)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.respect_reset = respect_reset
+        self.margin = margin
+        self.on_retry = on_retry
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random
+
+    def get_backoff(self, retries):
+        """Return a jittered exponential backoff for the given retry"""
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** retries))
+        return self.random() * backoff
+
+    def get_reset_delay(self, response):
+        """Return how long to wait for the limit of a 429 response to
+        reset, or None if the response doesn't say"""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(0, float(retry_after))
+            except ValueError:
+                pass
+
+        if response.status_code == 429:
+            reset = response.headers.get('X-Rate-Limit-Reset')
+            if reset is not None:
+                try:
+                    return max(0, int(reset) - self.clock()) + self.margin
+                except ValueError:
+                    pass
+
+        return None
+
+    def get_delay(self, method, retries, waited, response=None):
+        """Return the seconds to wait before retrying, or None if the call
+        should not be retried.
+
+        :param method: HTTP method of the call
+        :param retries: Number of retries made so far
+        :param waited: Seconds already spent waiting on this call
+        :param response: The response received, or None if the request
+        raised a connection error
+        """
+        if retries >= self.total or method.upper() not in self.methods:
+            return None
+
+        delay = None
+        if response is not None:
+            if response.status_code not in self.status_codes:
+                return None
+            if self.respect_reset:
+                delay = self.get_reset_delay(response)
+
+        if delay is None:
+            delay = self.get_backoff(retries)
+
+        if self.budget is not None and waited + delay > self.budget:
+            return None
+
+        return delay
@@ -1 +1,3 @@
 from .api import TwythonStreamer
+from .prefilter import StreamPrefilter
+from .replay import StreamRecorder, StreamReplay
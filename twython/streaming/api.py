@@ -9,20 +9,34 @@ Twitter API calls.
 """
 
 from .. import __version__
-from ..compat import json, is_py3
+from .. import models as _models
+from ..compat import get_json_loads
+from ..exceptions import TwythonError
 from ..helpers import _transparent_params
+from .backoff import NETWORK_ERROR, StreamBackoff
+from .decode import ProcessDecoder
+from .dispatch import OVERFLOW_POLICIES, StreamDispatcher
+from .framing import iter_chunks, iter_length_delimited, iter_lines
+from .handlers import DispatchTable
+from .overlap import OverlappingStream
+from .replay import StreamReplay
 from .types import TwythonStreamerTypes
 
 import requests
 from requests_oauthlib import OAuth1
 
-import time
+import threading
+from contextlib import contextmanager
 
 
 class TwythonStreamer(object):
     def __init__(self, app_key, app_secret, oauth_token, oauth_token_secret,
-                 timeout=300, retry_count=None, retry_in=10, client_args=None,
-                 handlers=None, chunk_size=1):
+                 timeout=300, retry_count=None, retry_in=None, client_args=None,
+                 handlers=None, chunk_size=16384, json_backend=None,
+                 stall_timeout=90, prefilter=None, workers=0, queue_size=1000, overflow='block',
+                 decode_processes=0, decode_filter=None,
+                 decode_batch_size=100, ordered=True, recorder=None,
+                 models=False):
         """Streaming class for a friendly streaming user experience
         Authentication IS required to use the Twitter Streaming API
 
@@ -33,11 +47,13 @@ class TwythonStreamer(object):
         :param oauth_token_secret: (required) Used with oauth_token to make
                                    authenticated calls
         :param timeout: (optional) How long (in secs) the streamer should wait
-                        for a response from Twitter Streaming API
-        :param retry_count: (optional) Number of times the API call should be
-                            retired
-        :param retry_in: (optional) Amount of time (in secs) the previous
-                         API call should be tried again
+                        to connect to the Twitter Streaming API
+        :param retry_count: (optional) Number of failed connections in a row
+                            after which the streamer gives up and
+                            disconnects. Default: None, keep reconnecting
+        :param retry_in: (optional) Amount of time (in secs) to wait before
+                         every reconnect. Default: None, follow Twitter's
+                         backoff schedules (see :class:`StreamBackoff`)
         :param client_args: (optional) Accepts some requests Session
                             parameters and some requests Request parameters.
                             See
@@ -45,10 +61,61 @@ class TwythonStreamer(object):
                             and requests section below it for details.
                             [ex. headers, proxies, verify(SSL verification)]
         :param handlers: (optional) Array of message types for which
-                         corresponding handlers will be called
-
-        :param chunk_size: (optional) Define the buffer size before data is
-                           actually returned from the Streaming API. Default: 1
+                         corresponding handlers will be called. Besides
+                         message types, 'retweet', 'quote', 'reply' and
+                         'extended_tweet' call ``on_retweet`` etc. with
+                         tweets of that kind
+
+        :param chunk_size: (optional) Largest read made from the socket.
+                           Messages are split out of each read and handed
+                           on as soon as their delimiter arrives, so a
+                           large buffer costs no latency. Default: 16384
+        :param json_backend: (optional) JSON library used to decode
+                             messages: 'orjson', 'ujson', 'simplejson',
+                             'json', 'auto' (the fastest one installed) or
+                             a ``loads`` callable accepting bytes.
+                             Default: simplejson if installed, else json
+        :param stall_timeout: (optional) Reconnect when nothing, not even a
+                              keep-alive, arrives for this many secs.
+                              Twitter sends a keep-alive every 30 secs.
+                              Default: 90
+        :param prefilter: (optional) A :class:`StreamPrefilter`, or any
+                          callable taking the raw bytes of a message and
+                          returning False for messages to skip without
+                          decoding them
+        :param workers: (optional) Number of threads decoding messages and
+                        running the handlers. With 0 they run on the
+                        thread reading the stream, so a slow handler slows
+                        down reading. Default: 0
+        :param queue_size: (optional) Most messages waiting for a worker.
+                           Default: 1000
+        :param overflow: (optional) What happens to a message read while
+                         the queue is full: 'block' stops reading until
+                         there is room, 'drop_newest' discards it and
+                         'drop_oldest' discards the oldest waiting message.
+                         Default: 'block'
+        :param decode_processes: (optional) Number of processes decoding
+                                 messages, in batches, before they are
+                                 handed to the handlers in this process.
+                                 ``json_backend`` must then be a name.
+                                 Default: 0, decode in this process
+        :param decode_filter: (optional) Called in the decoding processes
+                              with every message; the handlers get what it
+                              returns, or nothing if it returns None. Must
+                              be picklable (a module level function)
+        :param decode_batch_size: (optional) Messages sent to a decoding
+                                  process at a time. Default: 100
+        :param ordered: (optional) With ``decode_processes``, hand messages
+                        to the handlers in the order they were read. If
+                        False, batches are handled as soon as they are
+                        decoded. Default: True
+        :param recorder: (optional) A :class:`StreamRecorder` saving the raw
+                         bytes of every connection, to play them back later
+                         with :meth:`replay`
+        :param models: (optional) Hand tweets to the handlers as
+                       :class:`Tweet`, decoded when first read, instead of
+                       dicts. Other messages are still dicts.
+                       Default: False
         """
 
         self.auth = OAuth1(app_key, app_secret,
@@ -82,85 +149,297 @@ class TwythonStreamer(object):
 
         self.retry_in = retry_in
         self.retry_count = retry_count
+        self.stall_timeout = stall_timeout
+        self.prefilter = prefilter
 
         # Set up type methods
         StreamTypes = TwythonStreamerTypes(self)
         self.statuses = StreamTypes.statuses
 
         self.connected = False
+        self._wake = threading.Event()
 
         self.handlers = handlers if handlers else \
             ['delete', 'limit', 'disconnect']
+        self._dispatch_table = None
+        self._overlapping = None
 
         self.chunk_size = chunk_size
 
-    def _request(self, url, method='GET', params=None):
-        """Internal stream request handling"""
+        self.json_backend = json_backend
+        self._json_loads = get_json_loads(json_backend)
+        self.models = models
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of %s, got %r' %
+                             (', '.join(OVERFLOW_POLICIES), overflow))
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.dispatcher = None
+
+        self.decode_processes = decode_processes
+        self.decode_filter = decode_filter
+        self.decode_batch_size = decode_batch_size
+        self.ordered = ordered
+
+        self.recorder = recorder
+
+    def _request(self, url, method='GET', params=None, overlap=None):
+        """Internal stream request handling
+
+        With ``overlap`` (in secs), the stream can be moved to new params
+        with :meth:`_switch_params` without dropping it, see
+        :class:`OverlappingStream`."""
+        if overlap is not None and self.recorder is not None:
+            raise TwythonError('A stream switched with overlap can not be '
+                               'recorded.')
+
         self.connected = True
-        retry_counter = 0
+        self._wake.clear()
+        # Handlers are looked up once per stream
+        self._dispatch_table = DispatchTable(self)
 
         method = method.lower()
         func = getattr(self.client, method)
-        params, _ = _transparent_params(params)
-
-        def _send(retry_counter):
-            requests_args = {}
-            for k, v in self.client_args.items():
-                # Maybe this should be set as a class
-                # variable and only done once?
-                if k in ('timeout', 'allow_redirects', 'verify'):
-                    requests_args[k] = v
-
+        params, _ = _transparent_params(params or {})
+        length_delimited = params.get('delimited') == 'length'
+
+        requests_args = {}
+        for k, v in self.client_args.items():
+            if k in ('timeout', 'allow_redirects', 'verify'):
+                requests_args[k] = v
+        # A stream that sends nothing, not even a keep-alive, for
+        # stall_timeout has stalled: reads time out and we reconnect
+        requests_args['timeout'] = (requests_args.get('timeout'),
+                                    self.stall_timeout)
+
+        def _connect(params):
+            if method == 'get':
+                return func(url, params=params, **requests_args)
+            return func(url, data=params, **requests_args)
+
+        overlapping = None
+        if overlap is not None:
+            overlapping = OverlappingStream(
+                lambda params: _connect(_transparent_params(params)[0]),
+                lambda response: self._iter_lines(response, length_delimited),
+                params, overlap, self.queue_size)
+        self._overlapping = overlapping
+
+        backoff = StreamBackoff(self.retry_count, self.retry_in)
+        with self._pipeline() as (decoder, _handle, _handle_decoded):
             while self.connected:
                 try:
-                    if method == 'get':
-                        requests_args['params'] = params
-                    else:
-                        requests_args['data'] = params
-
-                    response = func(url, **requests_args)
+                    if overlapping is not None:
+                        # Switched params are kept for reconnects
+                        params = _transparent_params(overlapping.params)[0]
+                    response = _connect(params)
                 except requests.exceptions.Timeout:
                     self.on_timeout()
+                    kind = NETWORK_ERROR
+                except requests.ConnectionError:
+                    kind = NETWORK_ERROR
                 else:
-                    if response.status_code != 200:
-                        self.on_error(response.status_code, response.content, response.headers)
-
-                    if self.retry_count and \
-                       (self.retry_count - retry_counter) > 0:
-                        time.sleep(self.retry_in)
-                        retry_counter += 1
-                        _send(retry_counter)
-
-                    return response
+                    lines = None
+                    try:
+                        if response.status_code != 200:
+                            self.on_error(response.status_code,
+                                          response.content, response.headers)
+                            kind = backoff.get_kind(response.status_code)
+                        else:
+                            backoff.reset()
+                            # However a stream we are still connected to
+                            # ends (closed by Twitter, stalled, dropped) we
+                            # reconnect as after a network error
+                            kind = NETWORK_ERROR
+                            if overlapping is None:
+                                lines = self._iter_lines(response, length_delimited)
+                            else:
+                                lines = overlapping.lines(response, self.on_error,
+                                                          self.on_timeout)
+                            self._read_stream(lines, decoder, _handle,
+                                              _handle_decoded,
+                                              response.status_code)
+                    except requests.exceptions.Timeout:
+                        # Nothing arrived for stall_timeout
+                        self.on_timeout()
+                    except (requests.ConnectionError,
+                            requests.exceptions.ChunkedEncodingError):
+                        pass
+                    finally:
+                        if overlapping is not None and lines is not None:
+                            # Closes the connections it switched to
+                            lines.close()
+                        response.close()
 
-        while self.connected:
-            response = _send(retry_counter)
+                if not self.connected:
+                    break
 
-            for line in response.iter_lines(self.chunk_size):
+                delay = backoff.get_delay(kind)
+                if delay is None:
+                    # retry_count failures in a row, give up
+                    self.disconnect()
+                    break
+                # disconnect() cuts the wait short
+                self._wake.wait(delay)
+
+    @contextmanager
+    def _pipeline(self):
+        """Set up what messages go through once read: the decoding
+        processes and the workers, if any. Yields the decoder and the
+        functions handing on a message and a list of decoded ones."""
+        decoder = None
+        process = self._process_line
+        if self.decode_processes:
+            decoder = ProcessDecoder(self.decode_processes, self.json_backend,
+                                     self.decode_filter, self.decode_batch_size,
+                                     self.ordered)
+            process = self._process_decoded
+
+        dispatcher = None
+        if self.workers:
+            dispatcher = StreamDispatcher(process, self.workers,
+                                          self.queue_size, self.overflow)
+            self.dispatcher = dispatcher
+            dispatcher.start()
+
+        def handle(*item):
+            if dispatcher is None:
+                process(*item)
+            else:
+                # The handlers run on the workers
+                dispatcher.put(item)
+
+        def handle_decoded(results):
+            for item in results:
+                # Like messages read after it, messages decoded after
+                # disconnect() are not handled
                 if not self.connected:
                     break
+                handle(*item)
+
+        try:
+            yield decoder, handle, handle_decoded
+        except BaseException:
+            if dispatcher is not None:
+                dispatcher.stop(drain=False)
+            raise
+        finally:
+            if decoder is not None:
+                decoder.close()
+
+        if dispatcher is not None:
+            dispatcher.stop()
+            if dispatcher.error is not None:
+                raise dispatcher.error
+
+    def _read_stream(self, lines, decoder, handle, handle_decoded,
+                     status_code=200):
+        """Hand the messages of a connected stream on until it ends or
+        disconnect() is called"""
+        prefilter = self.prefilter
+        for line in lines:
+            if not self.connected:
+                return
+            if line and prefilter is not None and not prefilter(line):
+                # Rejected from its raw bytes, never decoded
+                continue
+            if decoder is not None:
+                # A keep-alive sends the partial batch, so messages of a
+                # quiet stream aren't held back
                 if line:
-                    try:
-                        if is_py3:
-                            line = line.decode('utf-8')
-                        data = json.loads(line)
-                    except ValueError:  # pragma: no cover
-                        self.on_error(response.status_code,
-                                      'Unable to decode response, \
-                                      not valid JSON.')
-                    else:
-                        if self.on_success(data):  # pragma: no cover
-                            for message_type in self.handlers:
-                                if message_type in data:
-                                    handler = getattr(self,
-                                                      'on_' + message_type,
-                                                      None)
-                                    if handler \
-                                       and callable(handler) \
-                                       and not handler(data.get(message_type)):
-                                        break
-
-        response.close()
+                    results = decoder.feed(line, status_code)
+                else:
+                    results = decoder.flush()
+                handle_decoded(results)
+            elif line:
+                handle(line, status_code)
+
+        if decoder is not None and self.connected:
+            handle_decoded(decoder.flush(wait=True))
+
+    def replay(self, recording, speed=1.0):
+        """Hand the messages of a recording made with :class:`StreamRecorder`
+        to the handlers, through the same framing, prefilter, decoding and
+        workers as a live stream. Returns when the recording ends or
+        :meth:`disconnect` is called.
+
+        :param recording: A :class:`StreamReplay`, or the path of a recording
+        :param speed: (optional) 1 plays the recording at the speed it was
+                      recorded, 10 ten times faster. None or 0 plays it as
+                      fast as possible. Default: 1
+        """
+        if not isinstance(recording, StreamReplay):
+            recording = StreamReplay(recording)
+
+        self.connected = True
+        self._wake.clear()
+        self._dispatch_table = DispatchTable(self)
+
+        # disconnect() cuts the wait for the next record short
+        lines = recording.lines(speed, self._wake.wait)
+        try:
+            with self._pipeline() as (decoder, handle, handle_decoded):
+                self._read_stream(lines, decoder, handle, handle_decoded)
+        finally:
+            lines.close()
+            self.connected = False
+
+    def _switch_params(self, params):
+        """Move a stream started with ``overlap`` to new params, see
+        :meth:`TwythonStreamerTypesStatuses.set_dynamic_filter`. Returns
+        False if no such stream is running."""
+        overlapping = self._overlapping
+        if not self.connected or overlapping is None:
+            return False
+        overlapping.switch(params)
+        return True
+
+    def _iter_lines(self, response, length_delimited=False):
+        """Messages of a stream response, framed from large reads. With
+        ``delimited=length`` they are memoryviews over the read buffer."""
+        chunks = iter_chunks(response, self.chunk_size)
+        if self.recorder is not None:
+            chunks = self.recorder.record(chunks, length_delimited)
+        if length_delimited:
+            return iter_length_delimited(chunks)
+        return iter_lines(chunks)
+
+    def _process_line(self, line, status_code=200):
+        """Decode one message of the stream and dispatch it"""
+        try:
+            # Lines are handed to the decoder as bytes (or memoryviews)
+            if self.models:
+                data = _models.loads_object(bytes(line), self._json_loads)
+            else:
+                data = self._json_loads(line)
+        except ValueError:  # pragma: no cover
+            self.on_error(status_code, 'Unable to decode response, \
+                          not valid JSON.')
+        else:
+            self._dispatch(data)
+
+    def _process_decoded(self, status_code, decoded, data):
+        """Dispatch a message decoded by the process pool"""
+        if decoded:
+            self._dispatch(_models.wrap(data) if self.models else data)
+        else:  # pragma: no cover
+            self.on_error(status_code, 'Unable to decode response, \
+                          not valid JSON.')
+
+    def _dispatch(self, data):
+        """Call on_success, then the handlers, for a decoded message"""
+        if self.on_success(data):  # pragma: no cover
+            table = self._dispatch_table
+            if table is None:
+                table = self._dispatch_table = DispatchTable(self)
+            # Most messages are tweets nothing is registered for. Checking
+            # models for a control message would decode them
+            if table.other or (type(data) is dict and len(data) == 1):
+                for handler, value in table.match(data):
+                    if not handler(value):
+                        break
 
     def on_success(self, data):  # pragma: no cover
         """Called when data has been successfully received from the stream.
@@ -197,6 +476,18 @@ class TwythonStreamer(object):
         """ Called when the request has timed out """
         return
 
+    def get_queue_stats(self):
+        """Returns the counters of the worker queue of the current (or
+        last) stream: 'queue_depth', 'max_queue_depth', 'enqueued',
+        'processed' and 'dropped'. None unless ``workers`` is set.
+
+        :rtype: dict
+        """
+        if self.dispatcher is None:
+            return None
+        return self.dispatcher.stats()
+
     def disconnect(self):
         """Used to disconnect the streaming client manually"""
         self.connected = False
+        self._wake.set()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.backoff
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the reconnect schedules the streamers follow,
+as documented by Twitter:
+https://developer.twitter.com/en/docs/tweets/filter-realtime/guides/connecting
+"""
+
+# Kinds of failure, each with its own schedule
+NETWORK_ERROR = 'network'
+HTTP_ERROR = 'http'
+RATE_LIMITED = 'rate_limited'
+
+
+class StreamBackoff(object):
+    """How long to wait before reconnecting a stream.
+
+    * Network errors, stalls and streams closed by Twitter back off
+      linearly, by 250ms each attempt, up to 16 seconds.
+    * HTTP errors back off exponentially, from 5 seconds up to 320 seconds.
+    * 420 (and 429) back off exponentially from 1 minute.
+
+    The attempts of a schedule are counted from the last time it was used,
+    and everything starts over after a successful connection (:meth:`reset`).
+    """
+    #: (first delay, increase, largest delay) of each schedule; the increase
+    #: is added for network errors and multiplied otherwise
+    SCHEDULES = {
+        NETWORK_ERROR: (0.25, 0.25, 16),
+        HTTP_ERROR: (5, 2, 320),
+        RATE_LIMITED: (60, 2, None),
+    }
+
+    def __init__(self, retry_count=None, retry_in=None):
+        """
+        :param retry_count: (optional) Failures in a row after which to give
+                            up. Default: None, never give up
+        :param retry_in: (optional) Wait this many seconds after every
+                         failure instead of following the schedules
+        """
+        self.retry_count = retry_count
+        self.retry_in = retry_in
+        self.reset()
+
+    def reset(self):
+        """Called once a connection succeeds"""
+        self.failures = 0
+        self.kind = None
+        self.attempts = 0
+
+    def get_delay(self, kind):
+        """Returns the seconds to wait before reconnecting after a failure
+        of ``kind``, or None if ``retry_count`` failures were reached
+
+        :rtype: float
+        """
+        if self.retry_count is not None and self.failures >= self.retry_count:
+            return None
+        self.failures += 1
+
+        if kind != self.kind:
+            self.kind = kind
+            self.attempts = 0
+        self.attempts += 1
+
+        if self.retry_in is not None:
+            return self.retry_in
+
+        first, increase, largest = self.SCHEDULES[kind]
+        if kind == NETWORK_ERROR:
+            delay = first + increase * (self.attempts - 1)
+        else:
+            delay = first * increase ** (self.attempts - 1)
+        if largest is not None:
+            delay = min(delay, largest)
+        return delay
+
+    @staticmethod
+    def get_kind(status_code):
+        """Which schedule an error status follows"""
+        if status_code in (420, 429):
+            return RATE_LIMITED
+        return HTTP_ERROR
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.decode
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the process pool :class:`TwythonStreamer` can hand
+raw stream messages to, so that decoding (and filtering) them uses every
+core rather than the one holding the GIL.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ..compat import get_json_loads
+
+# The loads function of each JSON backend, per worker process
+_loads = {}
+
+
+def _decode_batch(json_backend, message_filter, lines):
+    """Decode a batch of messages in a worker process. Returns a
+    ``(decoded, data)`` pair per message kept by ``message_filter``;
+    messages that are not valid JSON come back as ``(False, None)``."""
+    loads = _loads.get(json_backend)
+    if loads is None:
+        loads = _loads[json_backend] = get_json_loads(json_backend)
+
+    results = []
+    for line in lines:
+        try:
+            data = loads(line)
+        except ValueError:
+            results.append((False, None))
+            continue
+
+        if message_filter is not None:
+            data = message_filter(data)
+            if data is None:
+                continue
+        results.append((True, data))
+    return results
+
+
+class ProcessDecoder(object):
+    def __init__(self, processes, json_backend=None, message_filter=None,
+                 batch_size=100, ordered=True, max_pending=None):
+        """Decodes stream messages in batches on a pool of processes
+
+        :param processes: Number of worker processes
+        :param json_backend: (optional) Name of the JSON backend the
+                             workers decode with (see ``get_json_loads``)
+        :param message_filter: (optional) Called in the worker with every
+                               decoded message; what it returns is sent
+                               back instead, or nothing if it returns None.
+                               Must be picklable (a module level function)
+        :param batch_size: (optional) Messages sent to a worker at a time.
+                           Default: 100
+        :param ordered: (optional) Hand results back in the order the
+                        messages were read. If False, batches are handed
+                        back as soon as they are decoded. Default: True
+        :param max_pending: (optional) Most batches being decoded at once;
+                            beyond it ``feed`` waits for one to finish.
+                            Default: twice the number of processes
+        """
+        if callable(json_backend):
+            raise ValueError('json_backend must be given by name to decode '
+                             'in worker processes')
+
+        self.json_backend = json_backend
+        self.message_filter = message_filter
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.max_pending = max_pending or processes * 2
+
+        self._executor = ProcessPoolExecutor(processes)
+        self._batch = []
+        self._batch_status = None
+        self._pending = deque()
+
+    def feed(self, line, status_code=200):
+        """Queue a message for decoding. Returns the ``(status_code,
+        decoded, data)`` results that are ready, see :func:`_decode_batch`.
+
+        :rtype: list
+        """
+        if self._batch and status_code != self._batch_status:
+            self._submit()
+        if isinstance(line, memoryview):
+            # memoryviews can't be pickled
+            line = line.tobytes()
+        self._batch.append(line)
+        self._batch_status = status_code
+
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+        return self._collect(self.max_pending)
+
+    def flush(self, wait=False):
+        """Send the partial batch and return the results that are ready,
+        or with ``wait=True`` the results of everything fed so far
+
+        :rtype: list
+        """
+        self._submit()
+        return self._collect(0 if wait else self.max_pending)
+
+    def close(self):
+        """Stop the workers, discarding messages not handed back yet"""
+        self._batch = []
+        for future, status_code in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown()
+
+    def _submit(self):
+        if not self._batch:
+            return
+        future = self._executor.submit(_decode_batch, self.json_backend,
+                                       self.message_filter, self._batch)
+        self._pending.append((future, self._batch_status))
+        self._batch = []
+
+    def _collect(self, limit):
+        """Results of finished batches, waiting until no more than
+        ``limit`` batches are left pending"""
+        results = []
+        pending = self._pending
+        if self.ordered:
+            while pending and (pending[0][0].done() or len(pending) > limit):
+                future, status_code = pending.popleft()
+                results.extend((status_code, decoded, data)
+                               for decoded, data in future.result())
+            return results
+
+        while pending:
+            if len(pending) > limit:
+                wait([future for future, _ in pending],
+                     return_when=FIRST_COMPLETED)
+            done = [item for item in pending if item[0].done()]
+            if not done:
+                break
+            for item in done:
+                pending.remove(item)
+                future, status_code = item
+                results.extend((status_code, decoded, data)
+                               for decoded, data in future.result())
+        return results
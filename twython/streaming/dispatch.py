@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.dispatch
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the queue that lets :class:`TwythonStreamer` keep
+reading the socket while messages are decoded and handled on worker
+threads.
+"""
+
+import threading
+
+from ..compat import queue
+
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+_STOP = object()
+
+
+class StreamDispatcher(object):
+    def __init__(self, process, workers=1, queue_size=1000, overflow='block'):
+        """Bounded queue between the thread reading a stream and the
+        threads handling its messages
+
+        :param process: Called on a worker thread with every item put
+        :param workers: (optional) Number of worker threads. Default: 1
+        :param queue_size: (optional) Most items waiting to be processed.
+                           Default: 1000
+        :param overflow: (optional) What ``put`` does when the queue is
+                         full: 'block' waits for room (slowing the reader
+                         down), 'drop_newest' discards the new item and
+                         'drop_oldest' discards the oldest waiting item.
+                         Default: 'block'
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of %s, got %r' %
+                             (', '.join(OVERFLOW_POLICIES), overflow))
+
+        self.process = process
+        self.workers = workers
+        self.overflow = overflow
+        self.queue = queue.Queue(queue_size)
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work,
+                                      name='TwythonStreamWorker-%d' % i)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        """Queue an item for the workers, applying the overflow policy.
+        Re-raises the first exception a worker ran into."""
+        if self.error is not None:
+            raise self.error
+
+        if self.overflow == 'block':
+            self.queue.put(item)
+        elif self.overflow == 'drop_newest':
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self._count_drop()
+                return
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    self.queue.task_done()
+                    self._count_drop()
+
+        with self._lock:
+            self.enqueued += 1
+            depth = self.queue.qsize()
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+
+    def _count_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if self.error is None:
+                    self.process(*item)
+                    with self._lock:
+                        self.processed += 1
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+            finally:
+                self.queue.task_done()
+
+    def stop(self, drain=True):
+        """Stop the workers once they are done with the queue. With
+        ``drain=False`` items still waiting are discarded. A worker's
+        exception is left in ``error``."""
+        if not drain:
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.queue.task_done()
+
+        for thread in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """Counters describing the queue
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'dropped': self.dropped,
+            }
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.framing
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains functions to read a stream response in large
+buffers and split it into messages ourselves, rather than letting
+``iter_lines`` read it a byte at a time. Both the default newline framing
+and ``delimited=length`` framing are supported.
+"""
+
+import requests
+
+try:
+    from urllib3.exceptions import ProtocolError, ReadTimeoutError
+except ImportError:  # pragma: no cover
+    from requests.packages.urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from ..exceptions import TwythonStreamError
+
+
+def iter_chunks(response, buffer_size):
+    """Yield the body of a streamed ``response`` as it arrives, in pieces
+    of at most ``buffer_size`` bytes. A read returns as soon as some data
+    is available, so a large buffer does not hold messages back.
+
+    A read that times out raises ``requests.exceptions.ReadTimeout``,
+    other failures ``requests.ConnectionError``."""
+    raw = response.raw
+    if getattr(raw, 'chunked', False) or not hasattr(raw, 'read1') or \
+            response.headers.get('Content-Encoding', 'identity') != 'identity':
+        # Chunked bodies (what the Streaming API sends) are already read
+        # chunk by chunk as they arrive. read1 would hand compressed
+        # bodies on undecoded.
+        return _iter_content(response, buffer_size)
+    return _iter_read1(raw, buffer_size)
+
+
+def _iter_content(response, buffer_size):
+    try:
+        for chunk in response.iter_content(buffer_size):
+            yield chunk
+    except requests.ConnectionError as e:
+        if e.args and isinstance(e.args[0], ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(e.args[0])
+        raise
+
+
+def _iter_read1(raw, buffer_size):
+    while True:
+        try:
+            chunk = raw.read1(buffer_size)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except ProtocolError as e:
+            raise requests.ConnectionError(e)
+        if not chunk:
+            return
+        yield chunk
+
+
+class LineFramer(object):
+    """Splits byte chunks, fed as they arrive, into lines without their
+    line ending (``\\r\\n`` or ``\\n``). Empty lines (the Streaming API's
+    keep-alives) are returned too."""
+    def __init__(self):
+        self._pending = []
+
+    def feed(self, chunk):
+        """Returns the lines completed by ``chunk``
+
+        :rtype: list
+        """
+        lines = chunk.split(b'\n')
+        if len(lines) == 1:
+            # No delimiter yet, the message spans more chunks
+            self._pending.append(chunk)
+            return []
+
+        if self._pending:
+            self._pending.append(lines[0])
+            lines[0] = b''.join(self._pending)
+            self._pending = []
+
+        tail = lines.pop()
+        if tail:
+            self._pending.append(tail)
+
+        return [line[:-1] if line[-1:] == b'\r' else line for line in lines]
+
+    def close(self):
+        """Returns the last line if the stream didn't end with a delimiter
+
+        :rtype: list
+        """
+        if not self._pending:
+            return []
+        line = b''.join(self._pending)
+        self._pending = []
+        return [line[:-1] if line[-1:] == b'\r' else line]
+
+
+class LengthFramer(object):
+    """Splits byte chunks framed with ``delimited=length``, where every
+    message is preceded by a line holding its size in bytes.
+
+    Each message is read with a single slice once all of its bytes have
+    arrived, and is returned as a ``memoryview`` over the buffer it arrived
+    in. orjson decodes it there; the other JSON backends, a
+    :class:`StreamPrefilter` and ``models`` take a copy of it as bytes.
+    Blank lines (keep-alives) between messages are skipped.
+    """
+    def __init__(self):
+        self._pending = []
+        self._size = 0
+        self._length = None
+
+    def feed(self, chunk):
+        """Returns the messages completed by ``chunk``
+
+        :rtype: list
+        """
+        self._pending.append(chunk)
+        self._size += len(chunk)
+        length = self._length
+        if length is not None and self._size < length:
+            # The rest of the message is still to come
+            return []
+
+        pending = self._pending
+        buf = pending[0] if len(pending) == 1 else b''.join(pending)
+        view = memoryview(buf)
+        messages = []
+        pos = 0
+        while True:
+            if length is None:
+                end = buf.find(b'\n', pos)
+                if end == -1:
+                    break
+                line = buf[pos:end].strip()
+                pos = end + 1
+                if line:
+                    try:
+                        length = int(line)
+                    except ValueError:
+                        raise TwythonStreamError(
+                            'Invalid length delimiter in stream: %r' % line)
+                continue
+
+            if len(buf) - pos < length:
+                break
+            messages.append(view[pos:pos + length])
+            pos += length
+            length = None
+
+        rest = buf[pos:]
+        self._pending = [rest] if rest else []
+        self._size = len(rest)
+        self._length = length
+        return messages
+
+    def close(self):
+        """A truncated message is discarded
+
+        :rtype: list
+        """
+        self.__init__()
+        return []
+
+
+def _iter_framed(framer, chunks):
+    for chunk in chunks:
+        for message in framer.feed(chunk):
+            yield message
+    for message in framer.close():
+        yield message
+
+
+def iter_lines(chunks):
+    """Split an iterable of byte chunks into lines, see :class:`LineFramer`.
+    Lines are yielded as soon as their delimiter arrives."""
+    return _iter_framed(LineFramer(), chunks)
+
+
+def iter_length_delimited(chunks):
+    """Split an iterable of byte chunks framed with ``delimited=length``
+    into messages, see :class:`LengthFramer`."""
+    return _iter_framed(LengthFramer(), chunks)
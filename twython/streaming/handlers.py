@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.handlers
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the table :class:`TwythonStreamer` uses to find the
+``on_<type>`` handlers of a message without looking them up every time.
+"""
+
+#: Messages that carry nothing but their type as their only key
+CONTROL_MESSAGES = frozenset([
+    'delete', 'scrub_geo', 'limit', 'status_withheld', 'user_withheld',
+    'disconnect', 'warning', 'friends', 'friends_str', 'control',
+])
+
+#: Kinds of tweet a handler can be registered for. Their handlers get the
+#: whole tweet.
+TWEET_SUBTYPES = {
+    'retweet': lambda data: 'retweeted_status' in data,
+    'quote': lambda data: 'quoted_status' in data,
+    'reply': lambda data: data.get('in_reply_to_status_id_str') is not None,
+    'extended_tweet': lambda data: 'extended_tweet' in data,
+}
+
+
+class DispatchTable(object):
+    """The handlers of a streamer, looked up once.
+
+    Control messages (see :data:`CONTROL_MESSAGES`) have a single key, so
+    their handler is found with one dict lookup. Handlers for tweet
+    subtypes (see :data:`TWEET_SUBTYPES`) and for any other key are checked
+    in the order of ``streamer.handlers``.
+    """
+    def __init__(self, streamer):
+        self.control = {}
+        self.other = []
+
+        for message_type in streamer.handlers:
+            handler = getattr(streamer, 'on_' + message_type, None)
+            if not handler or not callable(handler):
+                continue
+
+            if message_type in TWEET_SUBTYPES:
+                self.other.append((None, TWEET_SUBTYPES[message_type], handler))
+            elif message_type in CONTROL_MESSAGES:
+                self.control.setdefault(message_type, handler)
+            else:
+                self.other.append((message_type, None, handler))
+
+    def match(self, data):
+        """Returns the ``(handler, argument)`` pairs to call for a message,
+        in order
+
+        :rtype: list
+        """
+        if len(data) == 1:
+            for message_type in data:
+                handler = self.control.get(message_type)
+                if handler is not None:
+                    return [(handler, data[message_type])]
+
+        matches = []
+        for message_type, is_subtype, handler in self.other:
+            if message_type is None:
+                if is_subtype(data):
+                    matches.append((handler, data))
+            elif message_type in data:
+                matches.append((handler, data[message_type]))
+        return matches
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.overlap
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains :class:`OverlappingStream`, which moves a running
+filter stream to new parameters by connecting with them first and only
+then closing the old connection, so nothing is lost in between.
+"""
+
+import re
+import threading
+import time
+import weakref
+
+import requests
+
+from ..compat import queue
+
+# The first id_str of a tweet is its own: Twitter writes it before the
+# nested objects
+_ID_STR = re.compile(b'"id_str":"(\\d+)"')
+
+_END = object()
+_OPENED = object()
+_SWITCH = object()
+
+_FOREVER = float('inf')
+
+
+class OverlappingStream(object):
+    def __init__(self, connect, iter_lines, params, overlap=5, queue_size=1000):
+        """Lines of a stream whose parameters can be switched while it runs
+
+        :param connect: Called with parameters, returns a streamed response
+        :param iter_lines: Called with a response, returns its lines
+        :param params: Parameters of the first connection
+        :param overlap: (optional) Seconds both connections are read after
+                        the new one is opened. Tweets delivered on both are
+                        handed on once. Default: 5
+        :param queue_size: (optional) Most lines read ahead of the consumer.
+                           Readers then wait, so a slow consumer slows
+                           down reading as it does without overlap.
+                           Default: 1000
+        """
+        self.connect = connect
+        self.iter_lines = iter_lines
+        self.params = params
+        self.overlap = overlap
+
+        #: Number of completed switches and of tweets dropped as duplicates
+        self.switches = 0
+        self.duplicates = 0
+
+        # Lines take a slot until they are taken off the queue; switches
+        # and connection events never wait, so a handler can switch
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(queue_size)
+        self._closed = weakref.WeakSet()
+
+    def switch(self, params):
+        """Move the stream to ``params``. Can be called from any thread;
+        the switch happens in the background."""
+        self._queue.put((_SWITCH, params))
+
+    def _read(self, response):
+        try:
+            for line in self.iter_lines(response):
+                while not self._slots.acquire(timeout=0.1):
+                    if response in self._closed:
+                        return
+                self._queue.put((response, line))
+        except Exception as e:
+            self._queue.put((response, e))
+        else:
+            self._queue.put((response, _END))
+
+    def _open(self, params):
+        try:
+            response = self.connect(params)
+        except requests.RequestException as e:
+            response = e
+        self._queue.put((_OPENED, (params, response)))
+
+    def _start(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+
+    def lines(self, response, on_error=None, on_timeout=None):
+        """Yield the lines of ``response``, and after a switch those of the
+        new connection. Ends (or raises) when the newest connection does.
+
+        :param on_error: (optional) Called with the status code, content and
+                         headers when a new connection fails; the stream
+                         then stays on its current parameters
+        :param on_timeout: (optional) Called when a new connection times out
+        """
+        current = response
+        # Old connections still being read, and when to close them
+        retiring = {}
+        # Tweet ids handed on while connections overlap (from when a
+        # switch is asked for), and until when
+        seen = set()
+        dedupe_until = 0
+        self._start(self._read, response)
+
+        try:
+            while True:
+                deadlines = list(retiring.values())
+                if seen and dedupe_until != _FOREVER:
+                    deadlines.append(dedupe_until)
+                timeout = None
+                if deadlines:
+                    timeout = max(0, min(deadlines) - time.time())
+                try:
+                    source, item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    source = item = None
+
+                now = time.time()
+                if seen and dedupe_until <= now:
+                    seen.clear()
+                for old, deadline in list(retiring.items()):
+                    if deadline <= now:
+                        del retiring[old]
+                        self._close(old)
+
+                if source is None:
+                    continue
+                if item is not _END and not isinstance(item, Exception) and \
+                        source is not _SWITCH and source is not _OPENED:
+                    self._slots.release()
+
+                if source is _SWITCH:
+                    # Tweets read from now on may come again on the new
+                    # connection
+                    dedupe_until = _FOREVER
+                    self._start(self._open, item)
+                    continue
+
+                if source is _OPENED:
+                    params, new = item
+                    # Reconnects use the new parameters whatever happens
+                    self.params = params
+                    if isinstance(new, Exception) or new.status_code != 200:
+                        dedupe_until = 0
+                        seen.clear()
+
+                    if isinstance(new, requests.exceptions.Timeout):
+                        if on_timeout is not None:
+                            on_timeout()
+                    elif isinstance(new, Exception):
+                        pass
+                    elif new.status_code != 200:
+                        if on_error is not None:
+                            on_error(new.status_code, new.content, new.headers)
+                        self._close(new)
+                    else:
+                        retiring[current] = dedupe_until = now + self.overlap
+                        current = new
+                        self.switches += 1
+                        self._start(self._read, new)
+                    continue
+
+                if source is not current and source not in retiring:
+                    # Already closed
+                    continue
+
+                if item is _END or isinstance(item, Exception):
+                    if source is current:
+                        if item is _END:
+                            return
+                        raise item
+                    del retiring[source]
+                    continue
+
+                if dedupe_until > now and item:
+                    match = _ID_STR.search(item)
+                    if match is not None:
+                        tweet_id = match.group(1)
+                        if tweet_id in seen:
+                            self.duplicates += 1
+                            continue
+                        seen.add(tweet_id)
+
+                yield item
+        finally:
+            self._close(current)
+            for old in retiring:
+                self._close(old)
+
+    def _close(self, response):
+        # Its reader may be waiting for a slot that never comes
+        self._closed.add(response)
+        response.close()
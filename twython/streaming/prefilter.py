@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.prefilter
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains :class:`StreamPrefilter`, which rejects stream
+messages by looking at their raw bytes, so that messages you are going to
+throw away are never decoded.
+"""
+
+import re
+
+from .handlers import CONTROL_MESSAGES
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+class StreamPrefilter(object):
+    def __init__(self, contains=None, excludes=None, pattern=None,
+                 languages=None, drop_types=None, keep_control=True):
+        """Cheap checks on the raw bytes of a message, made before it is
+        decoded. A message is kept only if it passes all of them.
+
+        The checks look at the whole message, nested objects included: a
+        key or substring found in a retweeted status counts too. Twitter
+        sends compact JSON (no space after ``:``), which the key checks
+        rely on.
+
+        :param contains: (optional) Substrings (or keys, written as
+                         ``'"key":'``) that must all be in the message
+        :param excludes: (optional) Substrings that must not be in it
+        :param pattern: (optional) Regular expression (``str``, ``bytes`` or
+                        compiled from bytes) the message must match
+        :param languages: (optional) Keep only tweets with one of these
+                          ``lang`` codes (e.g. ``['en', 'es']``)
+        :param drop_types: (optional) Control messages to drop, such as
+                           ``['delete']`` (see ``CONTROL_MESSAGES``)
+        :param keep_control: (optional) Let the other control messages
+                             (``limit``, ``disconnect`` ...) through
+                             whatever the other checks say. Default: True
+        """
+        self.contains = [_to_bytes(s) for s in contains or ()]
+        self.excludes = [_to_bytes(s) for s in excludes or ()]
+        if pattern is not None and not hasattr(pattern, 'search'):
+            pattern = re.compile(_to_bytes(pattern))
+        self.pattern = pattern
+        self.languages = [b'"lang":"' + _to_bytes(lang) + b'"'
+                          for lang in languages or ()]
+        self.drop_types = frozenset(_to_bytes(t) for t in drop_types or ())
+        self.keep_control = keep_control
+
+        self._control = frozenset(_to_bytes(t) for t in CONTROL_MESSAGES)
+
+        #: Number of messages rejected so far
+        self.rejected = 0
+
+    def __call__(self, line):
+        """Returns True if the message should be decoded"""
+        if self.accept(line):
+            return True
+        self.rejected += 1
+        return False
+
+    def accept(self, line):
+        """Like calling the prefilter, without counting rejections"""
+        if isinstance(line, memoryview):
+            line = line.tobytes()
+
+        if line[:2] == b'{"':
+            # A control message has its type as its only key
+            message_type = line[2:line.find(b'"', 2)]
+            if message_type in self._control:
+                if message_type in self.drop_types:
+                    return False
+                if self.keep_control:
+                    return True
+
+        for s in self.contains:
+            if s not in line:
+                return False
+        for s in self.excludes:
+            if s in line:
+                return False
+        if self.languages:
+            for lang in self.languages:
+                if lang in line:
+                    break
+            else:
+                return False
+        if self.pattern is not None and self.pattern.search(line) is None:
+            return False
+        return True
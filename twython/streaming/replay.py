@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+twython.streaming.replay
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains :class:`StreamRecorder`, which saves the raw bytes
+of a stream as they arrive, and :class:`StreamReplay`, which plays them
+back to a :class:`TwythonStreamer` without connecting to Twitter.
+
+A recording starts with ``MAGIC``, followed by one record per connection
+and per read, each a header (kind, seconds since the recording started,
+length) and, for reads, the bytes read.
+"""
+
+import struct
+import time
+
+from ..exceptions import TwythonStreamError
+from .framing import LengthFramer, LineFramer
+
+MAGIC = b'TWYSTRM\x01'
+
+_HEADER = struct.Struct('>BdI')
+
+# Kinds of record. The length of a connection record holds its flags.
+_CONNECT = 1
+_CHUNK = 2
+
+_LENGTH_DELIMITED = 1
+
+
+class StreamRecorder(object):
+    def __init__(self, file, clock=time.time):
+        """Saves what a streamer reads, pass it as the ``recorder`` of a
+        :class:`TwythonStreamer`. Every connection the streamer makes is
+        recorded, until the recorder is closed.
+
+        :param file: Path of the recording, or a file object opened for
+                     writing in binary mode
+        :param clock: (optional) Function returning the current time in secs
+        """
+        if hasattr(file, 'write'):
+            self._file = file
+            self._owns_file = False
+        else:
+            self._file = open(file, 'wb')
+            self._owns_file = True
+        self._file.write(MAGIC)
+        self.clock = clock
+        self._start = None
+
+        #: Number of connections and of bytes recorded so far
+        self.connections = 0
+        self.bytes = 0
+
+    def _write(self, kind, length, data=b''):
+        now = self.clock()
+        if self._start is None:
+            self._start = now
+        self._file.write(_HEADER.pack(kind, now - self._start, length))
+        if data:
+            self._file.write(data)
+
+    def record(self, chunks, length_delimited=False):
+        """Yield the byte chunks of one connection, recording each of them
+
+        :param length_delimited: (optional) Whether the stream is framed with
+                                 ``delimited=length``
+        """
+        self._write(_CONNECT, _LENGTH_DELIMITED if length_delimited else 0)
+        self.connections += 1
+        try:
+            for chunk in chunks:
+                self._write(_CHUNK, len(chunk), chunk)
+                self.bytes += len(chunk)
+                yield chunk
+        finally:
+            self._file.flush()
+
+    def close(self):
+        """Flush the recording, and close it if it was opened by path"""
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StreamReplay(object):
+    def __init__(self, file):
+        """A recording made with :class:`StreamRecorder`, to play back with
+        :meth:`TwythonStreamer.replay`
+
+        :param file: Path of the recording, or a file object opened for
+                     reading in binary mode. A recording given by path can
+                     be played any number of times.
+        """
+        self.file = file
+
+    def records(self):
+        """Yield ``(length_delimited, timestamp, chunk)`` for every record;
+        ``chunk`` is None when a new connection starts
+
+        :raises: TwythonStreamError if the file is not a recording
+        """
+        if hasattr(self.file, 'read'):
+            for record in self._read(self.file):
+                yield record
+        else:
+            with open(self.file, 'rb') as f:
+                for record in self._read(f):
+                    yield record
+
+    @staticmethod
+    def _read(f):
+        if f.read(len(MAGIC)) != MAGIC:
+            raise TwythonStreamError('Not a stream recording')
+
+        length_delimited = None
+        while True:
+            header = f.read(_HEADER.size)
+            if not header:
+                return
+            if len(header) < _HEADER.size:
+                raise TwythonStreamError('Truncated stream recording')
+            kind, timestamp, length = _HEADER.unpack(header)
+            if kind == _CONNECT:
+                length_delimited = bool(length & _LENGTH_DELIMITED)
+                yield length_delimited, timestamp, None
+            elif kind == _CHUNK and length_delimited is not None:
+                chunk = f.read(length)
+                if len(chunk) < length:
+                    raise TwythonStreamError('Truncated stream recording')
+                yield length_delimited, timestamp, chunk
+            else:
+                raise TwythonStreamError('Invalid stream recording')
+
+    def play(self, speed=1.0, sleep=time.sleep, clock=time.time):
+        """Like :meth:`records`, waiting until each record is due
+
+        :param speed: (optional) 1 plays the recording at the speed it was
+                      recorded, 10 ten times faster. None or 0 plays it as
+                      fast as possible. Default: 1
+        :param sleep: (optional) Called with the secs to wait
+        :param clock: (optional) Function returning the current time in secs
+        """
+        start = clock()
+        for record in self.records():
+            if speed:
+                delay = start + record[1] / speed - clock()
+                if delay > 0:
+                    sleep(delay)
+            yield record
+
+    def lines(self, speed=1.0, sleep=time.sleep):
+        """The messages of the recording, framed as the streamer frames
+        them. Each connection is framed on its own, as when it was read.
+        Keep-alives are yielded as empty lines."""
+        framer = None
+        for length_delimited, _, chunk in self.play(speed, sleep):
+            if chunk is None:
+                if framer is not None:
+                    for line in framer.close():
+                        yield line
+                framer = LengthFramer() if length_delimited else LineFramer()
+                continue
+            for line in framer.feed(chunk):
+                yield line
+        if framer is not None:
+            for line in framer.close():
+                yield line
@@ -44,7 +44,7 @@ class TwythonStreamerTypesStatuses(object):
         """
         url = 'https://stream.twitter.com/%s/statuses/filter.json' \
               % self.streamer.api_version
-        self.streamer._request(url, 'POST', params=params)
+        return self.streamer._request(url, 'POST', params=params)
 
     def sample(self, **params):
         r"""Stream statuses/sample
@@ -56,7 +56,7 @@ class TwythonStreamerTypesStatuses(object):
         """
         url = 'https://stream.twitter.com/%s/statuses/sample.json' \
               % self.streamer.api_version
-        self.streamer._request(url, params=params)
+        return self.streamer._request(url, params=params)
 
     def firehose(self, **params):
         r"""Stream statuses/firehose
@@ -68,21 +68,38 @@ class TwythonStreamerTypesStatuses(object):
         """
         url = 'https://stream.twitter.com/%s/statuses/firehose.json' \
               % self.streamer.api_version
-        self.streamer._request(url, params=params)
+        return self.streamer._request(url, params=params)
 
     def set_dynamic_filter(self, **params):
         r"""Set/update statuses/filter
 
+        If a :meth:`dynamic_filter` stream started with ``overlap`` is
+        running, it is moved to the new parameters without a gap: a new
+        connection is opened with them, both are read for ``overlap``
+        seconds (tweets delivered on both are handed on once), then the
+        old one is closed.
+
         :param \*\*params: Parameters to send with your stream request
 
         Accepted params found at:
         https://developer.twitter.com/en/docs/tweets/filter-realtime/api-reference/post-statuses-filter
         """
         self.params = params
+        self.streamer._switch_params(params)
+
+    def dynamic_filter(self, overlap=None):
+        """Stream statuses/filter with dynamic parameters
 
-    def dynamic_filter(self):
-        """Stream statuses/filter with dynamic parameters"""
+        :param overlap: (optional) Seconds to read both the old and the new
+                        connection when :meth:`set_dynamic_filter` is
+                        called while streaming. Default: None, new
+                        parameters are only used when the stream is
+                        started again
+        """
 
         url = 'https://stream.twitter.com/%s/statuses/filter.json' \
               % self.streamer.api_version
-        self.streamer._request(url, 'POST', params=self.params)
+        if overlap is None:
+            return self.streamer._request(url, 'POST', params=self.params)
+        return self.streamer._request(url, 'POST', params=self.params,
+                                      overlap=overlap)